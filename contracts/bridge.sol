@@ -3,12 +3,14 @@
 pragma solidity 0.8.16;
 
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/extensions/draft-IERC20Permit.sol";
 import "@openzeppelin/contracts/token/ERC20/utils/SafeERC20.sol";
 import "@openzeppelin/contracts/utils/cryptography/ECDSA.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/security/Pausable.sol";
 import "@openzeppelin/contracts/security/ReentrancyGuard.sol";
 import "@openzeppelin/contracts/utils/cryptography/EIP712.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 
 contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
     using SafeERC20 for IERC20;
@@ -22,13 +24,52 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
     mapping(address => mapping (address => uint256)) internal usersAvailableBalances;
     mapping(address => uint256) internal lockedBalances; // per token
 
-    address[] internal validators;
+    uint256 internal constant MAX_VALIDATORS = 256;
+
+    // slot => validator, slots of removed validators are reused
+    address[MAX_VALIDATORS] internal validators;
     uint256 internal validatorsCounter;
-    mapping(address => bool) internal isValidator;
+    // validator => slot + 1, zero if not an active validator
+    mapping(address => uint256) internal validatorSlots;
+    // bit i is set if validators[i] is active
+    uint256 internal validatorsBitmap;
 
     // batchId => token => true/false
     mapping(uint256 => mapping (address => bool) ) internal isBatchIdRecorded;
 
+    // distinguishes signed merkle roots from signed batches
+    bytes32 internal constant MERKLE_ROOT_TAG = keccak256("DexilonBridge.MerkleRoot");
+
+    // distinguishes signed packed batches from signed batches and merkle roots
+    bytes32 internal constant PACKED_BATCH_TAG = keccak256("DexilonBridge.PackedBatch");
+
+    // distinguishes signed multi-token batches from all other signed hashes
+    bytes32 internal constant MULTI_TOKEN_BATCH_TAG = keccak256("DexilonBridge.MultiTokenBatch");
+
+    // distinguishes batches signed together with their payout flag
+    bytes32 internal constant PAYOUT_BATCH_TAG = keccak256("DexilonBridge.PayoutBatch");
+
+    // token => root of (user, token, cumulativeAmount) leaves
+    mapping(address => bytes32) internal merkleRoots;
+    // token => sum of cumulative amounts committed by the latest root
+    mapping(address => uint256) internal merkleTotals;
+    // token => user => cumulative amount already claimed with proofs
+    mapping(address => mapping (address => uint256)) internal claimedAmounts;
+
+    // token => index in supportedTokens + 1, zero if not in the list
+    mapping(address => uint256) internal supportedTokenSlots;
+
+    // deposit of a user authorized by an EIP-2612 permit for the bridge
+    struct PermitDeposit {
+        address depositor;
+        address token;
+        uint256 amount;
+        uint256 deadline;
+        uint8 v;
+        bytes32 r;
+        bytes32 s;
+    }
+
     
     event Deposit(
         address indexed depositor,
@@ -37,6 +78,13 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
         uint256 timestamp
     );
 
+    event PermitDepositSkipped(
+        address indexed depositor,
+        address indexed token,
+        uint256 amount,
+        uint256 timestamp
+    );
+
     event Withdraw(
         address indexed depositor,
         address indexed token,
@@ -50,6 +98,15 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
         address receivedFrom,
         uint256 timestamp
     );
+
+    event MerkleRootRecorded(
+        uint256 indexed batchId,
+        address indexed token,
+        bytes32 merkleRoot,
+        uint256 cumulativeTotal,
+        address receivedFrom,
+        uint256 timestamp
+    );
     
     
     constructor(string memory name, string memory version) EIP712(name, version)  {
@@ -62,43 +119,48 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
      * @param isSupported true - accept deposits, false - stop accepting deposits
      */
     function setSupportedToken(address _tokenAddress, bool isSupported) external onlyOwner {
-        uint256 indexInArray;
-        uint256 arrayLength;
+        setTokenSupport(_tokenAddress, isSupported);
+    }
+
+    /**
+     * @notice Add addresses of the tokens supported or turn support off in one transaction
+     * @param _tokenAddresses addresses of the tokens
+     * @param isSupported true - accept deposits, false - stop accepting deposits, one per token
+     */
+    function setSupportedTokens(address[] memory _tokenAddresses, bool[] memory isSupported) external onlyOwner {
+        uint256 tokensLength = _tokenAddresses.length;
+
+        require(tokensLength == isSupported.length, "Lists length do not match!");
+
+        for (uint256 i=0; i < tokensLength; i++) {
+            setTokenSupport(_tokenAddresses[i], isSupported[i]);
+        }
+    }
+
+    function setTokenSupport(address _tokenAddress, bool isSupported) internal {
+        uint256 tokenSlot;
+        address lastToken;
 
         require(_tokenAddress != address(0), "Zero token address!");
 
         isTokenSupported[_tokenAddress] = isSupported;
+        tokenSlot = supportedTokenSlots[_tokenAddress];
 
         // if isSupported is true and token address is new
         // adding to the list of supported tokens
-        if (isSupported && !isAddressInArray(_tokenAddress, supportedTokens)) {
+        if (isSupported && tokenSlot == 0) {
             supportedTokens.push(_tokenAddress);
+            supportedTokenSlots[_tokenAddress] = supportedTokens.length;
         }
         // if isSupported is false and token address is in supported list
-        // removing from the list of supported tokens
-        if (!isSupported && isAddressInArray(_tokenAddress, supportedTokens)) {
-            arrayLength = supportedTokens.length;
-            for (uint256 i=0; i < arrayLength; i++) {
-                if (_tokenAddress == supportedTokens[i]) {
-                    indexInArray = i;
-                    break;
-                }
-            }
-            supportedTokens[indexInArray] = supportedTokens[arrayLength-1];
+        // moving the last token into its place
+        if (!isSupported && tokenSlot != 0) {
+            lastToken = supportedTokens[supportedTokens.length - 1];
+            supportedTokens[tokenSlot - 1] = lastToken;
+            supportedTokenSlots[lastToken] = tokenSlot;
             supportedTokens.pop();
+            supportedTokenSlots[_tokenAddress] = 0;
         }
-        
-    }
-
-    function isAddressInArray(address _address, address[] memory _array) internal pure returns (bool) {
-        uint256 arrayLength;
-        arrayLength = _array.length;
-        for (uint256 i=0; i < arrayLength; i++) {
-            if (_address == _array[i]) {
-                return true;
-            }
-        }
-        return false;
     }
 
     /**
@@ -116,19 +178,71 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
      * @param amount Amount of token in smallest units
      */
     function deposit(address _tokenAddress, uint256 amount) external whenNotPaused nonReentrant {
+        depositFrom(msg.sender, _tokenAddress, amount);
+    }
+
+    /**
+     * @notice Deposit token into contract without a prior approve transaction
+     * @dev The token must implement EIP-2612. A permit already used by someone
+     * else is accepted as long as the allowance covers the amount
+     * @param _tokenAddress address of the supported token
+     * @param amount Amount of token in smallest units, the value of the permit
+     * @param deadline deadline of the permit
+     * @param v recovery id of the permit signature
+     * @param r r of the permit signature
+     * @param s s of the permit signature
+     */
+    function depositWithPermit(address _tokenAddress, uint256 amount, uint256 deadline, uint8 v, bytes32 r, bytes32 s) external whenNotPaused nonReentrant {
+        require(permitDeposit(msg.sender, _tokenAddress, amount, deadline, v, r, s), "Permit failed!");
+        depositFrom(msg.sender, _tokenAddress, amount);
+    }
+
+    /**
+     * @notice Deposit tokens of many users, each authorized by the user's EIP-2612 permit for the bridge
+     * @dev Callable by anyone, every amount is credited to its depositor and
+     * emits the same Deposit event as deposit. A deposit whose permit fails, for example
+     * because it was front-run, is skipped with a PermitDepositSkipped event. A standing
+     * allowance is only used for deposits of the caller
+     * @param permitDeposits depositor, token, amount and permit of every deposit
+     */
+    function depositWithPermits(PermitDeposit[] calldata permitDeposits) external whenNotPaused nonReentrant {
+
+        uint256 depositsLength = permitDeposits.length;
+
+        for (uint256 i=0; i < depositsLength; i++) {
+            PermitDeposit calldata permitted = permitDeposits[i];
+            if (permitDeposit(permitted.depositor, permitted.token, permitted.amount, permitted.deadline, permitted.v, permitted.r, permitted.s)) {
+                depositFrom(permitted.depositor, permitted.token, permitted.amount);
+            } else {
+                emit PermitDepositSkipped(permitted.depositor, permitted.token, permitted.amount, block.timestamp);
+            }
+        }
+    }
+
+    function permitDeposit(address depositor, address _tokenAddress, uint256 amount, uint256 deadline, uint8 v, bytes32 r, bytes32 s) internal returns (bool) {
+        try IERC20Permit(_tokenAddress).permit(depositor, address(this), amount, deadline, v, r, s) {
+            return true;
+        } catch {
+            // a front-run permit leaves the allowance, but only the depositor may consent to spending
+            // a standing allowance, otherwise anyone could pull it with a bad signature
+            return depositor == msg.sender && IERC20(_tokenAddress).allowance(depositor, address(this)) >= amount;
+        }
+    }
+
+    function depositFrom(address depositor, address _tokenAddress, uint256 amount) internal {
 
         require(isTokenSupported[_tokenAddress], "Token not supported!");
 
         // User mapping initialization for reducing peak gas costs for the batch
-        if (usersAvailableBalances[_tokenAddress][msg.sender] == 0) {
-            usersAvailableBalances[_tokenAddress][msg.sender] = uint256(1);
+        if (usersAvailableBalances[_tokenAddress][depositor] == 0) {
+            usersAvailableBalances[_tokenAddress][depositor] = uint256(1);
         }
         
         lockedBalances[_tokenAddress] += amount;
 
-        emit Deposit(msg.sender, _tokenAddress, amount, block.timestamp);
+        emit Deposit(depositor, _tokenAddress, amount, block.timestamp);
 
-        IERC20(_tokenAddress).safeTransferFrom(msg.sender, address(this), amount);
+        IERC20(_tokenAddress).safeTransferFrom(depositor, address(this), amount);
     }
 
     /**
@@ -145,6 +259,29 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
         }
     }
 
+    /**
+     * @notice Available balances to be claimed for (token, user) pairs
+     * @param _tokenAddresses addresses of the supported tokens, one per pair
+     * @param userAddresses addresses of the users, one per pair
+     * @return Balances available to be claimed, in the order of the pairs
+     */
+    function getAvailableBalances(address[] memory _tokenAddresses, address[] memory userAddresses) external view returns (uint256[] memory) {
+        uint256 pairsLength;
+        uint256 balance;
+
+        pairsLength = _tokenAddresses.length;
+        require(pairsLength == userAddresses.length, "Lists length do not match!");
+
+        uint256[] memory balances = new uint256[](pairsLength);
+        for (uint256 i=0; i < pairsLength; i++) {
+            balance = usersAvailableBalances[_tokenAddresses[i]][userAddresses[i]];
+            if (balance != 0) {
+                balances[i] = balance - 1;
+            }
+        }
+        return balances;
+    }
+
     /**
      * @notice Total locked balance for specified token
      * @dev Differs from token balance of this contract taking into account available for users
@@ -155,51 +292,186 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
         return lockedBalances[_tokenAddress];
     }
 
+    /**
+     * @notice Total locked balances for specified tokens
+     * @param _tokenAddresses addresses of the supported tokens
+     * @return Amounts of tokens locked in this contract, in the order of the tokens
+     */
+    function getLockedBalances(address[] memory _tokenAddresses) external view returns (uint256[] memory) {
+        uint256 tokensLength = _tokenAddresses.length;
+        uint256[] memory balances = new uint256[](tokensLength);
+
+        for (uint256 i=0; i < tokensLength; i++) {
+            balances[i] = lockedBalances[_tokenAddresses[i]];
+        }
+        return balances;
+    }
+
     /**
      * @notice Updates user balances available to be claimed
-     * @dev Updates are additive
+     * @dev Updates are additive. Users, updates and signatures are read straight
+     * from calldata, nothing is decoded into memory
+     * @param _tokenAddress address of the supported token
+     * @param users array of user addresses to be updated
+     * @param balanceUpdates array of additive balance updates for specified users
+     * @param batchId unique id of the batch
+     * @param signatures validators signatures for the batch, ordered by ascending signer address
+     */
+    function batchUpdateAvailableBalances(address _tokenAddress, address[] calldata users, uint256[] calldata balanceUpdates, uint256 batchId, bytes[] calldata signatures) external nonReentrant {
+
+        bytes32 batchHash;
+
+        batchHash = getHashForBatch(_tokenAddress, users, balanceUpdates, batchId);
+        recordBatch(_tokenAddress, users, balanceUpdates, batchId, signatures, batchHash);
+
+    }
+
+    /**
+     * @notice Updates user balances and optionally pays the available balances of the users out in the same transaction
+     * @dev Validators sign the payout flag together with the batch, keccak256(domainSeparator,
+     * PAYOUT_BATCH_TAG, batch hash, payout), so the submitter cannot choose it. With payout
+     * every user receives the whole available balance of the token and a Withdraw event;
+     * a transfer that fails leaves the amount in the available balance. No payout while paused
      * @param _tokenAddress address of the supported token
      * @param users array of user addresses to be updated
      * @param balanceUpdates array of additive balance updates for specified users
      * @param batchId unique id of the batch
-     * @param signatures validators signatures for the batch
+     * @param signatures validators signatures for the batch and payout, ordered by ascending signer address
+     * @param payout transfer the available balances to the users
      */
-    function batchUpdateAvailableBalances(address _tokenAddress, address[] memory users, uint256[] memory balanceUpdates, uint256 batchId, bytes[] memory signatures) external nonReentrant {
+    function batchUpdateAvailableBalancesWithPayout(address _tokenAddress, address[] calldata users, uint256[] calldata balanceUpdates, uint256 batchId, bytes[] calldata signatures, bool payout) external nonReentrant {
+
+        bytes32 batchHash;
+
+        batchHash = getHashForPayoutBatch(getHashForBatch(_tokenAddress, users, balanceUpdates, batchId), payout);
+        recordBatch(_tokenAddress, users, balanceUpdates, batchId, signatures, batchHash);
+
+        if (payout && !paused()) {
+            payoutUsers(_tokenAddress, users);
+        }
+    }
+
+    function recordBatch(address _tokenAddress, address[] calldata users, uint256[] calldata balanceUpdates, uint256 batchId, bytes[] calldata signatures, bytes32 batchHash) internal {
 
         uint256 verifiedSignatures;
-        uint256 updatesTotal;
-        uint256 signaturesLength;
-        uint256 usersLength;
-        bytes32 txEthHash;
 
-        require(isValidator[msg.sender], "Only validator!");
+        require(validatorSlots[msg.sender] != 0, "Only validator!");
         require(validatorsCounter > 2, "Not enough validators!");
         require(!isBatchIdRecorded[batchId][_tokenAddress], "Batch already recorded!");
+        require(users.length == balanceUpdates.length, "Lists length do not match!");
 
-        usersLength = users.length;
-        
-        require(usersLength == balanceUpdates.length, "Lists length do not match!");
+        // Getting number of signatures that belong to active validators
+        verifiedSignatures = countVerifiedSignatures(getEthHash(batchHash), signatures);
+        require( (verifiedSignatures * 3)/validatorsCounter >= 2, "Not enough signatures!");
+
+        isBatchIdRecorded[batchId][_tokenAddress] = true;
+
+        applyCalldataBalanceUpdates(_tokenAddress, users, balanceUpdates);
+
+        emit BatchRecorded(batchId, _tokenAddress, msg.sender, block.timestamp);
+    }
+
+    /**
+     * @notice Update available balances of users, signatures passed as one blob of compact signatures
+     * @dev Updates are additive. Signatures are 64-byte EIP-2098 (r, vs) signatures,
+     * concatenated in ascending signer address order and read straight from calldata
+     * @param _tokenAddress address of the supported token
+     * @param users array of user addresses to be updated
+     * @param balanceUpdates array of additive balance updates for specified users
+     * @param batchId unique id of the batch
+     * @param signatures concatenated 64-byte validators signatures for the batch
+     */
+    function batchUpdateAvailableBalancesCompact(address _tokenAddress, address[] calldata users, uint256[] calldata balanceUpdates, uint256 batchId, bytes calldata signatures) external nonReentrant {
+
+        uint256 verifiedSignatures;
+        bytes32 txEthHash;
+
+        require(validatorSlots[msg.sender] != 0, "Only validator!");
+        require(validatorsCounter > 2, "Not enough validators!");
+        require(!isBatchIdRecorded[batchId][_tokenAddress], "Batch already recorded!");
+        require(users.length == balanceUpdates.length, "Lists length do not match!");
 
         // Getting number of signatures that belong to active validators
         txEthHash = getEthHash(getHashForBatch(_tokenAddress, users, balanceUpdates, batchId));
-        signaturesLength = signatures.length;
+        verifiedSignatures = countVerifiedCompactSignatures(txEthHash, signatures);
+        require( (verifiedSignatures * 3)/validatorsCounter >= 2, "Not enough signatures!");
 
-        for (uint256 i=0; i < signaturesLength; i++){
-            // check if signature is unique
-            if (!isSignatureUniqueInArray(signatures[i], signatures)) {
-                delete signatures[i]; // delete repeated signature
-            } else {
-                if ( isValidator[ECDSA.recover(txEthHash, signatures[i])] ) {
-                    verifiedSignatures++;
-                }
-            }
+        isBatchIdRecorded[batchId][_tokenAddress] = true;
+
+        applyCalldataBalanceUpdates(_tokenAddress, users, balanceUpdates);
+
+        emit BatchRecorded(batchId, _tokenAddress, msg.sender, block.timestamp);
+
+    }
+
+    /**
+     * @notice Update available balances of users for several tokens under one set of signatures
+     * @dev Updates are additive. Validators sign
+     * keccak256(domainSeparator, MULTI_TOKEN_BATCH_TAG, keccak256(token, users, balanceUpdates) per token, batchId),
+     * the batch id is recorded and the locked balance checked for every token
+     * @param _tokenAddresses addresses of the supported tokens, each at most once
+     * @param users array of user addresses to be updated, per token
+     * @param balanceUpdates array of additive balance updates for specified users, per token
+     * @param batchId unique id of the batch
+     * @param signatures validators signatures for the batch, ordered by ascending signer address
+     */
+    function batchUpdateAvailableBalancesMultiToken(address[] memory _tokenAddresses, address[][] memory users, uint256[][] memory balanceUpdates, uint256 batchId, bytes[] calldata signatures) external nonReentrant {
+
+        uint256 verifiedSignatures;
+        uint256 tokensLength;
+        bytes32[] memory tokenHashes;
+        bytes32 txEthHash;
+
+        require(validatorSlots[msg.sender] != 0, "Only validator!");
+        require(validatorsCounter > 2, "Not enough validators!");
+
+        tokensLength = _tokenAddresses.length;
+
+        require(users.length == tokensLength && balanceUpdates.length == tokensLength, "Lists length do not match!");
+
+        tokenHashes = new bytes32[](tokensLength);
+        for (uint256 i=0; i < tokensLength; i++) {
+            require(!isBatchIdRecorded[batchId][_tokenAddresses[i]], "Batch already recorded!");
+            require(users[i].length == balanceUpdates[i].length, "Lists length do not match!");
+            tokenHashes[i] = keccak256(abi.encodePacked(_tokenAddresses[i], users[i], balanceUpdates[i]));
         }
+
+        // Getting number of signatures that belong to active validators, once for all tokens
+        txEthHash = getEthHash(getHashForMultiTokenBatch(tokenHashes, batchId));
+        verifiedSignatures = countVerifiedSignatures(txEthHash, signatures);
         require( (verifiedSignatures * 3)/validatorsCounter >= 2, "Not enough signatures!");
-        
-        
-        isBatchIdRecorded[batchId][_tokenAddress] = true;
 
-        // Applying batch balances updates
+        for (uint256 i=0; i < tokensLength; i++) {
+            // a token listed twice finds its batch id already recorded
+            require(!isBatchIdRecorded[batchId][_tokenAddresses[i]], "Batch already recorded!");
+            isBatchIdRecorded[batchId][_tokenAddresses[i]] = true;
+
+            applyBalanceUpdates(_tokenAddresses[i], users[i], balanceUpdates[i]);
+
+            emit BatchRecorded(batchId, _tokenAddresses[i], msg.sender, block.timestamp);
+        }
+
+    }
+
+    function applyCalldataBalanceUpdates(address _tokenAddress, address[] calldata users, uint256[] calldata balanceUpdates) internal {
+        uint256 updatesTotal;
+        uint256 usersLength = users.length;
+
+        // only the counter is unchecked, balances and the total still revert on overflow
+        for (uint256 i=0; i < usersLength; ) {
+            usersAvailableBalances[_tokenAddress][users[i]] += balanceUpdates[i];
+            updatesTotal += balanceUpdates[i];
+            unchecked { ++i; }
+        }
+
+        require( lockedBalances[_tokenAddress] >= updatesTotal, "Not enough locked token!");
+        lockedBalances[_tokenAddress] -= updatesTotal;
+    }
+
+    function applyBalanceUpdates(address _tokenAddress, address[] memory users, uint256[] memory balanceUpdates) internal {
+        uint256 updatesTotal;
+        uint256 usersLength = users.length;
+
         for (uint256 i=0; i < usersLength; i++) {
             usersAvailableBalances[_tokenAddress][users[i]] += balanceUpdates[i];
             updatesTotal += balanceUpdates[i];
@@ -207,49 +479,206 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
 
         require( lockedBalances[_tokenAddress] >= updatesTotal, "Not enough locked token!");
         lockedBalances[_tokenAddress] -= updatesTotal;
+    }
+
+    /**
+     * @notice Update available balances of users from a packed batch, one 32-byte entry per user
+     * @dev Every entry is the user address (20 bytes) followed by the big-endian
+     * balance update (12 bytes, uint96), read straight from calldata.
+     * Validators sign keccak256(domainSeparator, PACKED_BATCH_TAG, token, keccak256(packedUpdates), batchId)
+     * @param _tokenAddress address of the supported token
+     * @param packedUpdates concatenated (address, uint96) entries
+     * @param batchId unique id of the batch
+     * @param signatures validators signatures for the batch, ordered by ascending signer address
+     */
+    function batchUpdateAvailableBalancesPacked(address _tokenAddress, bytes calldata packedUpdates, uint256 batchId, bytes[] calldata signatures) external nonReentrant {
+
+        uint256 verifiedSignatures;
+        uint256 updatesTotal;
+        uint256 packedLength;
+        uint256 entry;
+        bytes32 txEthHash;
+
+        require(validatorSlots[msg.sender] != 0, "Only validator!");
+        require(validatorsCounter > 2, "Not enough validators!");
+        require(!isBatchIdRecorded[batchId][_tokenAddress], "Batch already recorded!");
+
+        packedLength = packedUpdates.length;
+
+        require(packedLength % 32 == 0, "Invalid packed updates!");
+
+        // Getting number of signatures that belong to active validators
+        txEthHash = getEthHash(getHashForPackedBatch(_tokenAddress, packedUpdates, batchId));
+        verifiedSignatures = countVerifiedSignatures(txEthHash, signatures);
+        require( (verifiedSignatures * 3)/validatorsCounter >= 2, "Not enough signatures!");
+
+        isBatchIdRecorded[batchId][_tokenAddress] = true;
+
+        // Applying batch balances updates
+        for (uint256 offset=0; offset < packedLength; offset += 32) {
+            assembly {
+                entry := calldataload(add(packedUpdates.offset, offset))
+            }
+            usersAvailableBalances[_tokenAddress][address(uint160(entry >> 96))] += uint96(entry);
+            updatesTotal += uint96(entry);
+        }
+
+        require( lockedBalances[_tokenAddress] >= updatesTotal, "Not enough locked token!");
+        lockedBalances[_tokenAddress] -= updatesTotal;
 
         emit BatchRecorded(batchId, _tokenAddress, msg.sender, block.timestamp);
 
     }
 
-    function isSignatureUniqueInArray(bytes memory signature, bytes[] memory signatureArray) internal pure returns (bool) {
+    /**
+     * @notice Commits cumulative user balances as a merkle root, claimed with withdrawWithProof
+     * @dev Gas does not depend on the number of users. Leaves are
+     * keccak256(bytes.concat(keccak256(abi.encode(user, token, cumulativeAmount))))
+     * and every root replaces the previous root of the token
+     * @param _tokenAddress address of the supported token
+     * @param merkleRoot root of the tree of cumulative amounts of all users
+     * @param cumulativeTotal sum of cumulative amounts of all leaves
+     * @param batchId unique id of the batch
+     * @param signatures validators signatures for the root, ordered by ascending signer address
+     */
+    function batchUpdateMerkleRoot(address _tokenAddress, bytes32 merkleRoot, uint256 cumulativeTotal, uint256 batchId, bytes[] calldata signatures) external nonReentrant {
 
-        uint256 arrayLength = signatureArray.length;
-        uint256 counter;
+        uint256 verifiedSignatures;
+        uint256 updatesTotal;
+        bytes32 txEthHash;
 
-        for (uint256 i=0; i < arrayLength; i++) {
-            if (keccak256(signature) == keccak256(signatureArray[i])) {
-                counter++;
-                if (counter > 1) {
-                    return false;
-                }
+        require(validatorSlots[msg.sender] != 0, "Only validator!");
+        require(validatorsCounter > 2, "Not enough validators!");
+        require(!isBatchIdRecorded[batchId][_tokenAddress], "Batch already recorded!");
+        require(cumulativeTotal >= merkleTotals[_tokenAddress], "Cumulative total decreased!");
+
+        txEthHash = getEthHash(getHashForMerkleRoot(_tokenAddress, merkleRoot, cumulativeTotal, batchId));
+        verifiedSignatures = countVerifiedSignatures(txEthHash, signatures);
+        require( (verifiedSignatures * 3)/validatorsCounter >= 2, "Not enough signatures!");
+
+        isBatchIdRecorded[batchId][_tokenAddress] = true;
+
+        updatesTotal = cumulativeTotal - merkleTotals[_tokenAddress];
+        require( lockedBalances[_tokenAddress] >= updatesTotal, "Not enough locked token!");
+        lockedBalances[_tokenAddress] -= updatesTotal;
+
+        merkleRoots[_tokenAddress] = merkleRoot;
+        merkleTotals[_tokenAddress] = cumulativeTotal;
+
+        emit MerkleRootRecorded(batchId, _tokenAddress, merkleRoot, cumulativeTotal, msg.sender, block.timestamp);
+
+    }
+
+    /**
+     * @notice Latest merkle root of cumulative balances for specified token
+     * @param _tokenAddress address of the supported token
+     * @return Merkle root and sum of cumulative amounts it commits
+     */
+    function getMerkleRoot(address _tokenAddress) external view returns (bytes32, uint256) {
+        return (merkleRoots[_tokenAddress], merkleTotals[_tokenAddress]);
+    }
+
+    /**
+     * @notice Cumulative amount already claimed by user with merkle proofs
+     * @param _tokenAddress address of the supported token
+     * @param userAddress address of the user
+     * @return Claimed cumulative amount
+     */
+    function getClaimedAmount(address _tokenAddress, address userAddress) external view returns (uint256) {
+        return claimedAmounts[_tokenAddress][userAddress];
+    }
+
+    /**
+     * @dev Signers must be strictly ascending, which rejects repeated signatures
+     * and repeated signers in one pass over the signatures.
+     * Slots of validators that signed are collected in a bitmap and counted once
+     */
+    function countVerifiedSignatures(bytes32 txEthHash, bytes[] calldata signatures) internal view returns (uint256) {
+
+        uint256 signedBitmap;
+        uint256 slot;
+        uint256 signaturesLength = signatures.length;
+        address lastSigner;
+        address signer;
+
+        for (uint256 i=0; i < signaturesLength; ) {
+            signer = ECDSA.recover(txEthHash, signatures[i]);
+            require(signer > lastSigner, "Signers not in ascending order!");
+            lastSigner = signer;
+
+            slot = validatorSlots[signer];
+            if (slot != 0) {
+                signedBitmap |= 1 << (slot - 1);
+            }
+            unchecked { ++i; }
+        }
+
+        return countBits(signedBitmap);
+    }
+
+    /**
+     * @dev Same rules as countVerifiedSignatures for a blob of 64-byte EIP-2098 signatures
+     */
+    function countVerifiedCompactSignatures(bytes32 txEthHash, bytes calldata signatures) internal view returns (uint256) {
+
+        uint256 signedBitmap;
+        uint256 slot;
+        uint256 signaturesLength = signatures.length;
+        address lastSigner;
+        address signer;
+        bytes32 r;
+        bytes32 vs;
+
+        require(signaturesLength % 64 == 0, "Invalid signatures length!");
+
+        for (uint256 offset=0; offset < signaturesLength; offset += 64) {
+            assembly {
+                r := calldataload(add(signatures.offset, offset))
+                vs := calldataload(add(signatures.offset, add(offset, 32)))
+            }
+            signer = ECDSA.recover(txEthHash, r, vs);
+            require(signer > lastSigner, "Signers not in ascending order!");
+            lastSigner = signer;
+
+            slot = validatorSlots[signer];
+            if (slot != 0) {
+                signedBitmap |= 1 << (slot - 1);
             }
         }
 
-        return counter == 1;
+        return countBits(signedBitmap);
     }
 
     /**
      * @notice Add new validators to the list of active validatos
-     * @dev Only owner
+     * @dev Only owner. Every new validator takes the lowest free slot of the bitmap
      * @param newValidators Array of addresses assigned to new validators
      */
     function addValidators(address[] memory newValidators) external onlyOwner {
         uint256 newValidatorsLength;
+        uint256 bitmap;
+        uint256 slot;
 
         newValidatorsLength = newValidators.length;
+        bitmap = validatorsBitmap;
 
         for (uint256 i=0; i < newValidatorsLength; i++) {
 
             require(newValidators[i] != address(0), "Cannot be zero address!");
 
-            if (!isValidator[newValidators[i]]) {
+            if (validatorSlots[newValidators[i]] == 0) {
+
+                require(~bitmap != 0, "Too many validators!");
+                slot = lowestBit(~bitmap);
+                bitmap |= 1 << slot;
 
-                isValidator[newValidators[i]] = true;
+                validators[slot] = newValidators[i];
+                validatorSlots[newValidators[i]] = slot + 1;
                 validatorsCounter++;
-                validators.push(newValidators[i]);
             }
         }
+
+        validatorsBitmap = bitmap;
     }
 
     /**
@@ -259,45 +688,114 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
      */
     function removeValidators(address[] memory retiredValidators) external onlyOwner {
 
-        uint256 indexInArray;
         uint256 retiredValidatorsLength;
+        uint256 bitmap;
+        uint256 slot;
 
         retiredValidatorsLength = retiredValidators.length;
+        bitmap = validatorsBitmap;
 
         for (uint256 i=0; i < retiredValidatorsLength; i++) {
-            if (isValidator[retiredValidators[i]]) {
-
-                delete isValidator[retiredValidators[i]];
-                // removing validator from the list of active validators
-                for (uint256 j=0; j < validatorsCounter; j++) {
-                    if (retiredValidators[i] == validators[j]) {
-                        indexInArray = j;
-                        break;
-                    }
-                }
-                validators[indexInArray] = validators[validatorsCounter-1];
-                validators.pop();
+            slot = validatorSlots[retiredValidators[i]];
+            if (slot != 0) {
+
+                delete validatorSlots[retiredValidators[i]];
+                delete validators[slot - 1];
+                bitmap &= ~(1 << (slot - 1));
                 validatorsCounter--;
 
             }
         }
 
+        validatorsBitmap = bitmap;
     }
 
     /**
-     * @notice Get the list of active 
-     * @return Array of active validators addresses
+     * @notice Get the list of active validators
+     * @return Array of active validators addresses, ordered by slot
      */
     function getActiveValidators() external view returns (address[] memory) {
-        return validators;
+        address[] memory activeValidators = new address[](validatorsCounter);
+        uint256 bitmap = validatorsBitmap;
+
+        for (uint256 i=0; bitmap != 0; i++) {
+            activeValidators[i] = validators[lowestBit(bitmap)];
+            bitmap &= bitmap - 1;
+        }
+
+        return activeValidators;
+    }
+
+    /**
+     * @notice Get the bitmap of occupied validator slots
+     * @dev The n-th validator returned by getActiveValidators occupies the n-th set bit
+     * @return Bitmap of active validators slots
+     */
+    function getValidatorsBitmap() external view returns (uint256) {
+        return validatorsBitmap;
+    }
+
+    /**
+     * @dev Index of the least significant set bit, x must not be zero
+     */
+    function lowestBit(uint256 x) internal pure returns (uint256 index) {
+        if (x & type(uint128).max == 0) { index += 128; x >>= 128; }
+        if (x & type(uint64).max == 0) { index += 64; x >>= 64; }
+        if (x & type(uint32).max == 0) { index += 32; x >>= 32; }
+        if (x & type(uint16).max == 0) { index += 16; x >>= 16; }
+        if (x & type(uint8).max == 0) { index += 8; x >>= 8; }
+        if (x & 0xf == 0) { index += 4; x >>= 4; }
+        if (x & 0x3 == 0) { index += 2; x >>= 2; }
+        if (x & 0x1 == 0) { index += 1; }
+    }
+
+    function countBits(uint256 x) internal pure returns (uint256 count) {
+        while (x != 0) {
+            x &= x - 1;
+            count++;
+        }
     }
 
     function getEthHash(bytes32 _hash) internal pure returns (bytes32) {
         return ECDSA.toEthSignedMessageHash(_hash);
     }
 
-    function getHashForBatch(address _tokenAddress, address[] memory users, uint256[] memory balances, uint256 batchId) internal view returns (bytes32) {
-        return keccak256(abi.encodePacked(_domainSeparatorV4(), _tokenAddress, users, balances, batchId));
+    /**
+     * @dev Same hash as keccak256(abi.encodePacked(_domainSeparatorV4(), _tokenAddress, users, balances, batchId)).
+     * Packed address and uint256 arrays are laid out like the calldata array bodies,
+     * so both are copied with one calldatacopy each into scratch memory past the free pointer
+     */
+    function getHashForBatch(address _tokenAddress, address[] calldata users, uint256[] calldata balances, uint256 batchId) internal view returns (bytes32 batchHash) {
+        bytes32 domainSeparator = _domainSeparatorV4();
+
+        assembly {
+            let start := mload(0x40)
+            mstore(start, domainSeparator)
+            mstore(add(start, 32), shl(96, _tokenAddress))
+            let end := add(start, 52)
+            calldatacopy(end, users.offset, mul(users.length, 32))
+            end := add(end, mul(users.length, 32))
+            calldatacopy(end, balances.offset, mul(balances.length, 32))
+            end := add(end, mul(balances.length, 32))
+            mstore(end, batchId)
+            batchHash := keccak256(start, sub(add(end, 32), start))
+        }
+    }
+
+    function getHashForPayoutBatch(bytes32 batchHash, bool payout) internal view returns (bytes32) {
+        return keccak256(abi.encodePacked(_domainSeparatorV4(), PAYOUT_BATCH_TAG, batchHash, payout));
+    }
+
+    function getHashForPackedBatch(address _tokenAddress, bytes calldata packedUpdates, uint256 batchId) internal view returns (bytes32) {
+        return keccak256(abi.encodePacked(_domainSeparatorV4(), PACKED_BATCH_TAG, _tokenAddress, keccak256(packedUpdates), batchId));
+    }
+
+    function getHashForMultiTokenBatch(bytes32[] memory tokenHashes, uint256 batchId) internal view returns (bytes32) {
+        return keccak256(abi.encodePacked(_domainSeparatorV4(), MULTI_TOKEN_BATCH_TAG, tokenHashes, batchId));
+    }
+
+    function getHashForMerkleRoot(address _tokenAddress, bytes32 merkleRoot, uint256 cumulativeTotal, uint256 batchId) internal view returns (bytes32) {
+        return keccak256(abi.encodePacked(_domainSeparatorV4(), MERKLE_ROOT_TAG, _tokenAddress, merkleRoot, cumulativeTotal, batchId));
     }
 
 
@@ -307,16 +805,110 @@ contract DexilonBridge_v10 is EIP712, Ownable, Pausable, ReentrancyGuard {
      * @param _tokenAddress address of the supported token
      */
     function withdraw(address _tokenAddress) external whenNotPaused nonReentrant {
+        require(withdrawAvailable(_tokenAddress) > 0, "No balance!");
+    }
+
+    /**
+     * @notice Withdraw available balances of several tokens in one transaction
+     * @dev tokens without available balance are skipped, at least one must have a balance
+     * @param _tokenAddresses addresses of the tokens
+     */
+    function withdrawMany(address[] memory _tokenAddresses) external whenNotPaused nonReentrant {
+
+        uint256 withdrawnTokens;
+        uint256 tokensLength = _tokenAddresses.length;
+
+        for (uint256 i=0; i < tokensLength; i++) {
+            if (withdrawAvailable(_tokenAddresses[i]) > 0) {
+                withdrawnTokens++;
+            }
+        }
+        require(withdrawnTokens > 0, "No balance!");
+    }
+
+    function withdrawAvailable(address _tokenAddress) internal returns (uint256) {
 
         uint256 withdrawAmount;
-        
+
         withdrawAmount = usersAvailableBalances[_tokenAddress][msg.sender];
-        require(withdrawAmount > 1, "No balance!");
-        
+        if (withdrawAmount <= 1) {
+            return 0;
+        }
+
         usersAvailableBalances[_tokenAddress][msg.sender] = uint256(1);
         IERC20(_tokenAddress).safeTransfer(msg.sender, withdrawAmount - 1);
 
         emit Withdraw(msg.sender, _tokenAddress, withdrawAmount - 1, block.timestamp);
+
+        return withdrawAmount - 1;
+    }
+
+    function payoutUsers(address _tokenAddress, address[] calldata users) internal {
+        uint256 usersLength = users.length;
+
+        for (uint256 i=0; i < usersLength; ) {
+            tryPayout(_tokenAddress, users[i]);
+            unchecked { ++i; }
+        }
+    }
+
+    function tryPayout(address _tokenAddress, address user) internal {
+
+        uint256 payoutAmount;
+        bool success;
+        bytes memory returndata;
+
+        payoutAmount = usersAvailableBalances[_tokenAddress][user];
+        if (payoutAmount <= 1) {
+            return;
+        }
+
+        usersAvailableBalances[_tokenAddress][user] = uint256(1);
+        // a rejected transfer must not revert the batch, the user can still withdraw
+        (success, returndata) = _tokenAddress.call(abi.encodeWithSelector(IERC20.transfer.selector, user, payoutAmount - 1));
+        if (success && returndata.length > 0) {
+            success = returndata.length >= 32 && abi.decode(returndata, (uint256)) == 1;
+        } else if (success) {
+            // a call to an address without code succeeds without moving any token
+            success = _tokenAddress.code.length > 0;
+        }
+
+        if (success) {
+            emit Withdraw(user, _tokenAddress, payoutAmount - 1, block.timestamp);
+        } else {
+            usersAvailableBalances[_tokenAddress][user] = payoutAmount;
+        }
+    }
+
+    /**
+     * @notice Withdraw available token balance together with the amount claimed by a merkle proof
+     * @param _tokenAddress address of the supported token
+     * @param cumulativeAmount cumulative amount of the user in the latest merkle root
+     * @param proof merkle proof of the user leaf
+     */
+    function withdrawWithProof(address _tokenAddress, uint256 cumulativeAmount, bytes32[] memory proof) external whenNotPaused nonReentrant {
+
+        uint256 withdrawAmount;
+        uint256 availableBalance;
+        bytes32 leaf;
+
+        leaf = keccak256(bytes.concat(keccak256(abi.encode(msg.sender, _tokenAddress, cumulativeAmount))));
+        require(MerkleProof.verify(proof, merkleRoots[_tokenAddress], leaf), "Invalid proof!");
+        require(cumulativeAmount >= claimedAmounts[_tokenAddress][msg.sender], "Cumulative amount decreased!");
+
+        withdrawAmount = cumulativeAmount - claimedAmounts[_tokenAddress][msg.sender];
+        claimedAmounts[_tokenAddress][msg.sender] = cumulativeAmount;
+
+        availableBalance = usersAvailableBalances[_tokenAddress][msg.sender];
+        if (availableBalance > 1) {
+            withdrawAmount += availableBalance - 1;
+            usersAvailableBalances[_tokenAddress][msg.sender] = uint256(1);
+        }
+        require(withdrawAmount > 0, "No balance!");
+
+        IERC20(_tokenAddress).safeTransfer(msg.sender, withdrawAmount);
+
+        emit Withdraw(msg.sender, _tokenAddress, withdrawAmount, block.timestamp);
     }
 
     /**
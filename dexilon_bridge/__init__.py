@@ -0,0 +1 @@
+"""Off-chain helpers for the DexilonBridge_v10 smart contract."""
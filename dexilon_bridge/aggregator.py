@@ -0,0 +1,289 @@
+"""Collection of validator signatures for batches, submitted on quorum.
+
+Validators connect to the SignatureAggregator over TCP and send one JSON
+object per line,
+
+    {"batchHash": "0x...", "signature": "0x..."}
+
+where batchHash is hash_batch of a batch the aggregator was given with
+add_batch, and signature is the validator's 65-byte signature of its
+eth-signed digest. Every signature is recovered on arrival and only
+signatures of active validators are kept. The aggregator answers each line with
+
+    {"accepted": true, "reason": null, "verified": 5, "required": 8}
+
+and hands the batch to the submit callback the moment the number of signing
+validators reaches the quorum of batchUpdateAvailableBalances, with the
+signatures ordered by signer as the contract requires. Signatures arriving
+after that are not waited for and are answered with "Batch already submitted".
+
+A submitted batch is forgotten submitted_ttl seconds after its result
+resolves, and a batch that does not reach quorum within pending_ttl seconds
+fails with TimeoutError and is forgotten, so a long-running aggregator only
+keeps the batches in flight. The validators are not followed on chain: call
+refresh_validators (or set_validators) whenever validators are added or
+removed, signatures of new validators are rejected until then.
+"""
+import asyncio
+import inspect
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from eth_utils import keccak
+
+from .balances import decode_uint256_array
+from .encoding import HexOrBytes, address_to_bytes, hash_batch, to_bytes
+from .rpc import request
+from .signing import eth_signed_hash
+from .verifier import SignatureVerifier, required_signatures
+
+GET_ACTIVE_VALIDATORS_SELECTOR = keccak(text="getActiveValidators()")[:4]
+
+
+class PendingBatch:
+    """PendingBatch is a batch waiting for validator signatures
+
+    Attributes:
+        signatures (Dict[bytes, bytes]): signature per signing validator
+        submitted (bool): quorum was reached and the batch handed to submit
+        result (asyncio.Future): result of the submit callback
+    """
+
+    def __init__(
+        self,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        batch_hash: bytes,
+    ) -> None:
+        self.token = token
+        self.users = users
+        self.balance_updates = balance_updates
+        self.batch_id = batch_id
+        self.batch_hash = batch_hash
+        self.eth_hash = eth_signed_hash(batch_hash)
+        self.signatures: Dict[bytes, bytes] = {}
+        self.submitted = False
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def sorted_signatures(self) -> List[bytes]:
+        """sorted_signatures returns the signatures ordered by ascending signer"""
+        return [self.signatures[signer] for signer in sorted(self.signatures)]
+
+
+class SignatureAggregator:
+    """SignatureAggregator collects signatures and submits batches on quorum
+
+    Args:
+        domain_separator (HexOrBytes): EIP712 domain separator of the bridge
+        validators (Iterable[HexOrBytes]): getActiveValidators() of the bridge
+        submit (Callable): called once per batch with (PendingBatch, signatures);
+            coroutine functions are awaited, plain functions run in a thread
+        verifier (Optional[SignatureVerifier]): verifier used to recover signers
+        submitted_ttl (float): seconds a submitted batch is kept after its result
+            resolves, late signatures are answered "Batch already submitted"
+        pending_ttl (Optional[float]): seconds a batch may wait for quorum before
+            it fails with TimeoutError, None waits forever
+    """
+
+    def __init__(
+        self,
+        domain_separator: HexOrBytes,
+        validators: Iterable[HexOrBytes],
+        submit: Callable[[PendingBatch, List[bytes]], Any],
+        verifier: Optional[SignatureVerifier] = None,
+        submitted_ttl: float = 60.0,
+        pending_ttl: Optional[float] = 600.0,
+    ) -> None:
+        self.domain_separator = to_bytes(domain_separator)
+        self._owns_verifier = verifier is None
+        self.verifier = verifier or SignatureVerifier(validators)
+        self.verifier.set_validators(validators)
+        self.submit = submit
+        self.submitted_ttl = submitted_ttl
+        self.pending_ttl = pending_ttl
+        self.batches: Dict[bytes, PendingBatch] = {}
+
+    def set_validators(self, validators: Iterable[HexOrBytes]) -> None:
+        """set_validators replaces the active validators after validators change"""
+        self.verifier.set_validators(validators)
+
+    def refresh_validators(
+        self, provider, bridge: HexOrBytes, block: str = "latest"
+    ) -> List[bytes]:
+        """refresh_validators loads getActiveValidators() of the bridge
+
+        Args:
+            provider: web3 provider, or any object with make_request(method, params)
+            bridge (HexOrBytes): address of the bridge
+            block (str): block tag or hex block number to read at
+
+        Returns:
+            List[bytes]: the active validators now used to verify signatures
+        """
+        result = request(
+            provider,
+            "eth_call",
+            [
+                {
+                    "to": "0x" + address_to_bytes(bridge).hex(),
+                    "data": "0x" + GET_ACTIVE_VALIDATORS_SELECTOR.hex(),
+                },
+                block,
+            ],
+        )
+        validators = [
+            validator.to_bytes(20, "big")
+            for validator in decode_uint256_array(to_bytes(result))
+        ]
+        self.set_validators(validators)
+        return validators
+
+    @property
+    def required(self) -> int:
+        return required_signatures(len(self.verifier.validators))
+
+    def add_batch(
+        self,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+    ) -> PendingBatch:
+        """add_batch starts collecting signatures for a batch
+
+        Returns:
+            PendingBatch: batch keyed by its hash_batch, await its result
+        """
+        batch_hash = hash_batch(
+            self.domain_separator, token, users, balance_updates, batch_id
+        )
+        batch = self.batches.get(batch_hash)
+        if batch is None:
+            batch = PendingBatch(token, users, balance_updates, batch_id, batch_hash)
+            self.batches[batch_hash] = batch
+            if self.pending_ttl is not None:
+                asyncio.get_running_loop().call_later(
+                    self.pending_ttl, self._expire, batch
+                )
+        return batch
+
+    def _evict(self, batch: PendingBatch) -> None:
+        # a batch added again under the same hash is a new batch, keep it
+        if self.batches.get(batch.batch_hash) is batch:
+            del self.batches[batch.batch_hash]
+
+    def _expire(self, batch: PendingBatch) -> None:
+        if batch.submitted:
+            return
+        self._evict(batch)
+        if not batch.result.done():
+            batch.result.set_exception(
+                asyncio.TimeoutError(
+                    f"{len(batch.signatures)} of {self.required} signatures"
+                )
+            )
+
+    def add_signature(
+        self, batch_hash: HexOrBytes, signature: HexOrBytes
+    ) -> Tuple[bool, Optional[str]]:
+        """add_signature verifies a signature and submits the batch on quorum
+
+        Returns:
+            Tuple[bool, Optional[str]]: whether the signature was accepted, and
+                the reason if it was not
+        """
+        batch = self.batches.get(to_bytes(batch_hash))
+        if batch is None:
+            return False, "Unknown batch"
+        if batch.submitted:
+            return False, "Batch already submitted"
+
+        signature = to_bytes(signature)
+        ((signer, error),) = self.verifier.recover_signers(batch.eth_hash, [signature])
+        if error is not None:
+            return False, error
+        if signer not in self.verifier.validators:
+            return False, "Only validator!"
+        batch.signatures[signer] = signature
+
+        if len(batch.signatures) >= self.required:
+            batch.submitted = True
+            asyncio.get_running_loop().create_task(self._submit(batch))
+        return True, None
+
+    async def _submit(self, batch: PendingBatch) -> None:
+        signatures = batch.sorted_signatures()
+        try:
+            if inspect.iscoroutinefunction(self.submit):
+                result = await self.submit(batch, signatures)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    None, self.submit, batch, signatures
+                )
+        except Exception as e:
+            batch.result.set_exception(e)
+        else:
+            batch.result.set_result(result)
+        asyncio.get_running_loop().call_later(self.submitted_ttl, self._evict, batch)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """handle_connection answers every line a validator sends"""
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    accepted, reason = self.add_signature(
+                        message["batchHash"], message["signature"]
+                    )
+                    batch = self.batches.get(to_bytes(message["batchHash"]))
+                    verified = len(batch.signatures) if batch else 0
+                except (ValueError, KeyError, TypeError) as e:
+                    accepted, reason, verified = False, f"Invalid message: {e}", 0
+                response = {
+                    "accepted": accepted,
+                    "reason": reason,
+                    "verified": verified,
+                    "required": self.required,
+                }
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        if self._owns_verifier:
+            self.verifier.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """serve starts accepting validator connections, port 0 picks a free port"""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def send_signatures(
+    host: str, port: int, batch_hash: HexOrBytes, signatures: Iterable[HexOrBytes]
+) -> List[Dict[str, Any]]:
+    """send_signatures sends signatures of a batch to an aggregator
+
+    Returns:
+        List[Dict[str, Any]]: the aggregator response to every signature
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    responses = []
+    try:
+        for signature in signatures:
+            message = {
+                "batchHash": "0x" + to_bytes(batch_hash).hex(),
+                "signature": "0x" + to_bytes(signature).hex(),
+            }
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return responses
@@ -0,0 +1,140 @@
+"""Bulk reads of bridge balances through getAvailableBalances.
+
+(token, user) pairs are split into chunks, every chunk is one raw eth_call
+and the chunks are sent concurrently from a thread pool. All chunks are
+pinned to one block number, so the result is a consistent snapshot. A chunk
+the node refuses (eth_call gas cap, response size limit, or an HTTP error,
+timeout or dropped connection from a gateway) is split in half and retried,
+and the smaller size is kept for the chunks that follow.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from eth_utils import keccak
+
+from .encoding import WORD_SIZE, HexOrBytes, address_to_bytes, to_bytes
+from .rpc import REQUEST_ERRORS, request
+
+GET_AVAILABLE_BALANCES_SELECTOR = keccak(
+    text="getAvailableBalances(address[],address[])"
+)[:4]
+GET_LOCKED_BALANCES_SELECTOR = keccak(text="getLockedBalances(address[])")[:4]
+
+
+def _encode_address_array(addresses: Sequence[HexOrBytes]) -> bytes:
+    padding = bytes(WORD_SIZE - 20)
+    return len(addresses).to_bytes(WORD_SIZE, "big") + b"".join(
+        padding + address_to_bytes(address) for address in addresses
+    )
+
+
+def encode_get_available_balances(
+    tokens: Sequence[HexOrBytes], users: Sequence[HexOrBytes]
+) -> bytes:
+    """encode_get_available_balances builds the calldata of getAvailableBalances"""
+    tokens_array = _encode_address_array(tokens)
+    return (
+        GET_AVAILABLE_BALANCES_SELECTOR
+        + (2 * WORD_SIZE).to_bytes(WORD_SIZE, "big")
+        + (2 * WORD_SIZE + len(tokens_array)).to_bytes(WORD_SIZE, "big")
+        + tokens_array
+        + _encode_address_array(users)
+    )
+
+
+def decode_uint256_array(data: bytes) -> List[int]:
+    """decode_uint256_array decodes a returned uint256[]"""
+    offset = int.from_bytes(data[:WORD_SIZE], "big")
+    length = int.from_bytes(data[offset : offset + WORD_SIZE], "big")
+    start = offset + WORD_SIZE
+    return [
+        int.from_bytes(data[i : i + WORD_SIZE], "big")
+        for i in range(start, start + length * WORD_SIZE, WORD_SIZE)
+    ]
+
+
+class BalanceClient:
+    """BalanceClient reads balances of many users in concurrent chunked calls
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        bridge (HexOrBytes): address of the bridge
+        chunk_size (int): pairs per eth_call, lowered when the node refuses a chunk
+        max_workers (int): concurrent eth_calls
+    """
+
+    def __init__(
+        self,
+        provider,
+        bridge: HexOrBytes,
+        chunk_size: int = 2_000,
+        max_workers: int = 8,
+    ) -> None:
+        self.provider = provider
+        self.bridge = "0x" + address_to_bytes(bridge).hex()
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def _call(self, data: bytes, block: int) -> bytes:
+        result = request(
+            self.provider,
+            "eth_call",
+            [{"to": self.bridge, "data": "0x" + data.hex()}, hex(block)],
+        )
+        return to_bytes(result)
+
+    def _call_chunk(
+        self, pairs: Sequence[Tuple[HexOrBytes, HexOrBytes]], block: int
+    ) -> List[int]:
+        tokens = [token for (token, user) in pairs]
+        users = [user for (token, user) in pairs]
+        try:
+            return decode_uint256_array(
+                self._call(encode_get_available_balances(tokens, users), block)
+            )
+        except REQUEST_ERRORS:
+            if len(pairs) == 1:
+                raise
+        half = len(pairs) // 2
+        self.chunk_size = min(self.chunk_size, half)
+        return self._call_chunk(pairs[:half], block) + self._call_chunk(
+            pairs[half:], block
+        )
+
+    def block_number(self) -> int:
+        return int(request(self.provider, "eth_blockNumber", []), 16)
+
+    def available_balances(
+        self,
+        pairs: Sequence[Tuple[HexOrBytes, HexOrBytes]],
+        block: Optional[int] = None,
+    ) -> List[int]:
+        """available_balances returns getAvailableBalance of every (token, user) pair
+
+        Args:
+            pairs (Sequence[Tuple[HexOrBytes, HexOrBytes]]): (token, user) pairs
+            block (Optional[int]): block to read at, the latest block by default
+
+        Returns:
+            List[int]: balances in the order of the pairs
+        """
+        if block is None:
+            block = self.block_number()
+        chunk_size = self.chunk_size
+        chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(self._call_chunk, chunks, [block] * len(chunks))
+            return [balance for chunk in results for balance in chunk]
+
+    def locked_balances(
+        self, tokens: Sequence[HexOrBytes], block: Optional[int] = None
+    ) -> List[int]:
+        """locked_balances returns getLockedBalance of every token in one call"""
+        if block is None:
+            block = self.block_number()
+        data = (
+            GET_LOCKED_BALANCES_SELECTOR
+            + WORD_SIZE.to_bytes(WORD_SIZE, "big")
+            + _encode_address_array(tokens)
+        )
+        return decode_uint256_array(self._call(data, block))
@@ -0,0 +1,105 @@
+"""Gas benchmark cells, baselines and regression checks.
+
+scripts/gas_benchmark.py records tx.gas_used of every bridge call it makes
+under a cell name such as
+
+    batchUpdateAvailableBalances/token=USDC/validators=10/users=100/repeated=0.5
+
+and compares the results with a JSON baseline of {cell: gas}. Gas on a local
+node is deterministic for the same contract and inputs, so any growth above
+the threshold is a regression of the contract, not noise.
+"""
+import json
+from typing import Dict, List, NamedTuple, Sequence, TypeVar
+
+DEFAULT_THRESHOLD = 0.02
+
+T = TypeVar("T")
+
+
+class GasChange(NamedTuple):
+    """GasChange is the gas of one cell in the baseline and in this run"""
+
+    cell: str
+    baseline: int
+    gas_used: int
+
+    @property
+    def ratio(self) -> float:
+        return self.gas_used / self.baseline - 1
+
+
+class Comparison(NamedTuple):
+    """Comparison of benchmark results with a baseline"""
+
+    regressions: List[GasChange]
+    improvements: List[GasChange]
+    new_cells: List[str]
+    missing_cells: List[str]
+
+
+def cell_name(operation: str, **params) -> str:
+    """cell_name builds the name of a benchmark cell, parameters in given order"""
+    return "/".join([operation] + [f"{key}={value}" for key, value in params.items()])
+
+
+def repeated_users(
+    unique_users: Sequence[T], users: int, repeated_ratio: float
+) -> List[T]:
+    """repeated_users builds a batch of users where repeated_ratio of entries repeat
+
+    Args:
+        unique_users (Sequence[T]): distinct users to draw from
+        users (int): number of entries in the batch
+        repeated_ratio (float): share of entries that repeat an earlier user
+
+    Returns:
+        List[T]: deterministic batch, repeats spread evenly over the batch
+    """
+    distinct = max(1, users - int(users * repeated_ratio))
+    if distinct > len(unique_users):
+        raise ValueError(f"{distinct} distinct users needed")
+    return [unique_users[i % distinct] for i in range(users)]
+
+
+def load_baseline(path: str) -> Dict[str, int]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, int]) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    baseline: Dict[str, int],
+    results: Dict[str, int],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Comparison:
+    """compare checks every result against its baseline cell
+
+    Args:
+        baseline (Dict[str, int]): gas used per cell of the accepted run
+        results (Dict[str, int]): gas used per cell of this run
+        threshold (float): relative growth tolerated before a cell regresses
+
+    Returns:
+        Comparison: regressions and improvements beyond the threshold, sorted by
+            ratio, and cells only present on one side
+    """
+    regressions = []
+    improvements = []
+    for cell in sorted(baseline.keys() & results.keys()):
+        change = GasChange(cell, baseline[cell], results[cell])
+        if change.ratio > threshold:
+            regressions.append(change)
+        elif change.ratio < -threshold:
+            improvements.append(change)
+    return Comparison(
+        sorted(regressions, key=lambda change: change.ratio, reverse=True),
+        sorted(improvements, key=lambda change: change.ratio),
+        sorted(results.keys() - baseline.keys()),
+        sorted(baseline.keys() - results.keys()),
+    )
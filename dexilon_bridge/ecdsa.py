@@ -0,0 +1,109 @@
+"""Signer recovery with the rules of OpenZeppelin 4.8 ECDSA.recover(bytes32, bytes).
+
+Errors carry the same messages the contract reverts with, so off-chain checks
+report exactly what the chain would.
+
+Compact EIP-2098 signatures are r || vs, where vs is s with the parity of v
+in its top bit. ECDSA.recover(bytes32, bytes32, bytes32) expands them back to
+(v, r, s), so they recover exactly like the 65-byte signature they came from.
+
+Recovery uses libsecp256k1 through coincurve when it is installed and falls
+back to eth_keys otherwise; the validity rules are checked here either way.
+"""
+from eth_keys import keys
+
+try:
+    # native libsecp256k1, an order of magnitude faster than pure python eth_keys
+    from coincurve import PublicKey
+except ImportError:
+    PublicKey = None
+
+try:
+    # several times faster than the pycryptodome backend of eth_utils
+    from sha3 import keccak_256
+
+    def keccak(data: bytes) -> bytes:
+        return keccak_256(data).digest()
+
+except ImportError:
+    from eth_utils import keccak
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+SECP256K1_HALF_N = 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF5D576E7357A4501DDFE92F46681B20A0
+
+SIGNATURE_LENGTH = 65
+COMPACT_SIGNATURE_LENGTH = 64
+
+
+class ECDSAError(ValueError):
+    """ECDSAError is raised where ECDSA.recover reverts, with its revert message"""
+
+
+def recover(eth_hash: bytes, signature: bytes) -> bytes:
+    """recover returns the signer of an eth-signed digest like ECDSA.recover
+
+    Args:
+        eth_hash (bytes): digest returned by eth_signed_hash
+        signature (bytes): 65-byte r || s || v signature
+
+    Raises:
+        ECDSAError: with the ECDSA revert message for invalid signatures
+
+    Returns:
+        bytes: 20-byte address of the signer
+    """
+    if len(signature) != SIGNATURE_LENGTH:
+        raise ECDSAError("ECDSA: invalid signature length")
+
+    r = int.from_bytes(signature[0:32], "big")
+    s = int.from_bytes(signature[32:64], "big")
+    v = signature[64]
+
+    if s > SECP256K1_HALF_N:
+        raise ECDSAError("ECDSA: invalid signature 's' value")
+    # ecrecover precompile returns address(0) for any of these
+    if v not in (27, 28) or not 0 < r < SECP256K1_N or s == 0:
+        raise ECDSAError("ECDSA: invalid signature")
+
+    if PublicKey is not None:
+        try:
+            public_key = PublicKey.from_signature_and_message(
+                signature[:64] + bytes([v - 27]), eth_hash, hasher=None
+            )
+        except Exception:
+            raise ECDSAError("ECDSA: invalid signature")
+        return keccak(public_key.format(compressed=False)[1:])[12:]
+
+    try:
+        public_key = keys.Signature(vrs=(v - 27, r, s)).recover_public_key_from_msg_hash(
+            eth_hash
+        )
+    except Exception:
+        raise ECDSAError("ECDSA: invalid signature")
+    return public_key.to_canonical_address()
+
+
+def to_compact(signature: bytes) -> bytes:
+    """to_compact converts a 65-byte r || s || v signature to 64-byte EIP-2098 r || vs
+
+    Raises:
+        ECDSAError: if the signature has no compact form (length, high s or v)
+    """
+    if len(signature) != SIGNATURE_LENGTH:
+        raise ECDSAError("ECDSA: invalid signature length")
+    s = int.from_bytes(signature[32:64], "big")
+    v = signature[64]
+    if s > SECP256K1_HALF_N:
+        raise ECDSAError("ECDSA: invalid signature 's' value")
+    if v not in (27, 28):
+        raise ECDSAError("ECDSA: invalid signature")
+    return signature[0:32] + (s | (v - 27) << 255).to_bytes(32, "big")
+
+
+def from_compact(compact: bytes) -> bytes:
+    """from_compact expands a 64-byte r || vs signature the way ECDSA.recover(hash, r, vs) does"""
+    if len(compact) != COMPACT_SIGNATURE_LENGTH:
+        raise ECDSAError("ECDSA: invalid signature length")
+    vs = int.from_bytes(compact[32:64], "big")
+    s = vs & ((1 << 255) - 1)
+    return compact[0:32] + s.to_bytes(32, "big") + bytes([(vs >> 255) + 27])
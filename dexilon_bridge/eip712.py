@@ -0,0 +1,51 @@
+"""EIP712 domain separator of the bridge, as EIP712._domainSeparatorV4 builds it."""
+from functools import lru_cache
+
+from eth_utils import keccak
+
+from .encoding import HexOrBytes, address_to_bytes
+
+DOMAIN_TYPE_HASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+
+DOMAIN_SEPARATOR_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=DOMAIN_SEPARATOR_CACHE_SIZE)
+def _domain_separator(
+    name: str, version: str, chain_id: int, contract_address: bytes
+) -> bytes:
+    return keccak(
+        DOMAIN_TYPE_HASH
+        + keccak(text=name)
+        + keccak(text=version)
+        + chain_id.to_bytes(32, "big")
+        + contract_address.rjust(32, b"\x00")
+    )
+
+
+def domain_separator(
+    name: str, version: str, chain_id: int, verifying_contract: HexOrBytes
+) -> bytes:
+    """domain_separator builds the domain separator of a bridge deployment
+
+    Results are memoized per (name, version, chainId, address) in a bounded
+    LRU cache; checksum, lowercase and raw addresses share one entry.
+
+    Args:
+        name (str): name of the project
+        version (str): version of the project
+        chain_id (int): chain id of the blockchain
+        verifying_contract (HexOrBytes): address of the contract in the blockchain
+
+    Returns:
+        bytes: bytes32 domain separator
+    """
+    return _domain_separator(
+        name, version, chain_id, address_to_bytes(verifying_contract)
+    )
+
+
+domain_separator.cache_info = _domain_separator.cache_info
+domain_separator.cache_clear = _domain_separator.cache_clear
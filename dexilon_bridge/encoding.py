@@ -0,0 +1,346 @@
+"""Packed encoding of bridge batches, mirroring abi.encodePacked in bridge.sol.
+
+abi.encodePacked pads every array element to 32 bytes, so the packed batch
+has a fixed layout that is written straight into one preallocated buffer:
+
+    domainSeparator (32) | token (20) | users (32 * n) | balances (32 * n) | batchId (32)
+
+Merkle root commitments are tagged so they can never hash like a batch:
+
+    domainSeparator (32) | MERKLE_ROOT_TAG (32) | token (20) | root (32) | total (32) | batchId (32)
+
+Packed batches carry one 32-byte entry per user, the address followed by a
+uint96 balance update, and validators sign a tagged hash of the payload:
+
+    domainSeparator (32) | PACKED_BATCH_TAG (32) | token (20) | keccak256(payload) (32) | batchId (32)
+
+A multi-token batch is signed once for several tokens, each token contributing
+the hash of its packed token (20) | users (32 * n) | balances (32 * n):
+
+    domainSeparator (32) | MULTI_TOKEN_BATCH_TAG (32) | token hash (32 * tokens) | batchId (32)
+
+A batch settled with batchUpdateAvailableBalancesWithPayout is signed together
+with its payout flag, so the submitting validator cannot choose it:
+
+    domainSeparator (32) | PAYOUT_BATCH_TAG (32) | batch hash (32) | payout (1)
+"""
+from typing import List, Sequence, Tuple, Union
+
+from eth_utils import keccak
+
+HexOrBytes = Union[str, bytes]
+
+BATCH_HEADER_SIZE = 32 + 20
+WORD_SIZE = 32
+ADDRESS_SIZE = 20
+PACKED_AMOUNT_SIZE = WORD_SIZE - ADDRESS_SIZE
+MAX_PACKED_AMOUNT = 2 ** (8 * PACKED_AMOUNT_SIZE) - 1
+
+MERKLE_ROOT_TAG = keccak(b"DexilonBridge.MerkleRoot")
+PACKED_BATCH_TAG = keccak(b"DexilonBridge.PackedBatch")
+MULTI_TOKEN_BATCH_TAG = keccak(b"DexilonBridge.MultiTokenBatch")
+PAYOUT_BATCH_TAG = keccak(b"DexilonBridge.PayoutBatch")
+
+
+def to_bytes(value: HexOrBytes) -> bytes:
+    """to_bytes converts a hex string (with or without 0x) or bytes to bytes"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if value[:2] in ("0x", "0X"):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+def address_to_bytes(address: HexOrBytes) -> bytes:
+    """address_to_bytes converts a hex or raw address to its 20 bytes"""
+    if isinstance(address, (bytes, bytearray)):
+        raw = bytes(address)
+    else:
+        raw = bytes.fromhex(address[2:] if address[:2] in ("0x", "0X") else address)
+    if len(raw) != ADDRESS_SIZE:
+        raise ValueError(f"Invalid address length: {address!r}")
+    return raw
+
+
+def encode_batch(
+    domain_separator: HexOrBytes,
+    token: HexOrBytes,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+    batch_id: int,
+) -> bytearray:
+    """encode_batch packs a batch the way getHashForBatch does
+
+    Args:
+        domain_separator (HexOrBytes): EIP712 domain separator of the bridge
+        token (HexOrBytes): address of the supported token
+        users (Sequence[HexOrBytes]): addresses of the users to be updated
+        balance_updates (Sequence[int]): additive balance updates for the users
+        batch_id (int): unique id of the batch
+
+    Returns:
+        bytearray: abi.encodePacked(domainSeparator, token, users, balances, batchId)
+    """
+    users_length = len(users)
+    if users_length != len(balance_updates):
+        raise ValueError("Lists length do not match!")
+
+    buffer = bytearray(BATCH_HEADER_SIZE + 2 * WORD_SIZE * users_length + WORD_SIZE)
+    view = memoryview(buffer)
+
+    separator = to_bytes(domain_separator)
+    if len(separator) != WORD_SIZE:
+        raise ValueError("Domain separator must be 32 bytes")
+    view[0:32] = separator
+    view[32:BATCH_HEADER_SIZE] = address_to_bytes(token)
+    offset = _write_updates(view, BATCH_HEADER_SIZE, users, balance_updates)
+    view[offset:] = batch_id.to_bytes(WORD_SIZE, "big")
+    return buffer
+
+
+def _write_updates(
+    view: memoryview,
+    offset: int,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+) -> int:
+    # addresses are left padded with zeros, the buffer is already zeroed;
+    # the memoryview rejects raw addresses that are not exactly 20 bytes
+    address_offset = offset + WORD_SIZE - ADDRESS_SIZE
+    for user in users:
+        view[address_offset : address_offset + ADDRESS_SIZE] = (
+            user if type(user) is bytes else address_to_bytes(user)
+        )
+        address_offset += WORD_SIZE
+
+    offset += WORD_SIZE * len(users)
+    for amount in balance_updates:
+        view[offset : offset + WORD_SIZE] = amount.to_bytes(WORD_SIZE, "big")
+        offset += WORD_SIZE
+    return offset
+
+
+def hash_batch(
+    domain_separator: HexOrBytes,
+    token: HexOrBytes,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+    batch_id: int,
+) -> bytes:
+    """hash_batch builds the hash signed by validators, as getHashForBatch does
+
+    Returns:
+        bytes: keccak256 of the packed batch
+    """
+    return keccak(
+        encode_batch(domain_separator, token, users, balance_updates, batch_id)
+    )
+
+
+def hash_payout_batch(
+    domain_separator: HexOrBytes,
+    token: HexOrBytes,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+    batch_id: int,
+    payout: bool,
+) -> bytes:
+    """hash_payout_batch builds the hash signed for batchUpdateAvailableBalancesWithPayout
+
+    Returns:
+        bytes: keccak256 of the tagged batch hash and payout flag
+    """
+    return keccak(
+        to_bytes(domain_separator)
+        + PAYOUT_BATCH_TAG
+        + hash_batch(domain_separator, token, users, balance_updates, batch_id)
+        + bytes([bool(payout)])
+    )
+
+
+def hash_token_updates(
+    token: HexOrBytes,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+) -> bytes:
+    """hash_token_updates hashes the updates of one token of a multi-token batch
+
+    Returns:
+        bytes: keccak256(abi.encodePacked(token, users, balances))
+    """
+    users_length = len(users)
+    if users_length != len(balance_updates):
+        raise ValueError("Lists length do not match!")
+
+    buffer = bytearray(ADDRESS_SIZE + 2 * WORD_SIZE * users_length)
+    view = memoryview(buffer)
+    view[0:ADDRESS_SIZE] = address_to_bytes(token)
+    _write_updates(view, ADDRESS_SIZE, users, balance_updates)
+    return keccak(buffer)
+
+
+def hash_multi_token_batch(
+    domain_separator: HexOrBytes,
+    tokens: Sequence[HexOrBytes],
+    users: Sequence[Sequence[HexOrBytes]],
+    balance_updates: Sequence[Sequence[int]],
+    batch_id: int,
+) -> bytes:
+    """hash_multi_token_batch builds the hash signed by validators, as getHashForMultiTokenBatch does
+
+    Args:
+        domain_separator (HexOrBytes): EIP712 domain separator of the bridge
+        tokens (Sequence[HexOrBytes]): addresses of the supported tokens
+        users (Sequence[Sequence[HexOrBytes]]): users to be updated, per token
+        balance_updates (Sequence[Sequence[int]]): additive balance updates, per token
+        batch_id (int): unique id of the batch
+
+    Returns:
+        bytes: keccak256 of the packed commitment
+    """
+    if not len(tokens) == len(users) == len(balance_updates):
+        raise ValueError("Lists length do not match!")
+    separator = to_bytes(domain_separator)
+    if len(separator) != WORD_SIZE:
+        raise ValueError("Domain separator must be 32 bytes")
+    return keccak(
+        b"".join(
+            (
+                separator,
+                MULTI_TOKEN_BATCH_TAG,
+                *(
+                    hash_token_updates(token, token_users, token_updates)
+                    for token, token_users, token_updates in zip(
+                        tokens, users, balance_updates
+                    )
+                ),
+                batch_id.to_bytes(WORD_SIZE, "big"),
+            )
+        )
+    )
+
+
+def hash_merkle_root(
+    domain_separator: HexOrBytes,
+    token: HexOrBytes,
+    merkle_root: HexOrBytes,
+    cumulative_total: int,
+    batch_id: int,
+) -> bytes:
+    """hash_merkle_root builds the hash signed by validators, as getHashForMerkleRoot does
+
+    Args:
+        domain_separator (HexOrBytes): EIP712 domain separator of the bridge
+        token (HexOrBytes): address of the supported token
+        merkle_root (HexOrBytes): root of the cumulative balances tree
+        cumulative_total (int): sum of cumulative amounts of all leaves
+        batch_id (int): unique id of the batch
+
+    Returns:
+        bytes: keccak256 of the packed commitment
+    """
+    separator = to_bytes(domain_separator)
+    root = to_bytes(merkle_root)
+    if len(separator) != WORD_SIZE or len(root) != WORD_SIZE:
+        raise ValueError("Domain separator and merkle root must be 32 bytes")
+    return keccak(
+        b"".join(
+            (
+                separator,
+                MERKLE_ROOT_TAG,
+                address_to_bytes(token),
+                root,
+                cumulative_total.to_bytes(WORD_SIZE, "big"),
+                batch_id.to_bytes(WORD_SIZE, "big"),
+            )
+        )
+    )
+
+
+def encode_packed_updates(
+    users: Sequence[HexOrBytes], balance_updates: Sequence[int]
+) -> bytearray:
+    """encode_packed_updates builds the packedUpdates argument of batchUpdateAvailableBalancesPacked
+
+    Args:
+        users (Sequence[HexOrBytes]): addresses of the users to be updated
+        balance_updates (Sequence[int]): additive balance updates, each below 2**96
+
+    Returns:
+        bytearray: address (20) | uint96 amount (12) per user
+    """
+    users_length = len(users)
+    if users_length != len(balance_updates):
+        raise ValueError("Lists length do not match!")
+
+    buffer = bytearray(WORD_SIZE * users_length)
+    view = memoryview(buffer)
+    offset = 0
+    for user, amount in zip(users, balance_updates):
+        if not 0 <= amount <= MAX_PACKED_AMOUNT:
+            raise ValueError(f"Balance update does not fit uint96: {amount}")
+        view[offset : offset + ADDRESS_SIZE] = (
+            user if type(user) is bytes else address_to_bytes(user)
+        )
+        view[offset + ADDRESS_SIZE : offset + WORD_SIZE] = amount.to_bytes(
+            PACKED_AMOUNT_SIZE, "big"
+        )
+        offset += WORD_SIZE
+    return buffer
+
+
+def decode_packed_updates(
+    packed_updates: HexOrBytes,
+) -> Tuple[List[bytes], List[int]]:
+    """decode_packed_updates splits packedUpdates into users and balance updates
+
+    Returns:
+        Tuple[List[bytes], List[int]]: raw 20-byte users and their balance updates
+    """
+    payload = to_bytes(packed_updates)
+    if len(payload) % WORD_SIZE:
+        raise ValueError("Invalid packed updates!")
+    users = [
+        payload[i : i + ADDRESS_SIZE] for i in range(0, len(payload), WORD_SIZE)
+    ]
+    balance_updates = [
+        int.from_bytes(payload[i + ADDRESS_SIZE : i + WORD_SIZE], "big")
+        for i in range(0, len(payload), WORD_SIZE)
+    ]
+    return users, balance_updates
+
+
+def hash_packed_batch(
+    domain_separator: HexOrBytes,
+    token: HexOrBytes,
+    packed_updates: HexOrBytes,
+    batch_id: int,
+) -> bytes:
+    """hash_packed_batch builds the hash signed by validators, as getHashForPackedBatch does
+
+    Args:
+        domain_separator (HexOrBytes): EIP712 domain separator of the bridge
+        token (HexOrBytes): address of the supported token
+        packed_updates (HexOrBytes): payload built by encode_packed_updates
+        batch_id (int): unique id of the batch
+
+    Returns:
+        bytes: keccak256 of the packed commitment
+    """
+    separator = to_bytes(domain_separator)
+    payload = to_bytes(packed_updates)
+    if len(separator) != WORD_SIZE:
+        raise ValueError("Domain separator must be 32 bytes")
+    if len(payload) % WORD_SIZE:
+        raise ValueError("Invalid packed updates!")
+    return keccak(
+        b"".join(
+            (
+                separator,
+                PACKED_BATCH_TAG,
+                address_to_bytes(token),
+                keccak(payload),
+                batch_id.to_bytes(WORD_SIZE, "big"),
+            )
+        )
+    )
@@ -0,0 +1,359 @@
+"""Indexer of DexilonBridge_v10 events into a local SQLite store.
+
+Logs are fetched with raw eth_getLogs requests through provider.make_request,
+which skips the web3 result formatters, and decoded by slicing the hex topics
+and data against precomputed topic hashes. Block ranges adapt to the node:
+a range that fails (too many results, response too large) is halved, and a
+range that returns few logs is doubled. Every range is stored together with
+the checkpoint in one transaction, so an interrupted sync resumes where it
+stopped and never stores a log twice.
+
+Blocks within `confirmations` of the head are left for a later sync. The
+checkpoint keeps the hash of its block, and a sync that finds a different
+block at that height drops the last `reorg_depth` blocks of events and
+indexes them again from the new chain.
+
+Every row keeps the address of the bridge that emitted it, so one store can
+index several deployments: rewinds and queries only touch the rows of their
+contract.
+"""
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from eth_utils import keccak
+
+from .rpc import REQUEST_ERRORS, request
+
+
+def _topic(signature: str) -> str:
+    return "0x" + keccak(text=signature).hex()
+
+
+DEPOSIT_TOPIC = _topic("Deposit(address,address,uint256,uint256)")
+WITHDRAW_TOPIC = _topic("Withdraw(address,address,uint256,uint256)")
+BATCH_RECORDED_TOPIC = _topic("BatchRecorded(uint256,address,address,uint256)")
+MERKLE_ROOT_RECORDED_TOPIC = _topic(
+    "MerkleRootRecorded(uint256,address,bytes32,uint256,address,uint256)"
+)
+
+# uint256 values are kept as decimal TEXT, SQLite integers are 64-bit
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposits (
+    contract TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    depositor TEXT NOT NULL,
+    token TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (contract, block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS deposits_user ON deposits (contract, depositor, token);
+CREATE TABLE IF NOT EXISTS withdrawals (
+    contract TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    depositor TEXT NOT NULL,
+    token TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (contract, block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS withdrawals_user ON withdrawals (contract, depositor, token);
+CREATE TABLE IF NOT EXISTS batches (
+    contract TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    received_from TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    merkle_root TEXT,
+    cumulative_total TEXT,
+    PRIMARY KEY (contract, block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS batches_id ON batches (contract, batch_id, token);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    contract TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT
+);
+"""
+
+_INSERTS = {
+    "deposits": "INSERT OR IGNORE INTO deposits VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "withdrawals": "INSERT OR IGNORE INTO withdrawals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "batches": "INSERT OR IGNORE INTO batches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def _word(data: str, index: int) -> int:
+    # data is "0x" followed by 64 hex characters per word
+    return int(data[2 + 64 * index : 66 + 64 * index], 16)
+
+
+def _address_word(data: str, index: int) -> str:
+    return "0x" + data[26 + 64 * index : 66 + 64 * index]
+
+
+def decode_log(log: Dict[str, Any]) -> Optional[Tuple[str, tuple]]:
+    """decode_log turns a raw eth_getLogs entry into a (table, row) pair
+
+    Returns:
+        Optional[Tuple[str, tuple]]: None for logs of other events
+    """
+    topics = log["topics"]
+    topic = topics[0]
+    data = log["data"]
+    position = (
+        int(log["blockNumber"], 16),
+        int(log["logIndex"], 16),
+        log["transactionHash"],
+    )
+    if topic == DEPOSIT_TOPIC or topic == WITHDRAW_TOPIC:
+        return (
+            "deposits" if topic == DEPOSIT_TOPIC else "withdrawals",
+            position
+            + (
+                "0x" + topics[1][26:],
+                "0x" + topics[2][26:],
+                str(_word(data, 0)),
+                _word(data, 1),
+            ),
+        )
+    if topic == BATCH_RECORDED_TOPIC:
+        return (
+            "batches",
+            position
+            + (
+                str(int(topics[1], 16)),
+                "0x" + topics[2][26:],
+                _address_word(data, 0),
+                _word(data, 1),
+                None,
+                None,
+            ),
+        )
+    if topic == MERKLE_ROOT_RECORDED_TOPIC:
+        return (
+            "batches",
+            position
+            + (
+                str(int(topics[1], 16)),
+                "0x" + topics[2][26:],
+                _address_word(data, 2),
+                _word(data, 3),
+                "0x" + data[2:66],
+                str(_word(data, 1)),
+            ),
+        )
+    return None
+
+
+class EventStore:
+    """EventStore keeps decoded bridge events in SQLite
+
+    Args:
+        path (str): database file, ":memory:" for a temporary store
+    """
+
+    def __init__(self, path: str) -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def checkpoint(self, contract: str) -> Optional[int]:
+        """checkpoint returns the last block fully indexed for contract"""
+        row = self.connection.execute(
+            "SELECT block_number FROM checkpoint WHERE contract = ?",
+            (contract.lower(),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def checkpoint_hash(self, contract: str) -> Optional[str]:
+        """checkpoint_hash returns the hash of the checkpoint block, if known"""
+        row = self.connection.execute(
+            "SELECT block_hash FROM checkpoint WHERE contract = ?",
+            (contract.lower(),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def store(
+        self,
+        contract: str,
+        logs: Iterable[Dict[str, Any]],
+        to_block: int,
+        block_hash: Optional[str] = None,
+    ) -> int:
+        """store decodes logs of contract and moves its checkpoint atomically
+
+        Returns:
+            int: number of bridge events in logs
+        """
+        contract = contract.lower()
+        rows: Dict[str, List[tuple]] = {table: [] for table in _INSERTS}
+        for log in logs:
+            decoded = decode_log(log)
+            if decoded is not None:
+                rows[decoded[0]].append((contract,) + decoded[1])
+        with self.connection:
+            for table, table_rows in rows.items():
+                if table_rows:
+                    self.connection.executemany(_INSERTS[table], table_rows)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoint VALUES (?, ?, ?)",
+                (contract, to_block, block_hash),
+            )
+        return sum(len(table_rows) for table_rows in rows.values())
+
+    def rewind(
+        self, contract: str, to_block: int, block_hash: Optional[str] = None
+    ) -> int:
+        """rewind drops events of contract after to_block and moves its checkpoint back
+
+        Returns:
+            int: number of events dropped
+        """
+        contract = contract.lower()
+        dropped = 0
+        with self.connection:
+            for table in _INSERTS:
+                dropped += self.connection.execute(
+                    f"DELETE FROM {table} WHERE contract = ? AND block_number > ?",
+                    (contract, to_block),
+                ).rowcount
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoint VALUES (?, ?, ?)",
+                (contract, to_block, block_hash),
+            )
+        return dropped
+
+    def net_deposits(self, contract: str, depositor: str, token: str) -> int:
+        """net_deposits returns deposits minus withdrawals of a user for a token"""
+        contract, depositor, token = contract.lower(), depositor.lower(), token.lower()
+        totals = []
+        for table in ("deposits", "withdrawals"):
+            amounts = self.connection.execute(
+                f"SELECT amount FROM {table} "
+                "WHERE contract = ? AND depositor = ? AND token = ?",
+                (contract, depositor, token),
+            )
+            totals.append(sum(int(amount) for (amount,) in amounts))
+        return totals[0] - totals[1]
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class BridgeIndexer:
+    """BridgeIndexer syncs the events of one bridge into an EventStore
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        contract (str): address of the bridge
+        store (EventStore): store the events are written to
+        start_block (int): deployment block of the bridge
+        chunk_size (int): first block range size
+        max_chunk_size (int): largest block range requested
+        target_logs (int): logs per request above which ranges stop growing
+        confirmations (int): blocks behind the head left unindexed
+        reorg_depth (int): blocks indexed again when the checkpoint block was
+            reorganized away
+    """
+
+    def __init__(
+        self,
+        provider,
+        contract: str,
+        store: EventStore,
+        start_block: int = 0,
+        chunk_size: int = 2_000,
+        max_chunk_size: int = 100_000,
+        target_logs: int = 5_000,
+        confirmations: int = 12,
+        reorg_depth: int = 64,
+    ) -> None:
+        self.provider = provider
+        self.contract = contract.lower()
+        self.store = store
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_logs = target_logs
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+
+    def get_logs(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        return request(
+            self.provider,
+            "eth_getLogs",
+            [
+                {
+                    "address": self.contract,
+                    "fromBlock": hex(from_block),
+                    "toBlock": hex(to_block),
+                    "topics": [
+                        [
+                            DEPOSIT_TOPIC,
+                            WITHDRAW_TOPIC,
+                            BATCH_RECORDED_TOPIC,
+                            MERKLE_ROOT_RECORDED_TOPIC,
+                        ]
+                    ],
+                }
+            ],
+        )
+
+    def block_hash(self, block: int) -> str:
+        header = request(self.provider, "eth_getBlockByNumber", [hex(block), False])
+        return header["hash"]
+
+    def _check_reorg(self, checkpoint: int) -> int:
+        # returns the checkpoint to resume from, rewound if its block was replaced
+        stored_hash = self.store.checkpoint_hash(self.contract)
+        if stored_hash is None or stored_hash == self.block_hash(checkpoint):
+            return checkpoint
+        rewound = checkpoint - self.reorg_depth
+        if rewound < self.start_block:
+            self.store.rewind(self.contract, self.start_block - 1)
+            return self.start_block - 1
+        self.store.rewind(self.contract, rewound, self.block_hash(rewound))
+        return rewound
+
+    def sync(self, to_block: Optional[int] = None) -> int:
+        """sync indexes blocks after the checkpoint up to to_block or the safe head
+
+        Returns:
+            int: number of events stored
+        """
+        if to_block is None:
+            head = int(request(self.provider, "eth_blockNumber", []), 16)
+            to_block = head - self.confirmations
+        checkpoint = self.store.checkpoint(self.contract)
+        if checkpoint is not None:
+            checkpoint = self._check_reorg(checkpoint)
+        from_block = self.start_block if checkpoint is None else checkpoint + 1
+
+        stored = 0
+        while from_block <= to_block:
+            range_end = min(from_block + self.chunk_size - 1, to_block)
+            try:
+                logs = self.get_logs(from_block, range_end)
+            except REQUEST_ERRORS:
+                if range_end == from_block:
+                    raise
+                self.chunk_size = max(1, self.chunk_size // 2)
+                continue
+            stored += self.store.store(
+                self.contract, logs, range_end, self.block_hash(range_end)
+            )
+            if len(logs) < self.target_logs // 2:
+                self.chunk_size = min(self.chunk_size * 2, self.max_chunk_size)
+            elif len(logs) > self.target_logs:
+                self.chunk_size = max(1, self.chunk_size // 2)
+            from_block = range_end + 1
+        return stored
@@ -0,0 +1,182 @@
+"""Merkle trees of cumulative user balances for batchUpdateMerkleRoot.
+
+Leaves follow OpenZeppelin's StandardMerkleTree encoding,
+
+    keccak256(bytes.concat(keccak256(abi.encode(user, token, cumulativeAmount))))
+
+and pairs are hashed sorted, as MerkleProof.verify expects. The last node of
+an odd level is promoted unchanged. Nodes are written as 32-byte records to a
+temporary file, one level after the other, while the leaves are streamed in,
+and the file is memory-mapped for proofs: building the tree for 1M users
+keeps no Python object per user and only one chunk of nodes on the heap.
+"""
+import mmap
+import tempfile
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from .encoding import WORD_SIZE, HexOrBytes, address_to_bytes, to_bytes
+
+try:
+    # several times faster than the pycryptodome backend of eth_utils
+    from sha3 import keccak_256
+
+    def keccak(data: bytes) -> bytes:
+        return keccak_256(data).digest()
+
+except ImportError:
+    from eth_utils import keccak
+
+# nodes hashed per read/write of the tree file, must be even
+CHUNK_NODES = 1 << 14
+
+_ADDRESS_PADDING = bytes(WORD_SIZE - 20)
+
+
+def leaf_hash(user: HexOrBytes, token: HexOrBytes, cumulative_amount: int) -> bytes:
+    """leaf_hash returns the leaf withdrawWithProof builds for a user"""
+    return keccak(
+        keccak(
+            _ADDRESS_PADDING
+            + address_to_bytes(user)
+            + _ADDRESS_PADDING
+            + address_to_bytes(token)
+            + cumulative_amount.to_bytes(WORD_SIZE, "big")
+        )
+    )
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    """hash_pair hashes two nodes in sorted order, as MerkleProof does"""
+    return keccak(a + b if a < b else b + a)
+
+
+def verify(proof: Sequence[HexOrBytes], root: HexOrBytes, leaf: bytes) -> bool:
+    """verify mirrors MerkleProof.verify"""
+    computed = leaf
+    for node in proof:
+        computed = hash_pair(computed, to_bytes(node))
+    return computed == to_bytes(root)
+
+
+class MerkleTree:
+    """MerkleTree of (user, token, cumulativeAmount) leaves of one token
+
+    Args:
+        token (HexOrBytes): address of the supported token
+        leaves (Iterable[Tuple[HexOrBytes, int]]): (user, cumulative amount) pairs,
+            consumed once; leaf i is the i-th pair
+    """
+
+    def __init__(
+        self, token: HexOrBytes, leaves: Iterable[Tuple[HexOrBytes, int]]
+    ) -> None:
+        self.token = address_to_bytes(token)
+        self.cumulative_total = 0
+        # (offset, nodes) of every level in the tree file, leaves first
+        self._levels: List[Tuple[int, int]] = []
+        self._file = tempfile.TemporaryFile()
+        try:
+            self._write_leaves(leaves)
+            while self._levels[-1][1] > 1:
+                self._write_parents(*self._levels[-1])
+            self._file.flush()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _write_leaves(self, leaves: Iterable[Tuple[HexOrBytes, int]]) -> None:
+        token_word = _ADDRESS_PADDING + self.token
+        chunk = bytearray(CHUNK_NODES * WORD_SIZE)
+        count = 0
+        total = 0
+        offset = 0
+        for user, amount in leaves:
+            user = user if type(user) is bytes else address_to_bytes(user)
+            if len(user) != 20:
+                raise ValueError(f"Invalid address length: {user!r}")
+            chunk[offset : offset + WORD_SIZE] = keccak(
+                keccak(
+                    _ADDRESS_PADDING
+                    + user
+                    + token_word
+                    + amount.to_bytes(WORD_SIZE, "big")
+                )
+            )
+            total += amount
+            count += 1
+            offset += WORD_SIZE
+            if offset == len(chunk):
+                self._file.write(chunk)
+                offset = 0
+        if not count:
+            raise ValueError("Merkle tree needs at least one leaf")
+        self._file.write(memoryview(chunk)[:offset])
+        self._levels.append((0, count))
+        self.cumulative_total = total
+
+    def _write_parents(self, offset: int, count: int) -> None:
+        parents_offset = offset + count * WORD_SIZE
+        write_offset = parents_offset
+        for start in range(0, count, CHUNK_NODES):
+            nodes = min(CHUNK_NODES, count - start)
+            self._file.seek(offset + start * WORD_SIZE)
+            chunk = self._file.read(nodes * WORD_SIZE)
+            parents = bytearray((nodes + 1) // 2 * WORD_SIZE)
+            position = 0
+            for i in range(0, nodes * WORD_SIZE - WORD_SIZE, 2 * WORD_SIZE):
+                a = chunk[i : i + WORD_SIZE]
+                b = chunk[i + WORD_SIZE : i + 2 * WORD_SIZE]
+                parents[position : position + WORD_SIZE] = keccak(
+                    a + b if a < b else b + a
+                )
+                position += WORD_SIZE
+            if nodes % 2:
+                parents[position:] = chunk[-WORD_SIZE:]
+            self._file.seek(write_offset)
+            self._file.write(parents)
+            write_offset += len(parents)
+        self._levels.append((parents_offset, (count + 1) // 2))
+
+    def __len__(self) -> int:
+        return self._levels[0][1]
+
+    @property
+    def root(self) -> bytes:
+        """root returns the merkle root signed by validators"""
+        offset = self._levels[-1][0]
+        return self._map[offset : offset + WORD_SIZE]
+
+    def leaf(self, index: int) -> bytes:
+        """leaf returns the hash of leaf index"""
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range")
+        return self._map[index * WORD_SIZE : (index + 1) * WORD_SIZE]
+
+    def proof(self, index: int) -> List[bytes]:
+        """proof returns the proof argument of withdrawWithProof for leaf index"""
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range")
+        proof = []
+        for offset, count in self._levels[:-1]:
+            sibling = index ^ 1
+            if sibling < count:
+                start = offset + sibling * WORD_SIZE
+                proof.append(self._map[start : start + WORD_SIZE])
+            index >>= 1
+        return proof
+
+    def proofs(self) -> Iterator[List[bytes]]:
+        """proofs yields the proof of every leaf in leaf order"""
+        for index in range(len(self)):
+            yield self.proof(index)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "MerkleTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,79 @@
+"""Netting of settlement deltas before batches are built.
+
+Every repeated user in a batch makes batchUpdateAvailableBalances pay for one
+more calldata entry and one more SSTORE. Deltas are summed per (token, user)
+in plain dicts of ints and the users are sorted by address, so every
+validator builds byte-identical batches from the same settlement window.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from eth_utils import to_checksum_address
+
+from .encoding import HexOrBytes
+from .planner import GasModel
+
+
+class NettedBatch(NamedTuple):
+    """NettedBatch holds the netted updates of one token"""
+
+    token: str
+    users: List[str]
+    balance_updates: List[int]
+    entries: int
+    gas_saved: int
+
+
+def _key(address: HexOrBytes) -> str:
+    return address.lower() if type(address) is str else "0x" + bytes(address).hex()
+
+
+def net_updates(
+    updates: Iterable[Tuple[HexOrBytes, HexOrBytes, int]], model: GasModel
+) -> Dict[str, NettedBatch]:
+    """net_updates sums (token, user, delta) entries per token and user
+
+    Deltas may be negative as long as the net update of every user is not,
+    since batch updates are additive uint256 values. Users whose deltas net
+    to zero are left out.
+
+    Args:
+        updates (Iterable[Tuple[HexOrBytes, HexOrBytes, int]]): settlement deltas
+        model (GasModel): gas model fitted to the deployed bridge with
+            GasModel.fit, used to report the gas saved
+
+    Returns:
+        Dict[str, NettedBatch]: netted batch per checksum token address, users
+            sorted by address
+    """
+    totals: Dict[str, Dict[str, int]] = {}
+    entries: Dict[str, int] = {}
+    for token, user, amount in updates:
+        token = _key(token)
+        per_user = totals.get(token)
+        if per_user is None:
+            per_user = totals[token] = {}
+            entries[token] = 0
+        user = user.lower() if type(user) is str else _key(user)
+        per_user[user] = per_user.get(user, 0) + amount
+        entries[token] += 1
+
+    netted: Dict[str, NettedBatch] = {}
+    for token, per_user in totals.items():
+        users: List[str] = []
+        balance_updates: List[int] = []
+        for user in sorted(per_user):
+            amount = per_user[user]
+            if amount < 0:
+                raise ValueError(f"Negative net update for {user} in {token}")
+            if amount:
+                users.append(to_checksum_address(user))
+                balance_updates.append(amount)
+        repeated = entries[token] - len(per_user)
+        gas_saved = model.per_repeated_user * repeated + model.per_user * (
+            len(per_user) - len(users)
+        )
+        checksum_token = to_checksum_address(token)
+        netted[checksum_token] = NettedBatch(
+            checksum_token, users, balance_updates, entries[token], gas_saved
+        )
+    return netted
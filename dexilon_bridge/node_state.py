@@ -0,0 +1,111 @@
+"""Cache of prepared local node state.
+
+Deploying the tokens and the bridge, adding validators and making deposits
+costs the same dozens of transactions on every test run. NodeStateCache saves
+the state of the node after that setup with anvil_dumpState, next to whatever
+the setup returned (contract addresses, keys), and a later run boots into it
+with anvil_loadState instead of replaying the setup:
+
+    cache = NodeStateCache(web3.provider, "build/fixture-state", key)
+    data = cache.load()
+    if data is None:
+        data = prepare()
+        cache.save(data)
+
+The key must change whenever the state would: state_key hashes the compiled
+bytecode, the setup code and the node version. Stale files are never read,
+they only stay on disk until the directory is cleared. Ganache has no RPC to
+dump its state, against it load returns None and save does nothing.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional, Union
+
+from .rpc import RPCError, request
+
+STATE_CACHE_VERSION = 1
+
+
+def state_key(*parts: Union[str, bytes]) -> str:
+    """state_key hashes everything the prepared state depends on
+
+    Args:
+        parts (Union[str, bytes]): bytecode, source of the setup code, node
+            version, chain id, ...
+
+    Returns:
+        str: hex sha256 of the length-prefixed parts
+    """
+    digest = hashlib.sha256(STATE_CACHE_VERSION.to_bytes(4, "big"))
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class NodeStateCache:
+    """NodeStateCache dumps and loads the state of a local anvil node
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        directory (str): directory of the state files, created on save
+        key (str): state_key of the prepared state
+    """
+
+    def __init__(self, provider, directory: str, key: str) -> None:
+        self.provider = provider
+        self.directory = directory
+        self.key = key
+        self._supported: Optional[bool] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.key}.json")
+
+    @property
+    def supported(self) -> bool:
+        """supported tells whether the node can dump and load its state"""
+        if self._supported is None:
+            try:
+                version = request(self.provider, "web3_clientVersion", [])
+            except RPCError:
+                version = ""
+            self._supported = str(version).lower().startswith("anvil")
+        return self._supported
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """load boots the node into the saved state
+
+        Returns:
+            Optional[Dict[str, Any]]: data saved with the state, None if there
+                is no state for the key or the node cannot load it
+        """
+        if not self.supported or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            saved = json.load(f)
+        request(self.provider, "anvil_loadState", [saved["state"]])
+        return saved["data"]
+
+    def save(self, data: Dict[str, Any]) -> bool:
+        """save dumps the current state of the node together with data
+
+        Args:
+            data (Dict[str, Any]): JSON serializable result of the setup
+
+        Returns:
+            bool: whether the state was saved
+        """
+        if not self.supported:
+            return False
+        state = request(self.provider, "anvil_dumpState", [])
+        os.makedirs(self.directory, exist_ok=True)
+        # concurrent shards may save the same key, never expose a partial file
+        partial = f"{self.path}.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump({"state": state, "data": data}, f)
+        os.replace(partial, self.path)
+        return True
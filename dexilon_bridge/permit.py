@@ -0,0 +1,128 @@
+"""EIP-2612 permits for depositWithPermit and depositWithPermits.
+
+A permit lets the bridge pull the deposit without a separate approve
+transaction. The token verifies it against its own EIP712 domain, built by
+eip712.domain_separator from the token name, version "1", the chain id and the
+token address for tokens based on OpenZeppelin ERC20Permit. The nonce is the
+token's nonces(owner) at the time the permit is submitted.
+
+A relayer collects PermitDeposit entries signed by many users and settles them
+in one depositWithPermits transaction:
+
+    deposits = [sign_permit_deposit(separator, bridge, user_key, token, amount, nonce, deadline)]
+    bridge.depositWithPermits(deposits)
+"""
+from typing import NamedTuple, Tuple
+
+from eth_keys import keys
+from eth_utils import keccak, to_checksum_address
+
+from .encoding import WORD_SIZE, HexOrBytes, address_to_bytes, to_bytes
+from .signing import sign_hash
+
+PERMIT_TYPE_HASH = keccak(
+    text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)"
+)
+
+EIP712_PREFIX = b"\x19\x01"
+
+
+class PermitDeposit(NamedTuple):
+    """PermitDeposit is one entry of depositWithPermits, in struct field order"""
+
+    depositor: str
+    token: str
+    amount: int
+    deadline: int
+    v: int
+    r: bytes
+    s: bytes
+
+
+def permit_hash(
+    token_domain_separator: HexOrBytes,
+    owner: HexOrBytes,
+    spender: HexOrBytes,
+    value: int,
+    nonce: int,
+    deadline: int,
+) -> bytes:
+    """permit_hash builds the EIP712 digest ERC20Permit.permit verifies
+
+    Args:
+        token_domain_separator (HexOrBytes): DOMAIN_SEPARATOR of the token
+        owner (HexOrBytes): account approving the tokens
+        spender (HexOrBytes): account allowed to spend them, the bridge
+        value (int): allowance in smallest units
+        nonce (int): nonces(owner) of the token
+        deadline (int): last timestamp the permit is valid at
+
+    Returns:
+        bytes: bytes32 digest to sign
+    """
+    struct_hash = keccak(
+        PERMIT_TYPE_HASH
+        + address_to_bytes(owner).rjust(WORD_SIZE, b"\x00")
+        + address_to_bytes(spender).rjust(WORD_SIZE, b"\x00")
+        + value.to_bytes(WORD_SIZE, "big")
+        + nonce.to_bytes(WORD_SIZE, "big")
+        + deadline.to_bytes(WORD_SIZE, "big")
+    )
+    return keccak(EIP712_PREFIX + to_bytes(token_domain_separator) + struct_hash)
+
+
+def sign_permit(
+    token_domain_separator: HexOrBytes,
+    spender: HexOrBytes,
+    private_key: HexOrBytes,
+    value: int,
+    nonce: int,
+    deadline: int,
+) -> Tuple[int, bytes, bytes]:
+    """sign_permit signs a permit with the key of its owner
+
+    Returns:
+        Tuple[int, bytes, bytes]: v, r and s arguments of permit
+    """
+    private_key = keys.PrivateKey(to_bytes(private_key))
+    signature = sign_hash(
+        private_key,
+        permit_hash(
+            token_domain_separator,
+            private_key.public_key.to_canonical_address(),
+            spender,
+            value,
+            nonce,
+            deadline,
+        ),
+    )
+    return (signature[64], signature[:32], signature[32:64])
+
+
+def sign_permit_deposit(
+    token_domain_separator: HexOrBytes,
+    bridge: HexOrBytes,
+    private_key: HexOrBytes,
+    token: HexOrBytes,
+    amount: int,
+    nonce: int,
+    deadline: int,
+) -> PermitDeposit:
+    """sign_permit_deposit signs a deposit of amount tokens to the bridge
+
+    Returns:
+        PermitDeposit: entry of the permitDeposits argument of depositWithPermits
+    """
+    (v, r, s) = sign_permit(
+        token_domain_separator, bridge, private_key, amount, nonce, deadline
+    )
+    depositor = keys.PrivateKey(to_bytes(private_key)).public_key
+    return PermitDeposit(
+        depositor.to_checksum_address(),
+        to_checksum_address(address_to_bytes(token)),
+        amount,
+        deadline,
+        v,
+        r,
+        s,
+    )
@@ -0,0 +1,151 @@
+"""Splitting large settlements into batches that fit under a gas ceiling.
+
+batchUpdateAvailableBalances gas grows linearly with users.length (see
+scripts/batch_cost.py), so a batch costs roughly
+
+    base + per_signature * signatures + per_user * users
+         + per_repeated_user * repeated_users
+
+The default coefficients are upper bounds taken from the EIP-2929 gas
+schedule: every user is priced as a cold zero-to-nonzero SSTORE plus its
+calldata. They only serve as rough estimates; plan_batches takes the model
+explicitly, built with GasModel.fit() from the gas that scripts/batch_cost.py
+measures against the deployed contract.
+"""
+from typing import Iterable, List, Mapping, NamedTuple, Set, Tuple
+
+from .encoding import HexOrBytes
+
+
+class GasModel(NamedTuple):
+    """GasModel is a linear gas estimate for one batchUpdateAvailableBalances call"""
+
+    base: int = 80_000
+    per_user: int = 25_000
+    per_signature: int = 10_000
+    # a user already updated earlier in the same batch: warm nonzero SSTORE
+    # (2,900), 64 bytes of calldata (1,024) and the loop and hashing around them
+    per_repeated_user: int = 5_000
+
+    def estimate(self, users: int, signatures: int, repeated_users: int = 0) -> int:
+        """estimate returns the gas of a batch with given users and signatures"""
+        return (
+            self.base
+            + self.per_signature * signatures
+            + self.per_user * users
+            + self.per_repeated_user * repeated_users
+        )
+
+    @classmethod
+    def fit(
+        cls,
+        measurements: Mapping[int, int],
+        signatures: int,
+        per_signature: int = 10_000,
+        per_repeated_user: int = 5_000,
+    ) -> "GasModel":
+        """fit builds a model from {users: gas_used} measured at one validator count
+
+        Args:
+            measurements (Mapping[int, int]): gas used per number of users, as
+                printed by scripts/batch_cost.py
+            signatures (int): number of signatures the measured batches carried
+            per_signature (int): gas per signature, not observable at one
+                validator count
+            per_repeated_user (int): gas per repeated user, not observable with
+                distinct users
+
+        Returns:
+            GasModel: least squares fit, rounded up
+        """
+        if len(measurements) < 2:
+            raise ValueError("At least two measurements are needed")
+        count = len(measurements)
+        mean_users = sum(measurements) / count
+        mean_gas = sum(measurements.values()) / count
+        covariance = sum(
+            (users - mean_users) * (gas - mean_gas)
+            for users, gas in measurements.items()
+        )
+        variance = sum((users - mean_users) ** 2 for users in measurements)
+        per_user = covariance / variance
+        intercept = mean_gas - per_user * mean_users
+        # keep the model an upper bound of every measurement
+        intercept += max(
+            gas - (intercept + per_user * users) for users, gas in measurements.items()
+        )
+        return cls(
+            base=max(0, int(intercept - per_signature * signatures) + 1),
+            per_user=int(per_user) + 1,
+            per_signature=per_signature,
+            per_repeated_user=per_repeated_user,
+        )
+
+
+DEFAULT_GAS_MODEL = GasModel()
+
+
+class SubBatch(NamedTuple):
+    """SubBatch holds the arguments of one batchUpdateAvailableBalances call"""
+
+    batch_id: int
+    users: List[HexOrBytes]
+    balance_updates: List[int]
+
+
+def _key(user: HexOrBytes) -> HexOrBytes:
+    return user.lower() if type(user) is str else bytes(user)
+
+
+def max_users_per_batch(gas_limit: int, signatures: int, model: GasModel) -> int:
+    """max_users_per_batch returns how many distinct users fit under gas_limit"""
+    return max(0, (gas_limit - model.estimate(0, signatures)) // model.per_user)
+
+
+def plan_batches(
+    updates: Iterable[Tuple[HexOrBytes, int]],
+    first_batch_id: int,
+    gas_limit: int,
+    signatures: int,
+    model: GasModel,
+) -> List[SubBatch]:
+    """plan_batches splits (user, balance update) pairs of one token into batches
+
+    A user already in the batch being filled is priced at per_repeated_user,
+    every other user at per_user.
+
+    Args:
+        updates (Iterable[Tuple[HexOrBytes, int]]): balance updates in submission order
+        first_batch_id (int): batch id of the first batch, the next ones are consecutive
+        gas_limit (int): gas ceiling of every batch transaction
+        signatures (int): number of validator signatures sent with every batch
+        model (GasModel): gas model of the deployed contract, from GasModel.fit
+
+    Returns:
+        List[SubBatch]: batches with consecutive batch ids
+    """
+    if max_users_per_batch(gas_limit, signatures, model) == 0:
+        raise ValueError(f"Gas limit {gas_limit} does not fit a single user")
+    budget = gas_limit - model.estimate(0, signatures)
+
+    batches: List[SubBatch] = []
+    users: List[HexOrBytes] = []
+    balance_updates: List[int] = []
+    seen: Set[HexOrBytes] = set()
+    gas = 0
+    for user, amount in updates:
+        key = _key(user)
+        cost = model.per_repeated_user if key in seen else model.per_user
+        if gas + cost > budget:
+            batches.append(
+                SubBatch(first_batch_id + len(batches), users, balance_updates)
+            )
+            users, balance_updates, seen = [], [], set()
+            gas, cost = 0, model.per_user
+        users.append(user)
+        balance_updates.append(amount)
+        seen.add(key)
+        gas += cost
+    if users:
+        batches.append(SubBatch(first_batch_id + len(batches), users, balance_updates))
+    return batches
@@ -0,0 +1,43 @@
+"""Raw JSON-RPC requests through a web3 provider.
+
+provider.make_request exists on every web3 provider and returns the decoded
+JSON response without running web3's result formatters.
+"""
+from typing import Any
+
+import requests
+
+
+class RPCError(Exception):
+    """RPCError is raised for an error response of the node"""
+
+
+# a node behind a gateway refuses oversized requests with an HTTP error status,
+# a timeout or a dropped connection instead of a JSON-RPC error, so callers
+# that shrink the request on failure catch all of them
+REQUEST_ERRORS = (
+    RPCError,
+    requests.HTTPError,
+    requests.Timeout,
+    requests.ConnectionError,
+)
+
+
+def request(provider, method: str, params: list) -> Any:
+    """request sends one JSON-RPC request and returns its result
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        method (str): JSON-RPC method
+        params (list): JSON-RPC params
+
+    Raises:
+        RPCError: with the error object of the response
+
+    Returns:
+        Any: result of the response
+    """
+    response = provider.make_request(method, params)
+    if "error" in response:
+        raise RPCError(response["error"])
+    return response["result"]
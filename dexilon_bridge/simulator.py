@@ -0,0 +1,538 @@
+"""In-memory model of DexilonBridge_v10 for validating batches without a node.
+
+State is kept the way the contract stores it: available balances include the
++1 sentinel written on first deposit, and batch ids are recorded per token.
+Every check raises BridgeRevert with the contract's revert message, in the
+same order as the contract performs it.
+"""
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple, Union
+
+from .ecdsa import ECDSAError, recover
+from .eip712 import domain_separator
+from .encoding import (
+    HexOrBytes,
+    address_to_bytes,
+    decode_packed_updates,
+    hash_batch,
+    hash_merkle_root,
+    hash_multi_token_batch,
+    hash_packed_batch,
+    hash_payout_batch,
+    to_bytes,
+)
+from .merkle import leaf_hash, verify
+from .signing import eth_signed_hash, split_compact_signatures
+from .validators import ValidatorBitmap, count_bits
+
+UINT256_MAX = 2 ** 256 - 1
+
+
+class BridgeRevert(Exception):
+    """BridgeRevert is raised where the contract would revert"""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _address(address: HexOrBytes) -> bytes:
+    return address if type(address) is bytes else address_to_bytes(address)
+
+
+class BridgeSimulator:
+    """BridgeSimulator mirrors the state and batch rules of DexilonBridge_v10
+
+    Args:
+        name (str): name the bridge was deployed with
+        version (str): version the bridge was deployed with
+        chain_id (int): chain id of the blockchain
+        contract_address (HexOrBytes): address of the bridge
+    """
+
+    def __init__(
+        self, name: str, version: str, chain_id: int, contract_address: HexOrBytes
+    ) -> None:
+        self.domain_separator = domain_separator(
+            name, version, chain_id, contract_address
+        )
+        self.paused = False
+        self.supported_tokens: List[bytes] = []
+        # token => index in supported_tokens + 1
+        self.supported_token_slots: Dict[bytes, int] = {}
+        # token => user => balance, including the +1 sentinel
+        self.users_available_balances: Dict[bytes, Dict[bytes, int]] = {}
+        self.locked_balances: Dict[bytes, int] = {}
+        self.validators = ValidatorBitmap()
+        # (batchId, token)
+        self.recorded_batches: Set[Tuple[int, bytes]] = set()
+        # token => (merkle root, cumulative total)
+        self.merkle_roots: Dict[bytes, Tuple[bytes, int]] = {}
+        # token => user => claimed cumulative amount
+        self.claimed_amounts: Dict[bytes, Dict[bytes, int]] = {}
+
+    # ------------------------------------------------------------ admin
+
+    def set_supported_token(self, token: HexOrBytes, is_supported: bool) -> None:
+        self.set_supported_tokens([token], [is_supported])
+
+    def set_supported_tokens(
+        self, tokens: Sequence[HexOrBytes], is_supported: Sequence[bool]
+    ) -> None:
+        """set_supported_tokens applies every change or none, like the transaction"""
+        if len(tokens) != len(is_supported):
+            raise BridgeRevert("Lists length do not match!")
+        tokens = [_address(token) for token in tokens]
+        if bytes(20) in tokens:
+            raise BridgeRevert("Zero token address!")
+
+        slots = self.supported_token_slots
+        for token, supported in zip(tokens, is_supported):
+            slot = slots.get(token, 0)
+            if supported and not slot:
+                self.supported_tokens.append(token)
+                slots[token] = len(self.supported_tokens)
+            if not supported and slot:
+                last_token = self.supported_tokens.pop()
+                if last_token != token:
+                    self.supported_tokens[slot - 1] = last_token
+                    slots[last_token] = slot
+                del slots[token]
+
+    def add_validators(self, new_validators: Iterable[HexOrBytes]) -> None:
+        try:
+            self.validators.add(new_validators)
+        except ValueError as e:
+            raise BridgeRevert(str(e))
+
+    def remove_validators(self, retired_validators: Iterable[HexOrBytes]) -> None:
+        self.validators.remove(retired_validators)
+
+    # ------------------------------------------------------------ users
+
+    def deposit(self, sender: HexOrBytes, token: HexOrBytes, amount: int) -> None:
+        sender, token = _address(sender), _address(token)
+        if self.paused:
+            raise BridgeRevert("Pausable: paused")
+        if token not in self.supported_token_slots:
+            raise BridgeRevert("Token not supported!")
+        balances = self.users_available_balances.setdefault(token, {})
+        if not balances.get(sender):
+            balances[sender] = 1
+        self.locked_balances[token] = self.locked_balances.get(token, 0) + amount
+
+    def withdraw(self, sender: HexOrBytes, token: HexOrBytes) -> int:
+        sender, token = _address(sender), _address(token)
+        if self.paused:
+            raise BridgeRevert("Pausable: paused")
+        balances = self.users_available_balances.get(token, {})
+        withdraw_amount = balances.get(sender, 0)
+        if withdraw_amount <= 1:
+            raise BridgeRevert("No balance!")
+        balances[sender] = 1
+        return withdraw_amount - 1
+
+    def withdraw_many(
+        self, sender: HexOrBytes, tokens: Sequence[HexOrBytes]
+    ) -> Dict[bytes, int]:
+        """withdraw_many withdraws every token with an available balance
+
+        Returns:
+            Dict[bytes, int]: token => amount withdrawn, in the order of the Withdraw events
+        """
+        sender = _address(sender)
+        if self.paused:
+            raise BridgeRevert("Pausable: paused")
+        withdrawn: Dict[bytes, int] = {}
+        for token in tokens:
+            token = _address(token)
+            balances = self.users_available_balances.get(token, {})
+            withdraw_amount = balances.get(sender, 0)
+            if withdraw_amount > 1:
+                balances[sender] = 1
+                withdrawn[token] = withdraw_amount - 1
+        if not withdrawn:
+            raise BridgeRevert("No balance!")
+        return withdrawn
+
+    def withdraw_with_proof(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        cumulative_amount: int,
+        proof: Sequence[HexOrBytes],
+    ) -> int:
+        sender, token = _address(sender), _address(token)
+        if self.paused:
+            raise BridgeRevert("Pausable: paused")
+        root = self.merkle_roots.get(token, (bytes(32), 0))[0]
+        if not verify(proof, root, leaf_hash(sender, token, cumulative_amount)):
+            raise BridgeRevert("Invalid proof!")
+        claimed = self.claimed_amounts.setdefault(token, {})
+        if cumulative_amount < claimed.get(sender, 0):
+            raise BridgeRevert("Cumulative amount decreased!")
+        withdraw_amount = cumulative_amount - claimed.get(sender, 0)
+        balances = self.users_available_balances.get(token, {})
+        available_balance = balances.get(sender, 0)
+        if available_balance > 1:
+            withdraw_amount += available_balance - 1
+        if withdraw_amount == 0:
+            raise BridgeRevert("No balance!")
+        claimed[sender] = cumulative_amount
+        if available_balance > 1:
+            balances[sender] = 1
+        return withdraw_amount
+
+    def get_available_balance(self, token: HexOrBytes, user: HexOrBytes) -> int:
+        balance = self.users_available_balances.get(_address(token), {}).get(
+            _address(user), 0
+        )
+        return balance - 1 if balance else 0
+
+    def get_locked_balance(self, token: HexOrBytes) -> int:
+        return self.locked_balances.get(_address(token), 0)
+
+    # ------------------------------------------------------------ batches
+
+    def count_verified_signatures(
+        self, eth_hash: bytes, signatures: Union[Sequence[bytes], bytes]
+    ) -> int:
+        """count_verified_signatures counts signatures of active validators
+
+        Signers must be strictly ascending, so repeated signatures revert.
+        signatures is either a list of 65-byte signatures or one blob of 64-byte
+        compact signatures, as countVerifiedCompactSignatures takes them.
+        """
+        if isinstance(signatures, (bytes, bytearray)):
+            try:
+                signatures = split_compact_signatures(signatures)
+            except ValueError as e:
+                raise BridgeRevert(str(e))
+        signed_bitmap = 0
+        last_signer = bytes(20)
+        for signature in signatures:
+            try:
+                signer = recover(eth_hash, bytes(signature))
+            except ECDSAError as e:
+                raise BridgeRevert(str(e))
+            if signer <= last_signer:
+                raise BridgeRevert("Signers not in ascending order!")
+            last_signer = signer
+            slot = self.validators.slot(signer)
+            if slot is not None:
+                signed_bitmap |= 1 << slot
+        return count_bits(signed_bitmap)
+
+    def check_batch(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Union[Sequence[bytes], bytes],
+    ) -> Dict[bytes, int]:
+        """check_batch validates a batch without changing the state
+
+        Raises:
+            BridgeRevert: with the reason batchUpdateAvailableBalances reverts with
+
+        Returns:
+            Dict[bytes, int]: balance update per user address
+        """
+        return self._check_signed_batch(
+            sender,
+            token,
+            users,
+            balance_updates,
+            batch_id,
+            signatures,
+            lambda: hash_batch(
+                self.domain_separator, token, users, balance_updates, batch_id
+            ),
+        )
+
+    def _check_signed_batch(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Union[Sequence[bytes], bytes],
+        batch_hash: Callable[[], bytes],
+    ) -> Dict[bytes, int]:
+        token = _address(token)
+        if _address(sender) not in self.validators:
+            raise BridgeRevert("Only validator!")
+        if len(self.validators) <= 2:
+            raise BridgeRevert("Not enough validators!")
+        if (batch_id, token) in self.recorded_batches:
+            raise BridgeRevert("Batch already recorded!")
+        if len(users) != len(balance_updates):
+            raise BridgeRevert("Lists length do not match!")
+
+        eth_hash = eth_signed_hash(batch_hash())
+        verified = self.count_verified_signatures(eth_hash, signatures)
+        if (verified * 3) // len(self.validators) < 2:
+            raise BridgeRevert("Not enough signatures!")
+        return self._check_updates(token, users, balance_updates)
+
+    def check_packed_batch(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        packed_updates: HexOrBytes,
+        batch_id: int,
+        signatures: Sequence[bytes],
+    ) -> Dict[bytes, int]:
+        """check_packed_batch validates a packed batch without changing the state
+
+        Raises:
+            BridgeRevert: with the reason batchUpdateAvailableBalancesPacked reverts with
+
+        Returns:
+            Dict[bytes, int]: balance update per user address
+        """
+        token = _address(token)
+        if _address(sender) not in self.validators:
+            raise BridgeRevert("Only validator!")
+        if len(self.validators) <= 2:
+            raise BridgeRevert("Not enough validators!")
+        if (batch_id, token) in self.recorded_batches:
+            raise BridgeRevert("Batch already recorded!")
+        payload = to_bytes(packed_updates)
+        if len(payload) % 32:
+            raise BridgeRevert("Invalid packed updates!")
+
+        eth_hash = eth_signed_hash(
+            hash_packed_batch(self.domain_separator, token, payload, batch_id)
+        )
+        verified = self.count_verified_signatures(eth_hash, signatures)
+        if (verified * 3) // len(self.validators) < 2:
+            raise BridgeRevert("Not enough signatures!")
+        return self._check_updates(token, *decode_packed_updates(payload))
+
+    def check_multi_token_batch(
+        self,
+        sender: HexOrBytes,
+        tokens: Sequence[HexOrBytes],
+        users: Sequence[Sequence[HexOrBytes]],
+        balance_updates: Sequence[Sequence[int]],
+        batch_id: int,
+        signatures: Sequence[bytes],
+    ) -> Dict[bytes, Dict[bytes, int]]:
+        """check_multi_token_batch validates a multi-token batch without changing the state
+
+        Raises:
+            BridgeRevert: with the reason batchUpdateAvailableBalancesMultiToken reverts with
+
+        Returns:
+            Dict[bytes, Dict[bytes, int]]: balance update per user address, per token
+        """
+        if _address(sender) not in self.validators:
+            raise BridgeRevert("Only validator!")
+        if len(self.validators) <= 2:
+            raise BridgeRevert("Not enough validators!")
+        if not len(tokens) == len(users) == len(balance_updates):
+            raise BridgeRevert("Lists length do not match!")
+        tokens = [_address(token) for token in tokens]
+        for token, token_users, token_updates in zip(tokens, users, balance_updates):
+            if (batch_id, token) in self.recorded_batches:
+                raise BridgeRevert("Batch already recorded!")
+            if len(token_users) != len(token_updates):
+                raise BridgeRevert("Lists length do not match!")
+
+        eth_hash = eth_signed_hash(
+            hash_multi_token_batch(
+                self.domain_separator, tokens, users, balance_updates, batch_id
+            )
+        )
+        verified = self.count_verified_signatures(eth_hash, signatures)
+        if (verified * 3) // len(self.validators) < 2:
+            raise BridgeRevert("Not enough signatures!")
+
+        updates: Dict[bytes, Dict[bytes, int]] = {}
+        for token, token_users, token_updates in zip(tokens, users, balance_updates):
+            # a token listed twice finds its batch id already recorded
+            if token in updates:
+                raise BridgeRevert("Batch already recorded!")
+            updates[token] = self._check_updates(token, token_users, token_updates)
+        return updates
+
+    def _check_updates(
+        self,
+        token: bytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+    ) -> Dict[bytes, int]:
+        updates: Dict[bytes, int] = {}
+        get = updates.get
+        for user, amount in zip(users, balance_updates):
+            user = user if type(user) is bytes else address_to_bytes(user)
+            updates[user] = get(user, 0) + amount
+
+        balances = self.users_available_balances.get(token, {})
+        for user, amount in updates.items():
+            if balances.get(user, 0) + amount > UINT256_MAX:
+                raise BridgeRevert("Integer overflow")
+        updates_total = sum(updates.values())
+        if updates_total > UINT256_MAX:
+            raise BridgeRevert("Integer overflow")
+        if self.locked_balances.get(token, 0) < updates_total:
+            raise BridgeRevert("Not enough locked token!")
+        return updates
+
+    def batch_update_available_balances(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Union[Sequence[bytes], bytes],
+    ) -> None:
+        """batch_update_available_balances validates and applies a batch atomically"""
+        updates = self.check_batch(
+            sender, token, users, balance_updates, batch_id, signatures
+        )
+        self._apply_updates(_address(token), batch_id, updates)
+
+    def batch_update_available_balances_with_payout(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Sequence[bytes],
+        payout: bool,
+        rejected_users: Iterable[HexOrBytes] = (),
+    ) -> Dict[bytes, int]:
+        """batch_update_available_balances_with_payout applies a batch and pays the users out
+
+        Args:
+            rejected_users (Iterable[HexOrBytes]): users whose token transfer fails,
+                their balances stay available
+
+        Returns:
+            Dict[bytes, int]: user => amount paid out, in the order of the Withdraw events
+        """
+        token = _address(token)
+        updates = self._check_signed_batch(
+            sender,
+            token,
+            users,
+            balance_updates,
+            batch_id,
+            signatures,
+            lambda: hash_payout_batch(
+                self.domain_separator, token, users, balance_updates, batch_id, payout
+            ),
+        )
+        self._apply_updates(token, batch_id, updates)
+
+        paid: Dict[bytes, int] = {}
+        if not payout or self.paused:
+            return paid
+        rejected = {_address(user) for user in rejected_users}
+        balances = self.users_available_balances[token]
+        for user in users:
+            user = _address(user)
+            if balances.get(user, 0) > 1 and user not in rejected:
+                paid[user] = balances[user] - 1
+                balances[user] = 1
+        return paid
+
+    def batch_update_available_balances_compact(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: bytes,
+    ) -> None:
+        """batch_update_available_balances_compact applies a batch signed with a compact blob"""
+        self.batch_update_available_balances(
+            sender, token, users, balance_updates, batch_id, bytes(signatures)
+        )
+
+    def batch_update_available_balances_packed(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        packed_updates: HexOrBytes,
+        batch_id: int,
+        signatures: Sequence[bytes],
+    ) -> None:
+        """batch_update_available_balances_packed validates and applies a packed batch"""
+        updates = self.check_packed_batch(
+            sender, token, packed_updates, batch_id, signatures
+        )
+        self._apply_updates(_address(token), batch_id, updates)
+
+    def batch_update_available_balances_multi_token(
+        self,
+        sender: HexOrBytes,
+        tokens: Sequence[HexOrBytes],
+        users: Sequence[Sequence[HexOrBytes]],
+        balance_updates: Sequence[Sequence[int]],
+        batch_id: int,
+        signatures: Sequence[bytes],
+    ) -> None:
+        """batch_update_available_balances_multi_token validates and applies the updates of every token atomically"""
+        updates = self.check_multi_token_batch(
+            sender, tokens, users, balance_updates, batch_id, signatures
+        )
+        for token, token_updates in updates.items():
+            self._apply_updates(token, batch_id, token_updates)
+
+    def _apply_updates(
+        self, token: bytes, batch_id: int, updates: Dict[bytes, int]
+    ) -> None:
+        self.recorded_batches.add((batch_id, token))
+
+        balances = self.users_available_balances.setdefault(token, {})
+        get = balances.get
+        for user, amount in updates.items():
+            balances[user] = get(user, 0) + amount
+        self.locked_balances[token] = self.locked_balances.get(token, 0) - sum(
+            updates.values()
+        )
+
+    def batch_update_merkle_root(
+        self,
+        sender: HexOrBytes,
+        token: HexOrBytes,
+        merkle_root: bytes,
+        cumulative_total: int,
+        batch_id: int,
+        signatures: Sequence[bytes],
+    ) -> None:
+        """batch_update_merkle_root validates and records a merkle root commitment"""
+        token = _address(token)
+        if _address(sender) not in self.validators:
+            raise BridgeRevert("Only validator!")
+        if len(self.validators) <= 2:
+            raise BridgeRevert("Not enough validators!")
+        if (batch_id, token) in self.recorded_batches:
+            raise BridgeRevert("Batch already recorded!")
+        previous_total = self.merkle_roots.get(token, (bytes(32), 0))[1]
+        if cumulative_total < previous_total:
+            raise BridgeRevert("Cumulative total decreased!")
+
+        eth_hash = eth_signed_hash(
+            hash_merkle_root(
+                self.domain_separator, token, merkle_root, cumulative_total, batch_id
+            )
+        )
+        verified = self.count_verified_signatures(eth_hash, signatures)
+        if (verified * 3) // len(self.validators) < 2:
+            raise BridgeRevert("Not enough signatures!")
+
+        updates_total = cumulative_total - previous_total
+        if self.locked_balances.get(token, 0) < updates_total:
+            raise BridgeRevert("Not enough locked token!")
+        self.recorded_batches.add((batch_id, token))
+        self.locked_balances[token] = self.locked_balances.get(token, 0) - updates_total
+        self.merkle_roots[token] = (bytes(merkle_root), cumulative_total)
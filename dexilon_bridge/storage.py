@@ -0,0 +1,169 @@
+"""Direct reads of DexilonBridge_v10 storage with batched eth_getStorageAt.
+
+Storage layout of DexilonBridge_v10 is EIP712, Ownable, Pausable,
+ReentrancyGuard, then the contract's own variables (EIP712 keeps only
+immutables and constants take no slot):
+
+    0    Ownable._owner (bytes 0-19), Pausable._paused (byte 20)
+    1    ReentrancyGuard._status
+    2    supportedTokens
+    3    isTokenSupported
+    4    usersAvailableBalances       token => user => balance + 1
+    5    lockedBalances               token => amount
+    6    validators                   address[256], one slot per validator
+    262  validatorsCounter
+    263  validatorSlots
+    264  validatorsBitmap
+    265  isBatchIdRecorded
+    266  merkleRoots
+    267  merkleTotals
+    268  claimedAmounts
+    269  supportedTokenSlots          token => index in supportedTokens + 1
+
+Mapping values live at keccak256(key . slot). Slots are read as JSON-RPC
+batches pinned to one block, so no ABI encoding and no EVM execution is
+involved and every batch sees the same state.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import requests
+from eth_utils import keccak
+
+from .encoding import WORD_SIZE, HexOrBytes, address_to_bytes
+from .rpc import RPCError
+
+OWNER_SLOT = 0
+PAUSED_SLOT = 0
+STATUS_SLOT = 1
+SUPPORTED_TOKENS_SLOT = 2
+IS_TOKEN_SUPPORTED_SLOT = 3
+USERS_AVAILABLE_BALANCES_SLOT = 4
+LOCKED_BALANCES_SLOT = 5
+VALIDATORS_SLOT = 6
+VALIDATORS_COUNTER_SLOT = VALIDATORS_SLOT + 256
+VALIDATOR_SLOTS_SLOT = VALIDATORS_COUNTER_SLOT + 1
+VALIDATORS_BITMAP_SLOT = VALIDATORS_COUNTER_SLOT + 2
+IS_BATCH_ID_RECORDED_SLOT = VALIDATORS_COUNTER_SLOT + 3
+MERKLE_ROOTS_SLOT = VALIDATORS_COUNTER_SLOT + 4
+MERKLE_TOTALS_SLOT = VALIDATORS_COUNTER_SLOT + 5
+CLAIMED_AMOUNTS_SLOT = VALIDATORS_COUNTER_SLOT + 6
+SUPPORTED_TOKEN_SLOTS_SLOT = VALIDATORS_COUNTER_SLOT + 7
+
+
+def _address_key(address: HexOrBytes) -> bytes:
+    return bytes(WORD_SIZE - 20) + address_to_bytes(address)
+
+
+def mapping_slot(key: bytes, slot: int) -> int:
+    """mapping_slot returns the slot of mapping[key] for a 32-byte key"""
+    return int.from_bytes(keccak(key + slot.to_bytes(WORD_SIZE, "big")), "big")
+
+
+def available_balance_slot(token: HexOrBytes, user: HexOrBytes) -> int:
+    """available_balance_slot returns the slot of usersAvailableBalances[token][user]"""
+    token_slot = mapping_slot(_address_key(token), USERS_AVAILABLE_BALANCES_SLOT)
+    return mapping_slot(_address_key(user), token_slot)
+
+
+def locked_balance_slot(token: HexOrBytes) -> int:
+    """locked_balance_slot returns the slot of lockedBalances[token]"""
+    return mapping_slot(_address_key(token), LOCKED_BALANCES_SLOT)
+
+
+class StorageReader:
+    """StorageReader reads bridge storage slots in JSON-RPC batches
+
+    Args:
+        endpoint_uri (str): HTTP JSON-RPC endpoint of the node
+        bridge (HexOrBytes): address of the bridge
+        batch_size (int): eth_getStorageAt requests per HTTP request
+        max_workers (int): concurrent HTTP requests
+    """
+
+    def __init__(
+        self,
+        endpoint_uri: str,
+        bridge: HexOrBytes,
+        batch_size: int = 1_000,
+        max_workers: int = 4,
+    ) -> None:
+        self.endpoint_uri = endpoint_uri
+        self.bridge = "0x" + address_to_bytes(bridge).hex()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.session = requests.Session()
+
+    def _post(self, payload) -> object:
+        response = self.session.post(self.endpoint_uri, json=payload, timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    def block_number(self) -> int:
+        response = self._post(
+            {"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []}
+        )
+        if "error" in response:
+            raise RPCError(response["error"])
+        return int(response["result"], 16)
+
+    def _read_batch(self, slots: Sequence[int], block: str) -> List[int]:
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_getStorageAt",
+                "params": [self.bridge, hex(slot), block],
+            }
+            for i, slot in enumerate(slots)
+        ]
+        values = [0] * len(slots)
+        for response in self._post(payload):
+            if "error" in response:
+                raise RPCError(response["error"])
+            values[response["id"]] = int(response["result"], 16)
+        return values
+
+    def read_slots(
+        self, slots: Sequence[int], block: Optional[int] = None
+    ) -> List[int]:
+        """read_slots returns the raw values of slots at one block
+
+        Args:
+            slots (Sequence[int]): storage slots of the bridge
+            block (Optional[int]): block to read at, the latest block by default
+
+        Returns:
+            List[int]: slot values in the order of the slots
+        """
+        if block is None:
+            block = self.block_number()
+        size = self.batch_size
+        batches = [slots[i : i + size] for i in range(0, len(slots), size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                self._read_batch, batches, [hex(block)] * len(batches)
+            )
+            return [value for batch in results for value in batch]
+
+    def available_balances(
+        self,
+        pairs: Sequence[Tuple[HexOrBytes, HexOrBytes]],
+        block: Optional[int] = None,
+    ) -> List[int]:
+        """available_balances returns getAvailableBalance of every (token, user) pair"""
+        values = self.read_slots(
+            [available_balance_slot(token, user) for (token, user) in pairs], block
+        )
+        return [value - 1 if value else 0 for value in values]
+
+    def locked_balances(
+        self, tokens: Sequence[HexOrBytes], block: Optional[int] = None
+    ) -> List[int]:
+        """locked_balances returns getLockedBalance of every token"""
+        return self.read_slots([locked_balance_slot(token) for token in tokens], block)
+
+    def owner_and_paused(self, block: Optional[int] = None) -> Tuple[str, bool]:
+        """owner_and_paused decodes the packed Ownable and Pausable slot"""
+        (value,) = self.read_slots([OWNER_SLOT], block)
+        return "0x" + f"{value & (2 ** 160 - 1):040x}", bool(value >> 160 & 0xFF)
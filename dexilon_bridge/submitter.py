@@ -0,0 +1,344 @@
+"""Pipelined submission of batchUpdateAvailableBalances transactions.
+
+Scripts used to send one transaction and wait for its receipt before building
+the next one, which settles at most one batch per block. BatchSubmitter signs
+transactions locally with nonces from a NonceManager and keeps up to
+max_in_flight of them in the mempool at once:
+
+    submitter.submit(token, users, balances, batchId, signatures)   # never blocks
+    finished = submitter.poll()                                     # once per block
+
+poll collects receipts, and replaces every transaction that stayed unmined for
+stuck_blocks blocks with the same nonce and calldata at fees bumped by
+fee_bump (nodes require at least 10% for a replacement). reconcile reads
+BatchRecorded events: a batch recorded by any validator is final, and an own
+transaction still pending for it is replaced by a zero-value transfer to self,
+which frees the nonce without paying for the "Batch already recorded!" revert.
+
+All node access is raw JSON-RPC, so it works the same against a public node
+and a local anvil or ganache with automine off.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+try:
+    from eth_abi import encode
+except ImportError:
+    # eth-abi 2, as pinned by brownie
+    from eth_abi import encode_abi as encode
+
+from .encoding import HexOrBytes, address_to_bytes, to_bytes
+from .indexer import BATCH_RECORDED_TOPIC
+from .rpc import RPCError, request
+
+BATCH_UPDATE_TYPES = ["address", "address[]", "uint256[]", "uint256", "bytes[]"]
+BATCH_UPDATE_SELECTOR = keccak(
+    text=f"batchUpdateAvailableBalances({','.join(BATCH_UPDATE_TYPES)})"
+)[:4]
+
+TRANSFER_GAS = 21_000
+
+
+def encode_batch_update(
+    token: HexOrBytes,
+    users: Sequence[HexOrBytes],
+    balance_updates: Sequence[int],
+    batch_id: int,
+    signatures: Sequence[HexOrBytes],
+) -> bytes:
+    """encode_batch_update builds the calldata of batchUpdateAvailableBalances"""
+    return BATCH_UPDATE_SELECTOR + encode(
+        BATCH_UPDATE_TYPES,
+        [
+            address_to_bytes(token),
+            [address_to_bytes(user) for user in users],
+            list(balance_updates),
+            batch_id,
+            [to_bytes(signature) for signature in signatures],
+        ],
+    )
+
+
+class NonceManager:
+    """NonceManager hands out consecutive nonces without asking the node each time
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        address (HexOrBytes): account sending the transactions
+    """
+
+    def __init__(self, provider, address: HexOrBytes) -> None:
+        self.provider = provider
+        self.address = to_checksum_address(address_to_bytes(address))
+        self.next_nonce: Optional[int] = None
+
+    def transaction_count(self, block: str = "latest") -> int:
+        return int(
+            request(self.provider, "eth_getTransactionCount", [self.address, block]),
+            16,
+        )
+
+    def sync(self) -> None:
+        """sync moves past nonces used outside this manager"""
+        pending = self.transaction_count("pending")
+        self.next_nonce = max(self.next_nonce or 0, pending)
+
+    def allocate(self) -> int:
+        if self.next_nonce is None:
+            self.sync()
+        nonce = self.next_nonce
+        self.next_nonce += 1
+        return nonce
+
+
+class InFlight:
+    """InFlight is one nonce of the submitter and every transaction sent with it
+
+    Attributes:
+        hashes (List[str]): hashes of the original and replacement transactions
+        receipt (Optional[dict]): receipt of the transaction that was mined
+        cancelled (bool): replaced by a transfer to self after reconcile
+    """
+
+    def __init__(
+        self, nonce: int, token: bytes, batch_id: int, transaction: dict
+    ) -> None:
+        self.nonce = nonce
+        self.token = token
+        self.batch_id = batch_id
+        self.transaction = transaction
+        self.hashes: List[str] = []
+        self.sent_block = 0
+        self.receipt: Optional[dict] = None
+        self.cancelled = False
+
+    @property
+    def succeeded(self) -> bool:
+        return (
+            self.receipt is not None
+            and not self.cancelled
+            and int(self.receipt["status"], 16) == 1
+        )
+
+
+class BatchSubmitter:
+    """BatchSubmitter keeps several batch transactions of one validator in flight
+
+    Args:
+        provider: web3 provider, or any object with make_request(method, params)
+        bridge (HexOrBytes): address of the bridge
+        private_key (HexOrBytes): key of the validator sending the batches
+        max_in_flight (int): transactions pending at once
+        gas_limit (Optional[int]): gas of every batch, eth_estimateGas by default
+        fee_bump (float): relative fee increase of a replacement
+        stuck_blocks (int): blocks a transaction may stay unmined before replacement
+        priority_fee (Optional[int]): tip in wei, eth_maxPriorityFeePerGas by default
+    """
+
+    def __init__(
+        self,
+        provider,
+        bridge: HexOrBytes,
+        private_key: HexOrBytes,
+        max_in_flight: int = 8,
+        gas_limit: Optional[int] = None,
+        fee_bump: float = 0.125,
+        stuck_blocks: int = 3,
+        priority_fee: Optional[int] = None,
+    ) -> None:
+        self.provider = provider
+        self.bridge = to_checksum_address(address_to_bytes(bridge))
+        self.private_key = to_bytes(private_key)
+        self.account = Account.from_key(self.private_key)
+        self.nonces = NonceManager(provider, self.account.address)
+        self.chain_id = int(request(provider, "eth_chainId", []), 16)
+        self.max_in_flight = max_in_flight
+        self.gas_limit = gas_limit
+        self.fee_bump = fee_bump
+        self.stuck_blocks = stuck_blocks
+        self.priority_fee = priority_fee
+        # nonce => transaction not mined yet
+        self.in_flight: Dict[int, InFlight] = {}
+
+    @property
+    def has_capacity(self) -> bool:
+        return len(self.in_flight) < self.max_in_flight
+
+    def block_number(self) -> int:
+        return int(request(self.provider, "eth_blockNumber", []), 16)
+
+    def fees(self) -> Tuple[int, int]:
+        """fees returns (maxFeePerGas, maxPriorityFeePerGas) for a new transaction"""
+        block = request(self.provider, "eth_getBlockByNumber", ["latest", False])
+        base_fee = int(block.get("baseFeePerGas", "0x0"), 16)
+        priority_fee = self.priority_fee
+        if priority_fee is None:
+            priority_fee = int(
+                request(self.provider, "eth_maxPriorityFeePerGas", []), 16
+            )
+        return 2 * base_fee + priority_fee, priority_fee
+
+    def _send(self, in_flight: InFlight, transaction: dict) -> None:
+        signed = Account.sign_transaction(transaction, self.private_key)
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        tx_hash = "0x" + keccak(bytes(raw)).hex()
+        try:
+            request(self.provider, "eth_sendRawTransaction", ["0x" + bytes(raw).hex()])
+        except RPCError as e:
+            # a resend of a known transaction is harmless
+            if "already known" not in str(e):
+                raise
+        in_flight.transaction = transaction
+        in_flight.hashes.append(tx_hash)
+        in_flight.sent_block = self.block_number()
+
+    def submit(
+        self,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Sequence[HexOrBytes],
+    ) -> InFlight:
+        """submit sends a batch without waiting for earlier batches to be mined
+
+        Raises:
+            ValueError: if max_in_flight transactions are already pending
+            RPCError: if the node rejects the transaction
+
+        Returns:
+            InFlight: the pending transaction, finished ones are returned by poll
+        """
+        if not self.has_capacity:
+            raise ValueError("Too many transactions in flight")
+        data = encode_batch_update(token, users, balance_updates, batch_id, signatures)
+        (max_fee, priority_fee) = self.fees()
+        transaction = {
+            "type": 2,
+            "chainId": self.chain_id,
+            "to": self.bridge,
+            "value": 0,
+            "data": data,
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": priority_fee,
+        }
+        gas = self.gas_limit
+        if gas is None:
+            estimate = request(
+                self.provider,
+                "eth_estimateGas",
+                [
+                    {
+                        "from": self.account.address,
+                        "to": self.bridge,
+                        "data": "0x" + data.hex(),
+                    }
+                ],
+            )
+            gas = int(estimate, 16) * 6 // 5
+        transaction["gas"] = gas
+        transaction["nonce"] = self.nonces.allocate()
+
+        in_flight = InFlight(
+            transaction["nonce"], address_to_bytes(token), batch_id, transaction
+        )
+        try:
+            self._send(in_flight, transaction)
+        except RPCError:
+            # the nonce was never used, hand it out again
+            self.nonces.next_nonce = None
+            raise
+        self.in_flight[in_flight.nonce] = in_flight
+        return in_flight
+
+    def _bumped(self, transaction: dict) -> dict:
+        bump = 1 + self.fee_bump
+        (max_fee, priority_fee) = self.fees()
+        return dict(
+            transaction,
+            maxFeePerGas=max(math.ceil(transaction["maxFeePerGas"] * bump), max_fee),
+            maxPriorityFeePerGas=max(
+                math.ceil(transaction["maxPriorityFeePerGas"] * bump), priority_fee
+            ),
+        )
+
+    def replace(self, in_flight: InFlight) -> None:
+        """replace resends a pending transaction at bumped fees"""
+        self._send(in_flight, self._bumped(in_flight.transaction))
+
+    def cancel(self, in_flight: InFlight) -> None:
+        """cancel replaces a pending transaction by a zero-value transfer to self"""
+        transaction = dict(
+            self._bumped(in_flight.transaction),
+            to=self.account.address,
+            data=b"",
+            gas=TRANSFER_GAS,
+        )
+        in_flight.cancelled = True
+        self._send(in_flight, transaction)
+
+    def poll(self) -> List[InFlight]:
+        """poll collects receipts and replaces stuck transactions
+
+        Returns:
+            List[InFlight]: transactions mined since the last poll, in nonce order
+        """
+        block = self.block_number()
+        finished = []
+        for nonce in sorted(self.in_flight):
+            in_flight = self.in_flight[nonce]
+            for tx_hash in in_flight.hashes:
+                receipt = request(self.provider, "eth_getTransactionReceipt", [tx_hash])
+                if receipt is not None:
+                    in_flight.receipt = receipt
+                    in_flight.cancelled = (
+                        receipt["to"] or ""
+                    ).lower() != self.bridge.lower()
+                    break
+            if in_flight.receipt is not None:
+                finished.append(in_flight)
+            elif block - in_flight.sent_block >= self.stuck_blocks:
+                self.replace(in_flight)
+        for in_flight in finished:
+            del self.in_flight[in_flight.nonce]
+        return finished
+
+    def reconcile(
+        self, from_block: int, to_block: Optional[int] = None
+    ) -> Set[Tuple[int, bytes]]:
+        """reconcile cancels pending transactions of batches recorded by anyone
+
+        Args:
+            from_block (int): first block to read BatchRecorded events from
+            to_block (Optional[int]): last block, the latest block by default
+
+        Returns:
+            Set[Tuple[int, bytes]]: (batchId, token) of every batch recorded
+        """
+        logs = request(
+            self.provider,
+            "eth_getLogs",
+            [
+                {
+                    "address": self.bridge,
+                    "fromBlock": hex(from_block),
+                    "toBlock": "latest" if to_block is None else hex(to_block),
+                    "topics": [BATCH_RECORDED_TOPIC],
+                }
+            ],
+        )
+        recorded = {
+            (int(log["topics"][1], 16), bytes.fromhex(log["topics"][2][26:]))
+            for log in logs
+        }
+        mined_hashes = {log["transactionHash"] for log in logs}
+        for in_flight in list(self.in_flight.values()):
+            if (in_flight.batch_id, in_flight.token) not in recorded:
+                continue
+            if in_flight.cancelled or mined_hashes.intersection(in_flight.hashes):
+                continue
+            self.cancel(in_flight)
+        return recorded
@@ -0,0 +1,122 @@
+"""Off-chain mirror of the DexilonBridge_v10 validator slots and bitmap.
+
+Every active validator occupies one of 256 slots and bit i of the bitmap is
+set while slot i is taken. New validators take the lowest free slot, so
+replaying addValidators/removeValidators or loading getValidatorsBitmap and
+getActiveValidators gives the same slots as the contract, and quorum can be
+checked without calls.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from .encoding import HexOrBytes, address_to_bytes
+
+MAX_VALIDATORS = 256
+FULL_BITMAP = 2 ** MAX_VALIDATORS - 1
+
+
+def _address(address: HexOrBytes) -> bytes:
+    return address if type(address) is bytes else address_to_bytes(address)
+
+
+def count_bits(bitmap: int) -> int:
+    """count_bits returns the number of set bits"""
+    return bin(bitmap).count("1")
+
+
+class ValidatorBitmap:
+    """ValidatorBitmap holds validator slots the way the contract assigns them"""
+
+    def __init__(self) -> None:
+        self.bitmap = 0
+        self._validators: List[Optional[bytes]] = [None] * MAX_VALIDATORS
+        # validator => slot
+        self._slots: Dict[bytes, int] = {}
+
+    @classmethod
+    def from_state(
+        cls, bitmap: int, active_validators: Iterable[HexOrBytes]
+    ) -> "ValidatorBitmap":
+        """from_state loads getValidatorsBitmap() and getActiveValidators()
+
+        Args:
+            bitmap (int): bitmap of occupied slots
+            active_validators (Iterable[HexOrBytes]): active validators, ordered by slot
+
+        Returns:
+            ValidatorBitmap: validators assigned to the set bits in ascending order
+        """
+        registry = cls()
+        remaining = bitmap
+        for validator in map(_address, active_validators):
+            if not remaining:
+                raise ValueError("More validators than set bits")
+            slot = (remaining & -remaining).bit_length() - 1
+            remaining &= remaining - 1
+            registry._validators[slot] = validator
+            registry._slots[validator] = slot
+        if remaining:
+            raise ValueError("Less validators than set bits")
+        registry.bitmap = bitmap
+        return registry
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, validator: HexOrBytes) -> bool:
+        return _address(validator) in self._slots
+
+    @property
+    def validators(self) -> List[bytes]:
+        """validators returns active validators ordered by slot, as getActiveValidators"""
+        return [self._validators[slot] for slot in sorted(self._slots.values())]
+
+    def slot(self, validator: HexOrBytes) -> Optional[int]:
+        """slot returns the slot of an active validator or None"""
+        return self._slots.get(_address(validator))
+
+    def add(self, new_validators: Iterable[HexOrBytes]) -> None:
+        """add mirrors addValidators, raising ValueError with its revert reasons
+
+        Nothing is added if any validator is rejected, as the transaction reverts.
+        """
+        bitmap = self.bitmap
+        added: Dict[bytes, int] = {}
+        for validator in map(_address, new_validators):
+            if validator == bytes(20):
+                raise ValueError("Cannot be zero address!")
+            if validator in self._slots or validator in added:
+                continue
+            free = ~bitmap & FULL_BITMAP
+            if not free:
+                raise ValueError("Too many validators!")
+            slot = (free & -free).bit_length() - 1
+            bitmap |= 1 << slot
+            added[validator] = slot
+
+        self.bitmap = bitmap
+        for validator, slot in added.items():
+            self._validators[slot] = validator
+            self._slots[validator] = slot
+
+    def remove(self, retired_validators: Iterable[HexOrBytes]) -> None:
+        """remove mirrors removeValidators"""
+        for validator in map(_address, retired_validators):
+            slot = self._slots.pop(validator, None)
+            if slot is not None:
+                self._validators[slot] = None
+                self.bitmap &= ~(1 << slot)
+
+    def signed_bitmap(self, signers: Iterable[HexOrBytes]) -> int:
+        """signed_bitmap returns the bitmap of slots of active validators among signers"""
+        signed = 0
+        for signer in map(_address, signers):
+            slot = self._slots.get(signer)
+            if slot is not None:
+                signed |= 1 << slot
+        return signed
+
+    def has_quorum(self, signers: Iterable[HexOrBytes]) -> bool:
+        """has_quorum checks the 2/3 quorum of batchUpdateAvailableBalances"""
+        if not self._slots:
+            return False
+        return (count_bits(self.signed_bitmap(signers)) * 3) // len(self) >= 2
@@ -0,0 +1,172 @@
+"""Off-chain quorum check of collected validator signatures.
+
+SignatureVerifier tells a validator, before it submits a batch, whether
+countVerifiedSignatures would reach the (verified * 3) / validatorsCounter >= 2
+quorum, and otherwise which message the contract would revert with. Signers
+are recovered with the rules of ecdsa.recover, natively when coincurve is
+installed. Large sets of signatures are recovered in chunks on a thread pool,
+since libsecp256k1 runs without the GIL. Recovered signers and recovery errors
+are kept in an LRU keyed by (digest, signature), so re-checking a batch as
+more signatures arrive only recovers the new ones.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .ecdsa import ECDSAError, recover
+from .encoding import HexOrBytes, address_to_bytes, hash_batch
+from .signing import eth_signed_hash, split_compact_signatures
+
+# fewer signatures than this are recovered in the calling thread
+PARALLEL_MIN_SIGNATURES = 64
+
+
+class Verdict(NamedTuple):
+    """Verdict of the contract on a set of signatures
+
+    signers are the recovered addresses in signature order, up to the
+    signature the contract would revert at. reason is the revert message,
+    None if the signatures reach the quorum.
+    """
+
+    signers: List[bytes]
+    verified: int
+    required: int
+    reason: Optional[str]
+
+    @property
+    def has_quorum(self) -> bool:
+        return self.reason is None
+
+
+def required_signatures(validators_count: int) -> int:
+    """required_signatures is the smallest count with (count * 3) / validators >= 2"""
+    return (2 * validators_count + 2) // 3
+
+
+class SignatureVerifier:
+    """SignatureVerifier checks signatures against a set of active validators
+
+    Args:
+        validators (Iterable[HexOrBytes]): active validators of the bridge
+        cache_size (int): recovered (digest, signature) pairs kept in the LRU
+        max_workers (int): threads recovering large sets of signatures
+    """
+
+    def __init__(
+        self,
+        validators: Iterable[HexOrBytes],
+        cache_size: int = 65_536,
+        max_workers: int = 4,
+    ) -> None:
+        self.set_validators(validators)
+        self.max_workers = max_workers
+        self._recover = lru_cache(maxsize=cache_size)(self._recover_uncached)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def set_validators(self, validators: Iterable[HexOrBytes]) -> None:
+        """set_validators replaces the active validators, the cache stays valid"""
+        self.validators = frozenset(address_to_bytes(v) for v in validators)
+
+    @staticmethod
+    def _recover_uncached(
+        eth_hash: bytes, signature: bytes
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        try:
+            return recover(eth_hash, signature), None
+        except ECDSAError as e:
+            return None, str(e)
+
+    def _recover_chunk(
+        self, eth_hash: bytes, signatures: Sequence[bytes]
+    ) -> List[Tuple[Optional[bytes], Optional[str]]]:
+        recover_cached = self._recover
+        return [recover_cached(eth_hash, signature) for signature in signatures]
+
+    def recover_signers(
+        self, eth_hash: bytes, signatures: Sequence[bytes]
+    ) -> List[Tuple[Optional[bytes], Optional[str]]]:
+        """recover_signers recovers every signature, in parallel for large sets
+
+        Returns:
+            List[Tuple[Optional[bytes], Optional[str]]]: (signer, None) or
+                (None, ECDSA revert message) per signature
+        """
+        signatures = [bytes(signature) for signature in signatures]
+        if len(signatures) < PARALLEL_MIN_SIGNATURES:
+            return self._recover_chunk(eth_hash, signatures)
+        size = -(-len(signatures) // self.max_workers)
+        chunks = [signatures[i : i + size] for i in range(0, len(signatures), size)]
+        results = self._executor.map(
+            self._recover_chunk, [eth_hash] * len(chunks), chunks
+        )
+        return [result for chunk in results for result in chunk]
+
+    def verify(
+        self, eth_hash: bytes, signatures: Union[Sequence[bytes], bytes]
+    ) -> Verdict:
+        """verify checks signatures the way countVerifiedSignatures does
+
+        Args:
+            eth_hash (bytes): digest returned by eth_signed_hash
+            signatures (Union[Sequence[bytes], bytes]): 65-byte signatures, or one
+                blob of 64-byte compact signatures
+
+        Returns:
+            Verdict: recovered signers, verified count and revert reason
+        """
+        validators_count = len(self.validators)
+        required = required_signatures(validators_count)
+        if validators_count <= 2:
+            return Verdict([], 0, required, "Not enough validators!")
+        if isinstance(signatures, (bytes, bytearray)):
+            try:
+                signatures = split_compact_signatures(signatures)
+            except ValueError as e:
+                return Verdict([], 0, required, str(e))
+
+        signers = []
+        verified = 0
+        last_signer = bytes(20)
+        for signer, error in self.recover_signers(eth_hash, signatures):
+            if error is not None:
+                return Verdict(signers, verified, required, error)
+            if signer <= last_signer:
+                return Verdict(
+                    signers, verified, required, "Signers not in ascending order!"
+                )
+            last_signer = signer
+            signers.append(signer)
+            if signer in self.validators:
+                verified += 1
+
+        if (verified * 3) // validators_count < 2:
+            return Verdict(signers, verified, required, "Not enough signatures!")
+        return Verdict(signers, verified, required, None)
+
+    def verify_batch(
+        self,
+        domain_separator: HexOrBytes,
+        token: HexOrBytes,
+        users: Sequence[HexOrBytes],
+        balance_updates: Sequence[int],
+        batch_id: int,
+        signatures: Union[Sequence[bytes], bytes],
+    ) -> Verdict:
+        """verify_batch checks signatures collected for batchUpdateAvailableBalances"""
+        eth_hash = eth_signed_hash(
+            hash_batch(domain_separator, token, users, balance_updates, batch_id)
+        )
+        return self.verify(eth_hash, signatures)
+
+    def cache_info(self):
+        return self._recover.cache_info()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self) -> "SignatureVerifier":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
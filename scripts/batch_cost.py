@@ -8,8 +8,15 @@ from dotenv import load_dotenv
 import random
 from uuid import uuid4
 import time
+import json
 from hexbytes import HexBytes
 
+from dexilon_bridge.eip712 import domain_separator
+from dexilon_bridge.planner import GasModel
+from dexilon_bridge.signing import sign_batch
+
+MODEL_PATH = "reports/gas_model.json"
+
 
 def main():
     network.priority_fee("1 gwei")
@@ -30,21 +37,10 @@ def main():
         project_name, project_version, {"from": accounts[0]}
     )
     # Build domain separator
-    local_name_hash = Web3.keccak(text=project_name).hex()
-    version_hash = Web3.keccak(text=project_version).hex()
-    type_hash = Web3.keccak(
-        text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
-    ).hex()
     chainid = 1337
-    local_abiencode = (
-        str(type_hash)
-        + str(local_name_hash).replace("0x", "")
-        + str(version_hash).replace("0x", "")
-        + str((chainid).to_bytes(32, byteorder="big").hex()).replace("0x", "")
-        + "0" * 24
-        + str(dexilon_bridge.address).lower().replace("0x", "")
+    domainSeparator = domain_separator(
+        project_name, project_version, chainid, dexilon_bridge.address
     )
-    domainSeparator = Web3.keccak(HexBytes(local_abiencode)).hex()
 
     # keys from Truffle Develop
     private_keys = [
@@ -88,19 +84,15 @@ def main():
     batch_users[0] = accounts[0].address
 
     batchId = 101
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
     )
 
-    signatures = []
-    for pk in private_keys:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -118,24 +110,15 @@ def main():
     gas_results = {}
     for number_of_users in withdraw_test_array:
         batchId = number_of_users
-        base_message = Web3.solidityKeccak(
-            ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-            [
-                usdc_token.address,
-                batch_users[:number_of_users],
-                batch_balances[:number_of_users],
-                batchId,
-            ],
+        signatures = sign_batch(
+            domainSeparator,
+            usdc_token.address,
+            batch_users[:number_of_users],
+            batch_balances[:number_of_users],
+            batchId,
+            private_keys,
         )
 
-        signatures = []
-        for pk in private_keys:
-            signatures.append(
-                w3.eth.account.sign_message(
-                    encode_defunct(base_message), private_key=pk
-                ).signature
-            )
-
         tx_data = [
             usdc_token.address,
             batch_users[:number_of_users],
@@ -157,3 +140,8 @@ def main():
     print(gas_results)
     for users, gas in gas_results.items():
         print(f"{users}:{gas}:{int(gas/users)}")
+    model = GasModel.fit(gas_results, len(private_keys))
+    print("Fitted gas model:", model)
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    with open(MODEL_PATH, "w") as f:
+        json.dump(model._asdict(), f, indent=2)
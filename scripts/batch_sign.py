@@ -1,4 +1,4 @@
-from brownie import DexilonBridge_v08, ERC20Mock, VerifySignature, accounts, network
+from brownie import DexilonBridge_v10, ERC20Mock, accounts, network
 from eth_keys import keys
 from web3 import Web3
 from web3.auto import w3
@@ -7,9 +7,24 @@ import os
 from dotenv import load_dotenv
 import random
 from uuid import uuid4
+import json
+import sys
+
+from dexilon_bridge.eip712 import domain_separator
+from dexilon_bridge.netting import net_updates
+from dexilon_bridge.planner import GasModel
+from dexilon_bridge.signing import BatchSigner
+
+# written by scripts/batch_cost.py
+MODEL_PATH = "reports/gas_model.json"
 
 
 def main():
+    if not os.path.exists(MODEL_PATH):
+        sys.exit(f"No gas model at {MODEL_PATH}, run scripts/batch_cost.py first")
+    with open(MODEL_PATH) as f:
+        model = GasModel(**json.load(f))
+
     network.priority_fee("1 gwei")
     network.max_fee("10 gwei")
     network.gas_limit(12_000_000)
@@ -23,7 +38,16 @@ def main():
     )
 
     # Deploy contracts for test module
-    dexilon_bridge = DexilonBridge_v08.deploy({"from": accounts[0]})
+    project_name = "Dexilon"
+    project_version = "tests"
+    dexilon_bridge = DexilonBridge_v10.deploy(
+        project_name, project_version, {"from": accounts[0]}
+    )
+    # Build domain separator
+    chainid = 1337
+    domainSeparator = domain_separator(
+        project_name, project_version, chainid, dexilon_bridge.address
+    )
     # keys from Truffle Develop
     private_keys = [
         "c87509a1c067bbde78beb793e6fa76530b6382a4c0241e5e4a9ec0a0f44dc0d3",
@@ -74,19 +98,25 @@ def main():
         batch_users.append(random.choice(accounts_list))
         batch_balances.append(random.randint(1, 100) * 10 ** 6)
 
-    batchId = random.randint(1, 1000)
-    base_message = Web3.solidityKeccak(
-        ["uint256", "address", "address[]", "uint256[]", "uint256"],
-        [1337, usdc_token.address, batch_users, batch_balances, batchId],
+    # net repeated users before signing
+    netted = net_updates(
+        [
+            (usdc_token.address, user, amount)
+            for user, amount in zip(batch_users, batch_balances)
+        ],
+        model,
+    )[usdc_token.address]
+    print(
+        f"Netted {netted.entries} updates into {len(netted.users)} users, "
+        f"estimated gas saved: {netted.gas_saved}"
     )
+    batch_users = netted.users
+    batch_balances = netted.balance_updates
 
-    signatures = []
-    for pk in private_keys:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
+    batchId = random.randint(1, 1000)
+    signatures = BatchSigner(private_keys).sign_batch(
+        domainSeparator, usdc_token.address, batch_users, batch_balances, batchId
+    )
 
     accounts[0].transfer(dexilon_bridge.address, "1 ether")
 
@@ -1,4 +1,4 @@
-from web3 import Web3
+from dexilon_bridge.eip712 import domain_separator
 
 
 def getDomainSeparator(
@@ -15,23 +15,7 @@ def getDomainSeparator(
     Returns:
         str: hex string of bytes32 hash
     """
-    type_hash = Web3.keccak(
-        text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
-    ).hex()
-    name_hash = Web3.keccak(text=name).hex()
-    version_hash = Web3.keccak(text=version).hex()
-
-    local_abiencode = (
-        str(type_hash)
-        + str(name_hash).replace("0x", "")
-        + str(version_hash).replace("0x", "")
-        + str((chainid).to_bytes(32, byteorder="big").hex()).replace("0x", "")
-        + "0" * 24
-        + contract_address.lower().replace("0x", "")
-    )
-    domainSeparator = Web3.keccak(hexstr=local_abiencode).hex()
-
-    return str(domainSeparator)
+    return "0x" + domain_separator(name, version, chainid, contract_address).hex()
 
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ import random
 from uuid import uuid4
 import time
 
+from dexilon_bridge.eip712 import DOMAIN_TYPE_HASH, domain_separator
+
 
 def main():
     network.priority_fee("1 gwei")
@@ -35,9 +37,7 @@ def main():
         contract_version_hash == version_hash,
     )
 
-    type_hash = Web3.keccak(
-        text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
-    ).hex()
+    type_hash = "0x" + DOMAIN_TYPE_HASH.hex()
     contract_type_hash = eip712mock.expose_type_hash.call()
     print("Name typehash from contract:", contract_type_hash)
     print(
@@ -79,7 +79,9 @@ def main():
         "Local abi.encode    :", local_abiencode, local_abiencode == contract_abiencode
     )
 
-    local_domainSeparator = Web3.keccak(hexstr=local_abiencode).hex()
+    local_domainSeparator = "0x" + domain_separator(
+        "Dexilon", "dev2", 1337, eip712mock.address
+    ).hex()
     contract_domainSeparator = eip712mock.expose_domainSeparatorV4.call()
     print("Contract Domain Separator:", contract_domainSeparator)
     print("Contract Cached Domain   :", eip712mock.expose_cached_domain.call())
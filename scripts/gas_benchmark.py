@@ -0,0 +1,417 @@
+"""Gas benchmark of DexilonBridge_v10 on a local ganache or anvil node.
+
+    brownie run scripts/gas_benchmark.py                    compare with the baseline
+    brownie run scripts/gas_benchmark.py main update        accept this run as baseline
+    brownie run scripts/gas_benchmark.py main check 0.05    compare with a 5% threshold
+
+Results of every run are written to reports/gas_benchmark.json. The run
+fails when any cell uses more gas than the baseline beyond the threshold, and
+when reports/gas_baseline.json does not exist: only update writes the
+baseline, which is committed with the contract changes it measures. A clone
+without a baseline creates it with `main update` before comparing.
+"""
+from brownie import (
+    BatchDecodingMock,
+    DexilonBridge_v10,
+    ERC20Mock,
+    accounts,
+    chain,
+    network,
+)
+from eth_utils import keccak, to_checksum_address
+import os
+import sys
+
+from dexilon_bridge.benchmark import (
+    DEFAULT_THRESHOLD,
+    cell_name,
+    compare,
+    load_baseline,
+    repeated_users,
+    save_baseline,
+)
+from dexilon_bridge.eip712 import domain_separator
+from dexilon_bridge.encoding import encode_packed_updates
+from dexilon_bridge.merkle import MerkleTree
+from dexilon_bridge.signing import (
+    sign_batch,
+    sign_batch_compact,
+    sign_merkle_root,
+    sign_multi_token_batch,
+    sign_packed_batch,
+)
+
+BASELINE_PATH = "reports/gas_baseline.json"
+RESULTS_PATH = "reports/gas_benchmark.json"
+
+USERS = [1, 10, 50, 100]
+# users with a balance already, as after their first deposit
+LARGE_USERS = [1000, 1500]
+LARGE_USERS_CHUNK = 250
+VALIDATORS = [4, 7, 10]
+REPEATED_RATIOS = [0, 0.5]
+
+
+def benchmark_users(dexilon_bridge, domainSeparator, private_keys, tokens, results):
+    """deposit and withdraw gas, independent of the validators"""
+    user = accounts[1]
+    for symbol, (token, decimals) in tokens.items():
+        amount = 100 * 10 ** decimals
+        token.transfer(user, 2 * amount, {"from": accounts[0]})
+        token.approve(dexilon_bridge, 2 * amount, {"from": user})
+
+        tx = dexilon_bridge.deposit(token, amount, {"from": user})
+        results[cell_name("deposit", token=symbol, first=True)] = tx.gas_used
+        tx = dexilon_bridge.deposit(token, amount, {"from": user})
+        results[cell_name("deposit", token=symbol, first=False)] = tx.gas_used
+
+        batchId = 1
+        signatures = sign_batch(
+            domainSeparator,
+            token.address,
+            [user.address],
+            [amount],
+            batchId,
+            private_keys,
+        )
+        dexilon_bridge.batchUpdateAvailableBalances(
+            token, [user.address], [amount], batchId, signatures, {"from": accounts[0]}
+        )
+        tx = dexilon_bridge.withdraw(token, {"from": user})
+        results[cell_name("withdraw", token=symbol)] = tx.gas_used
+
+
+def benchmark_batches(dexilon_bridge, domainSeparator, private_keys, tokens, results):
+    """batch gas per token, users and repeated-user ratio"""
+    validators = len(private_keys) + 1
+    batchId = 1000
+    for symbol, (token, decimals) in tokens.items():
+        unique_users = [
+            to_checksum_address(keccak(f"{symbol} user {i}".encode())[:20])
+            for i in range(max(USERS))
+        ]
+        for users in USERS:
+            for repeated in REPEATED_RATIOS:
+                batch_users = repeated_users(unique_users, users, repeated)
+                batch_balances = [(i % 100 + 1) * 10 ** decimals for i in range(users)]
+                batchId += 1
+                signatures = sign_batch(
+                    domainSeparator,
+                    token.address,
+                    batch_users,
+                    batch_balances,
+                    batchId,
+                    private_keys,
+                )
+                tx = dexilon_bridge.batchUpdateAvailableBalances(
+                    token,
+                    batch_users,
+                    batch_balances,
+                    batchId,
+                    signatures,
+                    {"from": accounts[0]},
+                )
+                cell = cell_name(
+                    "batchUpdateAvailableBalances",
+                    token=symbol,
+                    validators=validators,
+                    users=users,
+                    repeated=repeated,
+                )
+                results[cell] = tx.gas_used
+
+                batchId += 1
+                signatures = sign_batch_compact(
+                    domainSeparator,
+                    token.address,
+                    batch_users,
+                    batch_balances,
+                    batchId,
+                    private_keys,
+                )
+                tx = dexilon_bridge.batchUpdateAvailableBalancesCompact(
+                    token,
+                    batch_users,
+                    batch_balances,
+                    batchId,
+                    signatures,
+                    {"from": accounts[0]},
+                )
+                cell = cell_name(
+                    "batchUpdateAvailableBalancesCompact",
+                    token=symbol,
+                    validators=validators,
+                    users=users,
+                    repeated=repeated,
+                )
+                results[cell] = tx.gas_used
+
+                packed = encode_packed_updates(batch_users, batch_balances)
+                batchId += 1
+                signatures = sign_packed_batch(
+                    domainSeparator, token.address, packed, batchId, private_keys
+                )
+                tx = dexilon_bridge.batchUpdateAvailableBalancesPacked(
+                    token, packed, batchId, signatures, {"from": accounts[0]}
+                )
+                cell = cell_name(
+                    "batchUpdateAvailableBalancesPacked",
+                    token=symbol,
+                    validators=validators,
+                    users=users,
+                    repeated=repeated,
+                )
+                results[cell] = tx.gas_used
+
+        leaves = [(user, 10 ** decimals) for user in unique_users]
+        with MerkleTree(token, leaves) as tree:
+            batchId += 1
+            signatures = sign_merkle_root(
+                domainSeparator,
+                token.address,
+                tree.root,
+                tree.cumulative_total,
+                batchId,
+                private_keys,
+            )
+            tx = dexilon_bridge.batchUpdateMerkleRoot(
+                token,
+                tree.root,
+                tree.cumulative_total,
+                batchId,
+                signatures,
+                {"from": accounts[0]},
+            )
+        cell = cell_name("batchUpdateMerkleRoot", token=symbol, validators=validators)
+        results[cell] = tx.gas_used
+
+
+def benchmark_large_batches(
+    dexilon_bridge, domainSeparator, private_keys, tokens, results
+):
+    """batch gas at 1000+ users, where calldata decoding and hashing dominate"""
+    validators = len(private_keys) + 1
+    batchId = 8000
+    for symbol, (token, decimals) in tokens.items():
+        unique_users = [
+            to_checksum_address(keccak(f"{symbol} large user {i}".encode())[:20])
+            for i in range(max(LARGE_USERS))
+        ]
+        # initialize the balances in chunks that fit in a block
+        for start in range(0, len(unique_users), LARGE_USERS_CHUNK):
+            chunk = unique_users[start : start + LARGE_USERS_CHUNK]
+            batchId += 1
+            signatures = sign_batch(
+                domainSeparator,
+                token.address,
+                chunk,
+                [1] * len(chunk),
+                batchId,
+                private_keys,
+            )
+            dexilon_bridge.batchUpdateAvailableBalances(
+                token,
+                chunk,
+                [1] * len(chunk),
+                batchId,
+                signatures,
+                {"from": accounts[0]},
+            )
+
+        for users in LARGE_USERS:
+            batch_users = unique_users[:users]
+            batch_balances = [10 ** decimals] * users
+            batchId += 1
+            signatures = sign_batch(
+                domainSeparator,
+                token.address,
+                batch_users,
+                batch_balances,
+                batchId,
+                private_keys,
+            )
+            tx = dexilon_bridge.batchUpdateAvailableBalances(
+                token,
+                batch_users,
+                batch_balances,
+                batchId,
+                signatures,
+                {"from": accounts[0]},
+            )
+            cell = cell_name(
+                "batchUpdateAvailableBalances",
+                token=symbol,
+                validators=validators,
+                users=users,
+                initialized=True,
+            )
+            results[cell] = tx.gas_used
+
+
+def benchmark_decoding(results):
+    """batch decoding before and after the calldata parameters, same storage writes"""
+    decoding = BatchDecodingMock.deploy({"from": accounts[0]})
+    token = accounts[0].address
+    unique_users = [
+        to_checksum_address(keccak(f"decoding user {i}".encode())[:20])
+        for i in range(max(LARGE_USERS))
+    ]
+    # both paths update balances that are already set
+    for start in range(0, len(unique_users), LARGE_USERS_CHUNK):
+        chunk = unique_users[start : start + LARGE_USERS_CHUNK]
+        decoding.applyFromMemory(
+            token, chunk, [1] * len(chunk), 0, {"from": accounts[0]}
+        )
+
+    for users in LARGE_USERS:
+        batch_users = unique_users[:users]
+        for path in ("memory", "calldata"):
+            apply = getattr(decoding, f"applyFrom{path.capitalize()}")
+            tx = apply(token, batch_users, [1] * users, users, {"from": accounts[0]})
+            results[cell_name("batchDecoding", path=path, users=users)] = tx.gas_used
+
+        before = results[cell_name("batchDecoding", path="memory", users=users)]
+        after = results[cell_name("batchDecoding", path="calldata", users=users)]
+        print(
+            f"calldata saves {(before - after) / users:.0f} gas per user "
+            f"at {users} users ({before} -> {after})"
+        )
+
+
+def benchmark_multi_token_batches(
+    dexilon_bridge, domainSeparator, private_keys, tokens, results
+):
+    """gas of one batch settling every token under a single signature set"""
+    validators = len(private_keys) + 1
+    batchId = 5000
+    symbols = "+".join(tokens)
+    unique_users = [
+        to_checksum_address(keccak(f"multi user {i}".encode())[:20])
+        for i in range(max(USERS))
+    ]
+    for users in USERS:
+        batch_tokens = [token.address for token, decimals in tokens.values()]
+        batch_users = [unique_users[:users]] * len(tokens)
+        batch_balances = [
+            [(i % 100 + 1) * 10 ** decimals for i in range(users)]
+            for token, decimals in tokens.values()
+        ]
+        batchId += 1
+        signatures = sign_multi_token_batch(
+            domainSeparator,
+            batch_tokens,
+            batch_users,
+            batch_balances,
+            batchId,
+            private_keys,
+        )
+        tx = dexilon_bridge.batchUpdateAvailableBalancesMultiToken(
+            batch_tokens,
+            batch_users,
+            batch_balances,
+            batchId,
+            signatures,
+            {"from": accounts[0]},
+        )
+        cell = cell_name(
+            "batchUpdateAvailableBalancesMultiToken",
+            tokens=symbols,
+            validators=validators,
+            users=users,
+        )
+        results[cell] = tx.gas_used
+
+
+def benchmark_validators(validators, tokens, results):
+    """deploys a bridge with given validators and benchmarks it"""
+    # validators signing the batches, accounts[0] submits them and does not sign
+    private_keys = [
+        keccak(f"validator {i}".encode()).hex() for i in range(validators - 1)
+    ]
+    pk_accounts = [accounts.add(pk) for pk in private_keys]
+
+    project_name = "Dexilon"
+    project_version = "benchmark"
+    dexilon_bridge = DexilonBridge_v10.deploy(
+        project_name, project_version, {"from": accounts[0]}
+    )
+    domainSeparator = domain_separator(
+        project_name, project_version, chain.id, dexilon_bridge.address
+    )
+
+    tx = dexilon_bridge.addValidators(
+        pk_accounts + [accounts[0]], {"from": accounts[0]}
+    )
+    results[cell_name("addValidators", validators=validators)] = tx.gas_used
+
+    for token, decimals in tokens.values():
+        dexilon_bridge.setSupportedToken(token, True, {"from": accounts[0]})
+        amount = 10 ** 6 * 10 ** decimals
+        token.approve(dexilon_bridge, amount, {"from": accounts[0]})
+        dexilon_bridge.deposit(token, amount, {"from": accounts[0]})
+
+    if validators == VALIDATORS[0]:
+        benchmark_users(dexilon_bridge, domainSeparator, private_keys, tokens, results)
+        benchmark_large_batches(
+            dexilon_bridge, domainSeparator, private_keys, tokens, results
+        )
+    benchmark_batches(dexilon_bridge, domainSeparator, private_keys, tokens, results)
+    benchmark_multi_token_batches(
+        dexilon_bridge, domainSeparator, private_keys, tokens, results
+    )
+
+    tx = dexilon_bridge.removeValidators([pk_accounts[-1]], {"from": accounts[0]})
+    results[cell_name("removeValidators", validators=validators)] = tx.gas_used
+    tx = dexilon_bridge.addValidators([pk_accounts[-1]], {"from": accounts[0]})
+    results[cell_name("addValidators", validators=validators, reused=True)] = (
+        tx.gas_used
+    )
+
+
+def main(mode="check", threshold=DEFAULT_THRESHOLD):
+    network.priority_fee("1 gwei")
+    network.max_fee("10 gwei")
+    network.gas_limit(12_000_000)
+
+    usdc_token = ERC20Mock.deploy(
+        "USD Coin", "USDC", accounts[0], int(10 ** 16), {"from": accounts[0]}
+    )
+    dxln_token = ERC20Mock.deploy(
+        "Dexilon Coin", "DXLN", accounts[0], int(10 ** 28), {"from": accounts[0]}
+    )
+    tokens = {"USDC": (usdc_token, 6), "DXLN": (dxln_token, 18)}
+
+    results = {}
+    benchmark_decoding(results)
+    for validators in VALIDATORS:
+        benchmark_validators(validators, tokens, results)
+
+    for cell, gas in results.items():
+        print(f"{cell}: {gas}")
+
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    save_baseline(RESULTS_PATH, results)
+
+    if mode == "update":
+        save_baseline(BASELINE_PATH, results)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+
+    if not os.path.exists(BASELINE_PATH):
+        print(f"MISSING BASELINE {BASELINE_PATH}, accept a run with 'main update'")
+        sys.exit(1)
+
+    comparison = compare(load_baseline(BASELINE_PATH), results, float(threshold))
+    for change in comparison.improvements:
+        print(f"improved {change.cell}: {change.baseline} -> {change.gas_used}")
+    for cell in comparison.new_cells:
+        print(f"new cell {cell}: {results[cell]}")
+    for cell in comparison.missing_cells:
+        print(f"missing cell {cell}")
+    for change in comparison.regressions:
+        print(
+            f"REGRESSION {change.cell}: {change.baseline} -> {change.gas_used} "
+            f"(+{change.ratio:.1%})"
+        )
+    if comparison.regressions:
+        sys.exit(1)
@@ -0,0 +1,21 @@
+from brownie import web3
+import time
+
+from dexilon_bridge.indexer import BridgeIndexer, EventStore
+
+
+def main(bridge_address, db_path="reports/events.sqlite", start_block=0):
+    store = EventStore(db_path)
+    indexer = BridgeIndexer(
+        web3.provider, bridge_address, store, start_block=int(start_block)
+    )
+
+    started = time.time()
+    stored = indexer.sync()
+    elapsed = time.time() - started
+
+    print(
+        f"Indexed {stored} events up to block {store.checkpoint(bridge_address)} "
+        f"in {elapsed:.1f}s ({stored / max(elapsed, 1e-9):.0f} events/s)"
+    )
+    store.close()
@@ -39,6 +39,18 @@ async function getSignature(wallet: Wallet, data: any): Promise<string> {
     return sign;
 }
 
+// signatures ordered by ascending signer address, as the contract requires
+async function getSortedSignatures(keys: string[], data: any): Promise<string[]> {
+    const wallets = keys.map((key) => new Wallet(key, hre.ethers.provider));
+    wallets.sort((a, b) => (a.address.toLowerCase() < b.address.toLowerCase() ? -1 : 1));
+
+    var signatures = new Array();
+    for (const wallet of wallets) {
+        signatures.push(await getSignature(wallet, data));
+    }
+    return signatures;
+}
+
 describe("Bridge contract", function () {
 
     let dexilonBridge;
@@ -256,13 +268,7 @@ describe("Bridge contract", function () {
         it("Should be more than 2 validators set", async function () {
             const domain = await domainSeparator("Dexilon", "test", 1337, dexilonBridge.address);
             const data = [domain, usdt.address, [bob.address], [1000], 69];
-            var signatures = new Array();
-            for (const validator of validatorsKeys) {
-                const wallet = new Wallet(
-                    validator, hre.ethers.provider
-                );
-                signatures.push(await getSignature(wallet, data));
-            }
+            const signatures = await getSortedSignatures(validatorsKeys, data);
 
             await dexilonBridge.removeValidators(validatorsAddresses.slice(0, -2));
 
@@ -274,13 +280,7 @@ describe("Bridge contract", function () {
         it("Should not accept same batch id", async function () {
             const domain = await domainSeparator("Dexilon", "test", 1337, dexilonBridge.address);
             const data = [domain, usdt.address, [bob.address], [1000], 69];
-            var signatures = new Array();
-            for (const validator of validatorsKeys) {
-                const wallet = new Wallet(
-                    validator, hre.ethers.provider
-                );
-                signatures.push(await getSignature(wallet, data));
-            }
+            const signatures = await getSortedSignatures(validatorsKeys, data);
 
             await dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
@@ -294,13 +294,7 @@ describe("Bridge contract", function () {
         it("Should not accept wrong lists in a batch", async function () {
             const domain = await domainSeparator("Dexilon", "test", 1337, dexilonBridge.address);
             const data = [domain, usdt.address, [bob.address, alice.address], [1000], 69];
-            var signatures = new Array();
-            for (const validator of validatorsKeys) {
-                const wallet = new Wallet(
-                    validator, hre.ethers.provider
-                );
-                signatures.push(await getSignature(wallet, data));
-            }
+            const signatures = await getSortedSignatures(validatorsKeys, data);
 
             await expect(dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
@@ -320,7 +314,7 @@ describe("Bridge contract", function () {
 
             await expect(dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
-            )).to.be.rejectedWith("Not enough signatures!");
+            )).to.be.rejectedWith("Signers not in ascending order!");
         });
 
         it("Should not accept wrong signatures", async function () {
@@ -338,19 +332,13 @@ describe("Bridge contract", function () {
 
             await expect(dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
-            )).to.be.rejectedWith("Not enough signatures!");
+            )).to.be.rejectedWith("Signers not in ascending order!");
         });
 
         it("Should be enough locked token in the contract", async function () {
             const domain = await domainSeparator("Dexilon", "test", 1337, dexilonBridge.address);
             const data = [domain, alice.address, [bob.address], [1000], 69];
-            var signatures = new Array();
-            for (const validator of validatorsKeys) {
-                const wallet = new Wallet(
-                    validator, hre.ethers.provider
-                );
-                signatures.push(await getSignature(wallet, data));
-            }
+            const signatures = await getSortedSignatures(validatorsKeys, data);
 
             await expect(dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
@@ -364,13 +352,7 @@ describe("Bridge contract", function () {
             // batch data
             const data = [domain, usdt.address, ["0x61a21F7D18DFB4CB16f132c0D330536705c34068"], [1000], 69];
 
-            var signatures = new Array();
-            for (const validator of validatorsKeys) {
-                const wallet = new Wallet(
-                    validator, hre.ethers.provider
-                );
-                signatures.push(await getSignature(wallet, data));
-            }
+            const signatures = await getSortedSignatures(validatorsKeys, data);
 
             await dexilonBridge.batchUpdateAvailableBalances(
                 data[1], data[2], data[3], data[4], signatures
@@ -1,27 +1,112 @@
-from brownie import (
-    DexilonBridge_v10,
-    accounts,
-    network,
-    ERC20Mock,
-    ECDSAMock,
-    AddressImpl,
-)
+r"""Fixtures shared by the test modules.
+
+The tokens, mocks and bridge are deployed once per session and every test that
+uses them runs between chain.snapshot() and chain.revert(), so each test starts
+from the state the fixtures left and tests can run in any order. Those tests
+are marked `chain`; the off-chain tests (simulator, encoders, planner, ...)
+never touch the node and also run under plain pytest without the project:
+
+    python -m pytest -p no:pytest-brownie -m "not chain" tests
+
+The suite can be sharded over xdist workers, each of which launches its own
+development node on port 8545 + worker id:
+
+    brownie test -n 4
+
+On anvil the prepared chain is also cached across runs: the state after the
+fixture setup is dumped to build/fixture-state, keyed by the bytecode of the
+contracts and the source of this file, and later runs and shards load it
+instead of deploying. Delete the directory to force a fresh setup. Ganache
+cannot dump its state, so the default development network deploys on every
+run and the session reports a warning saying so. Add an anvil network and
+test against it to use the cache:
+
+    brownie networks add Development anvil cmd=anvil host=http://127.0.0.1 \
+        port=8545 accounts=10 mnemonic=brownie chain_id=1337
+    brownie test --network anvil
+"""
+from brownie import accounts, chain, network, web3
 from eth_keys import keys
+from eth_utils import keccak
 from eth_account.messages import encode_defunct, _hash_eip191_message
 from brownie.network.state import Chain
 
 from web3 import Web3
 from web3.auto import w3
+from pathlib import Path
 import pytest
 import random
+import warnings
+
+from dexilon_bridge.eip712 import domain_separator
+from dexilon_bridge.node_state import NodeStateCache, state_key
+from dexilon_bridge.rpc import request
+from dexilon_bridge.simulator import BridgeSimulator
 
+try:
+    # contract containers exist once brownie test has loaded the project
+    from brownie import (
+        DexilonBridge_v10,
+        ERC20Mock,
+        ERC20PermitMock,
+        ECDSAMock,
+        AddressImpl,
+    )
+except ImportError:
+    # plain pytest: only the off-chain tests run, see pytest_collection_modifyitems.
+    # The test modules import reverts, install it as brownie test does.
+    import brownie
+    from brownie.test.managers.runner import RevertContextManager
 
-@pytest.fixture(scope="module")
-def tokens():
+    brownie.reverts = RevertContextManager
 
-    network.priority_fee("1 gwei")
-    network.max_fee("10 gwei")
-    network.gas_limit(10_000_000)
+# fixtures that need the development chain
+CHAIN_FIXTURES = {"prepared", "deploy", "tokens", "permit_token", "other_mocks"}
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "chain: test deploys or transacts on the development chain"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # chain tests are marked and isolated, off-chain tests never touch the node
+    for item in items:
+        if CHAIN_FIXTURES.intersection(getattr(item, "fixturenames", ())):
+            item.add_marker(pytest.mark.chain)
+            item.fixturenames.append("isolation")
+
+
+@pytest.fixture
+def isolation():
+    # session fixtures used by a test are set up before this snapshot
+    chain.snapshot()
+    yield
+    chain.revert()
+
+
+STATE_CACHE_DIR = Path("build") / "fixture-state"
+
+PROJECT_NAME = "Dexilon"
+PROJECT_VERSION = "tests"
+
+# keys from Truffle Develop
+PRIVATE_KEYS = [
+    "c87509a1c067bbde78beb793e6fa76530b6382a4c0241e5e4a9ec0a0f44dc0d3",
+    "ae6ae8e5ccbfb04590405997ee2d52d2b330726137b875053c36d94e974d162f",
+    "0dbbe8e4ae425a6d2687f1a7e3ba17bc98c673636790f1b8ad91193c05875ef1",
+    "c88b703fb08cbea894b6aeff5a544fb92e78a18e19814cd85da83b71f772aa6c",
+    "388c684f0ba1ef5017716adb5d21a053ea8e90277d0868337519f97bede61418",
+    "659cbb0e2411a44db63778987b1e22153c086a95eb6b18bdf89de078917abc63",
+    "82d052c865f5763aad42add438569276c00d3d88a2d062d36b2bae914d58b8c8",
+    "aa3680d5d48a8283413f7a108367c7299ca73f553735860a87b08f39395618b7",
+    "0f62d96d6675f32685bbdb8ac13cda7c23436f63efbb9d07700d8669ff12b7c4",
+    "8d5366123cb560bb606379f90a0bfd4769eecc0557f1b362dcae9012b548b1e5",
+]
+
+
+def deploy_tokens():
 
     usdc_token = ERC20Mock.deploy(
         "USD Coin", "USDC", accounts[0], int(10 ** 12), {"from": accounts[0]}
@@ -39,12 +124,17 @@ def tokens():
     return (usdc_token, dxln_token)
 
 
-@pytest.fixture(scope="module")
-def other_mocks():
+def deploy_permit_token():
 
-    network.priority_fee("1 gwei")
-    network.max_fee("10 gwei")
-    network.gas_limit(10_000_000)
+    # not supported by the bridge, tests supporting it are reverted
+    permit_token = ERC20PermitMock.deploy(
+        "Permit Coin", "PRMT", accounts[0], int(10 ** 24), {"from": accounts[0]}
+    )
+
+    return permit_token
+
+
+def deploy_mocks():
 
     ecdsa = ECDSAMock.deploy({"from": accounts[0]})
     address = AddressImpl.deploy({"from": accounts[0]})
@@ -52,57 +142,14 @@ def other_mocks():
     return (ecdsa, address)
 
 
-@pytest.fixture(scope="module")
-def deploy(tokens):
-
-    network.priority_fee("1 gwei")
-    network.max_fee("10 gwei")
-    network.gas_limit(10_000_000)
+def deploy_bridge(tokens, pk_accounts):
 
     (usdc_token, dxln_token) = tokens
 
-    # Deploy contracts for test module
-    project_name = "Dexilon"
-    project_version = "tests"
+    # Deploy contracts for the test session
     dexilon_bridge = DexilonBridge_v10.deploy(
-        project_name, project_version, {"from": accounts[0]}
+        PROJECT_NAME, PROJECT_VERSION, {"from": accounts[0]}
     )
-    # Build domain separator
-    local_name_hash = Web3.keccak(text=project_name).hex()
-    version_hash = Web3.keccak(text=project_version).hex()
-    type_hash = Web3.keccak(
-        text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
-    ).hex()
-    chainid = 1337
-    local_abiencode = (
-        str(type_hash)
-        + str(local_name_hash).replace("0x", "")
-        + str(version_hash).replace("0x", "")
-        + str((chainid).to_bytes(32, byteorder="big").hex()).replace("0x", "")
-        + "0" * 24
-        + str(dexilon_bridge.address).lower().replace("0x", "")
-    )
-    domainSeparator = Web3.keccak(hexstr=local_abiencode).hex()
-
-    # keys from Truffle Develop
-    private_keys = [
-        "c87509a1c067bbde78beb793e6fa76530b6382a4c0241e5e4a9ec0a0f44dc0d3",
-        "ae6ae8e5ccbfb04590405997ee2d52d2b330726137b875053c36d94e974d162f",
-        "0dbbe8e4ae425a6d2687f1a7e3ba17bc98c673636790f1b8ad91193c05875ef1",
-        "c88b703fb08cbea894b6aeff5a544fb92e78a18e19814cd85da83b71f772aa6c",
-        "388c684f0ba1ef5017716adb5d21a053ea8e90277d0868337519f97bede61418",
-        "659cbb0e2411a44db63778987b1e22153c086a95eb6b18bdf89de078917abc63",
-        "82d052c865f5763aad42add438569276c00d3d88a2d062d36b2bae914d58b8c8",
-        "aa3680d5d48a8283413f7a108367c7299ca73f553735860a87b08f39395618b7",
-        "0f62d96d6675f32685bbdb8ac13cda7c23436f63efbb9d07700d8669ff12b7c4",
-        "8d5366123cb560bb606379f90a0bfd4769eecc0557f1b362dcae9012b548b1e5",
-    ]
-    pk_accounts = []
-    for pk in private_keys:
-        pk_accounts.append(accounts.add(pk))
-
-    # add 11th validator without private key
-    pk_accounts.append(accounts[0])
 
     dexilon_bridge.addValidators(pk_accounts, {"from": accounts[0]})
 
@@ -119,4 +166,172 @@ def deploy(tokens):
         dxln_token.approve(dexilon_bridge, int(1_000 * 10 ** 18), {"from": accounts[i]})
         dexilon_bridge.deposit(dxln_token, int(1_000 * 10 ** 18), {"from": accounts[i]})
 
-    return (dexilon_bridge, pk_accounts, private_keys, domainSeparator)
+    return dexilon_bridge
+
+
+@pytest.fixture(scope="session")
+def pk_accounts():
+
+    pk_accounts = []
+    for pk in PRIVATE_KEYS:
+        pk_accounts.append(accounts.add(pk))
+
+    # add 11th validator without private key
+    pk_accounts.append(accounts[0])
+
+    return pk_accounts
+
+
+@pytest.fixture(scope="session")
+def prepared(pk_accounts):
+    """addresses of the contracts deployed by the fixture setup"""
+
+    network.priority_fee("1 gwei")
+    network.max_fee("10 gwei")
+    network.gas_limit(10_000_000)
+
+    client = request(web3.provider, "web3_clientVersion", [])
+    key = state_key(
+        *[
+            container.bytecode
+            for container in (
+                DexilonBridge_v10,
+                ERC20Mock,
+                ERC20PermitMock,
+                ECDSAMock,
+                AddressImpl,
+            )
+        ],
+        Path(__file__).read_text(),
+        client,
+        str(chain.id),
+        *[account.address for account in accounts],
+    )
+    cache = NodeStateCache(web3.provider, str(STATE_CACHE_DIR), key)
+    if not cache.supported:
+        warnings.warn(
+            f"{client} cannot dump its state, the fixture setup is deployed on "
+            "every run: test against an anvil network to cache it "
+            "(see tests/conftest.py)"
+        )
+
+    addresses = cache.load()
+    if addresses is None:
+        (usdc_token, dxln_token) = deploy_tokens()
+        permit_token = deploy_permit_token()
+        (ecdsa, address) = deploy_mocks()
+        dexilon_bridge = deploy_bridge((usdc_token, dxln_token), pk_accounts)
+        addresses = {
+            "usdc": usdc_token.address,
+            "dxln": dxln_token.address,
+            "permit": permit_token.address,
+            "ecdsa": ecdsa.address,
+            "address": address.address,
+            "bridge": dexilon_bridge.address,
+        }
+        cache.save(addresses)
+
+    return addresses
+
+
+@pytest.fixture(scope="session")
+def tokens(prepared):
+
+    return (ERC20Mock.at(prepared["usdc"]), ERC20Mock.at(prepared["dxln"]))
+
+
+@pytest.fixture(scope="session")
+def permit_token(prepared):
+
+    return ERC20PermitMock.at(prepared["permit"])
+
+
+@pytest.fixture(scope="session")
+def other_mocks(prepared):
+
+    return (ECDSAMock.at(prepared["ecdsa"]), AddressImpl.at(prepared["address"]))
+
+
+@pytest.fixture(scope="session")
+def deploy(prepared, pk_accounts):
+
+    dexilon_bridge = DexilonBridge_v10.at(prepared["bridge"])
+    # Build domain separator
+    chainid = 1337
+    domainSeparator = domain_separator(
+        PROJECT_NAME, PROJECT_VERSION, chainid, dexilon_bridge.address
+    )
+
+    return (dexilon_bridge, pk_accounts, PRIVATE_KEYS, domainSeparator)
+
+
+# off-chain fixtures: validators, tokens and users of the tests that run the
+# simulator, verifier or aggregator without deploying anything
+
+
+@pytest.fixture(scope="session")
+def sim_keys():
+    """private keys of the 4 simulator validators"""
+
+    return PRIVATE_KEYS[:4]
+
+
+@pytest.fixture(scope="session")
+def sim_validators(sim_keys):
+
+    return [w3.eth.account.from_key(pk).address for pk in sim_keys]
+
+
+@pytest.fixture(scope="session")
+def quorum_keys():
+    """private keys of 11 validators, a quorum of 8"""
+
+    return [keccak(f"validator {i}".encode()).hex() for i in range(11)]
+
+
+@pytest.fixture(scope="session")
+def quorum_validators(quorum_keys):
+
+    return [w3.eth.account.from_key(pk).address for pk in quorum_keys]
+
+
+@pytest.fixture(scope="session")
+def sim_bridge():
+
+    return "0x" + "ab" * 20
+
+
+@pytest.fixture(scope="session")
+def sim_tokens():
+
+    return ["0x" + "11" * 20, "0x" + "12" * 20]
+
+
+@pytest.fixture(scope="session")
+def sim_token(sim_tokens):
+
+    return sim_tokens[0]
+
+
+@pytest.fixture(scope="session")
+def sim_users():
+
+    return ["0x" + f"{i:02x}" * 20 for i in range(0x20, 0x28)]
+
+
+@pytest.fixture(scope="session")
+def new_simulator(sim_bridge, sim_validators, sim_token):
+    """builds a fresh BridgeSimulator of the test project at sim_bridge
+
+    new_simulator(tokens=None, validators=None) adds the validators and
+    supports the tokens, sim_validators and [sim_token] by default.
+    """
+
+    def build(tokens=None, validators=None):
+        simulator = BridgeSimulator(PROJECT_NAME, PROJECT_VERSION, 1337, sim_bridge)
+        simulator.add_validators(validators or sim_validators)
+        for token in tokens or [sim_token]:
+            simulator.set_supported_token(token, True)
+        return simulator
+
+    return build
@@ -0,0 +1,272 @@
+from brownie import accounts
+
+from eth_utils import keccak
+import asyncio
+import pytest
+
+from dexilon_bridge.aggregator import SignatureAggregator, send_signatures
+from dexilon_bridge.signing import sign_hash
+
+
+# START ======================== TESTS AGGREGATOR =================================
+
+
+def sign_pending(batch, keys):
+    return [sign_hash(pk, batch.eth_hash) for pk in keys]
+
+
+def test_aggregator_submits_on_quorum(
+    quorum_keys, quorum_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator(validators=quorum_validators)
+    simulator.deposit(sim_users[0], sim_token, 1000)
+    submitted = []
+
+    def submit(batch, signatures):
+        submitted.append(signatures)
+        simulator.batch_update_available_balances(
+            quorum_validators[0],
+            batch.token,
+            batch.users,
+            batch.balance_updates,
+            batch.batch_id,
+            signatures,
+        )
+        return "tx"
+
+    async def run():
+        aggregator = SignatureAggregator(
+            simulator.domain_separator, quorum_validators, submit
+        )
+        batch = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 1)
+        assert aggregator.required == 8
+
+        # validators answer in any order, the fastest 8 settle the batch
+        signatures = sign_pending(batch, quorum_keys)[::-1]
+        for signature in signatures[:7]:
+            assert aggregator.add_signature(batch.batch_hash, signature) == (True, None)
+        await asyncio.sleep(0)
+        assert not batch.submitted
+
+        assert aggregator.add_signature(batch.batch_hash, signatures[7]) == (True, None)
+        assert batch.submitted
+        assert await asyncio.wait_for(batch.result, 5) == "tx"
+
+        assert aggregator.add_signature(batch.batch_hash, signatures[8]) == (
+            False,
+            "Batch already submitted",
+        )
+
+    asyncio.run(run())
+
+    assert len(submitted) == 1
+    assert len(submitted[0]) == 8
+    assert simulator.get_available_balance(sim_token, sim_users[0]) == 100
+    assert simulator.get_locked_balance(sim_token) == 700
+
+
+def test_aggregator_rejects_invalid_signatures(
+    quorum_keys, quorum_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator(validators=quorum_validators)
+
+    async def run():
+        aggregator = SignatureAggregator(
+            simulator.domain_separator,
+            quorum_validators,
+            lambda batch, signatures: None,
+        )
+        batch = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 1)
+
+        outsider = sign_hash(keccak(b"outsider"), batch.eth_hash)
+        assert aggregator.add_signature(batch.batch_hash, outsider) == (
+            False,
+            "Only validator!",
+        )
+        assert aggregator.add_signature(batch.batch_hash, bytes(65)) == (
+            False,
+            "ECDSA: invalid signature",
+        )
+        assert aggregator.add_signature(keccak(b"other"), outsider) == (
+            False,
+            "Unknown batch",
+        )
+
+        # the same validator signing twice counts once
+        signature = sign_hash(quorum_keys[0], batch.eth_hash)
+        aggregator.add_signature(batch.batch_hash, signature)
+        aggregator.add_signature(batch.batch_hash, signature)
+        assert len(batch.signatures) == 1
+
+    asyncio.run(run())
+
+
+def test_aggregator_over_socket(
+    quorum_keys, quorum_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator(validators=quorum_validators)
+    simulator.deposit(sim_users[0], sim_token, 1000)
+
+    async def submit(batch, signatures):
+        simulator.batch_update_available_balances(
+            quorum_validators[0],
+            batch.token,
+            batch.users,
+            batch.balance_updates,
+            batch.batch_id,
+            signatures,
+        )
+        return len(signatures)
+
+    async def run():
+        aggregator = SignatureAggregator(
+            simulator.domain_separator, quorum_validators, submit
+        )
+        batch = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 1)
+        server = await aggregator.serve()
+        (host, port) = server.sockets[0].getsockname()[:2]
+
+        # every validator sends its signature over its own connection
+        responses = await asyncio.gather(
+            *[
+                send_signatures(host, port, batch.batch_hash, sign_pending(batch, [pk]))
+                for pk in quorum_keys
+            ]
+        )
+        server.close()
+        await server.wait_closed()
+
+        accepted = [response for [response] in responses if response["accepted"]]
+        assert len(accepted) == 8
+        assert await batch.result == 8
+
+    asyncio.run(run())
+
+    assert simulator.get_locked_balance(sim_token) == 700
+
+
+def test_aggregator_evicts_settled_batches(
+    quorum_keys, quorum_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator(validators=quorum_validators)
+
+    async def run():
+        aggregator = SignatureAggregator(
+            simulator.domain_separator,
+            quorum_validators,
+            lambda batch, signatures: "tx",
+            submitted_ttl=0.01,
+            pending_ttl=0.05,
+        )
+        submitted = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 1)
+        for signature in sign_pending(submitted, quorum_keys[:8]):
+            aggregator.add_signature(submitted.batch_hash, signature)
+        assert await submitted.result == "tx"
+
+        # late signatures are still answered until submitted_ttl passes
+        late = sign_pending(submitted, quorum_keys[8:9])[0]
+        assert aggregator.add_signature(submitted.batch_hash, late) == (
+            False,
+            "Batch already submitted",
+        )
+
+        # a batch without quorum fails after pending_ttl
+        stalled = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 2)
+        for signature in sign_pending(stalled, quorum_keys[:7]):
+            aggregator.add_signature(stalled.batch_hash, signature)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stalled.result, 5)
+
+        assert aggregator.batches == {}
+        assert aggregator.add_signature(submitted.batch_hash, late) == (
+            False,
+            "Unknown batch",
+        )
+
+    asyncio.run(run())
+
+
+class ValidatorsNode:
+    """ValidatorsNode answers getActiveValidators with a fixed list"""
+
+    def __init__(self, validators):
+        self.validators = validators
+        self.calls = []
+
+    def make_request(self, method, params):
+        self.calls.append((method, params))
+        result = (32).to_bytes(32, "big") + len(self.validators).to_bytes(32, "big")
+        for validator in self.validators:
+            result += bytes(12) + bytes.fromhex(validator[2:])
+        return {"result": "0x" + result.hex()}
+
+
+def test_aggregator_refresh_validators(
+    quorum_keys, quorum_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator(validators=quorum_validators)
+    node = ValidatorsNode(quorum_validators[:4])
+
+    async def run():
+        aggregator = SignatureAggregator(
+            simulator.domain_separator,
+            quorum_validators,
+            lambda batch, signatures: None,
+        )
+        assert aggregator.required == 8
+        validators = aggregator.refresh_validators(node, "0x" + "ab" * 20)
+        assert validators == [bytes.fromhex(v[2:]) for v in quorum_validators[:4]]
+        assert aggregator.required == 3
+
+        ((method, (call, block)),) = node.calls
+        assert method == "eth_call"
+        assert call == {"to": "0x" + "ab" * 20, "data": "0x9de70258"}
+        assert block == "latest"
+
+        # removed validators no longer count
+        batch = aggregator.add_batch(sim_token, sim_users[:2], [100, 200], 1)
+        removed = sign_pending(batch, quorum_keys[4:5])[0]
+        assert aggregator.add_signature(batch.batch_hash, removed) == (
+            False,
+            "Only validator!",
+        )
+
+    asyncio.run(run())
+
+
+def test_aggregator_submits_to_bridge(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address, accounts[2].address]
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+
+    def submit(batch, signatures):
+        return dexilon_bridge.batchUpdateAvailableBalances(
+            usdc_token,
+            batch.users,
+            batch.balance_updates,
+            batch.batch_id,
+            signatures,
+            {"from": accounts[0]},
+        )
+
+    async def run():
+        aggregator = SignatureAggregator(
+            domainSeparator, dexilon_bridge.getActiveValidators(), submit
+        )
+        batch = aggregator.add_batch(usdc_token.address, users, [100, 200], 1)
+        for pk in private_keys:
+            aggregator.add_signature(batch.batch_hash, sign_pending(batch, [pk])[0])
+        return await batch.result
+
+    tx = asyncio.run(run())
+
+    assert "BatchRecorded" in tx.events
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 300
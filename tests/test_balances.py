@@ -0,0 +1,106 @@
+from brownie import accounts, reverts, web3
+
+import pytest
+import requests
+
+from dexilon_bridge.balances import BalanceClient
+from dexilon_bridge.rpc import RPCError
+
+
+# START ======================== TESTS BALANCES =================================
+
+
+class PairLimitedNode:
+    """PairLimitedNode answers getAvailableBalances with the low bits of every user"""
+
+    def __init__(self, max_pairs):
+        self.max_pairs = max_pairs
+        self.calls = 0
+
+    def make_request(self, method, params):
+        if method == "eth_blockNumber":
+            return {"result": "0x10"}
+        self.calls += 1
+        data = bytes.fromhex(params[0]["data"][2:])[4:]
+        pairs = int.from_bytes(data[64:96], "big")
+        if pairs > self.max_pairs:
+            return {"error": {"code": -32000, "message": "out of gas"}}
+        users = data[96 + 32 * pairs + 32 :]
+        result = (32).to_bytes(32, "big") + pairs.to_bytes(32, "big")
+        for i in range(pairs):
+            user = int.from_bytes(users[32 * i : 32 * i + 32], "big")
+            result += (user % 1000).to_bytes(32, "big")
+        return {"result": "0x" + result.hex()}
+
+
+def test_balances_split_refused_chunks():
+
+    node = PairLimitedNode(300)
+    client = BalanceClient(node, "0x" + "22" * 20, chunk_size=1_000, max_workers=4)
+    pairs = [("0x" + "11" * 20, "0x" + f"{i:040x}") for i in range(5_000)]
+
+    assert client.available_balances(pairs) == [i % 1000 for i in range(5_000)]
+    assert client.chunk_size <= 300
+
+
+class TimeoutNode(PairLimitedNode):
+    """TimeoutNode times out on chunks above max_pairs, as a proxy does"""
+
+    def make_request(self, method, params):
+        response = super().make_request(method, params)
+        if "error" in response:
+            raise requests.Timeout("Read timed out")
+        return response
+
+
+def test_balances_split_chunks_on_timeout():
+
+    node = TimeoutNode(300)
+    client = BalanceClient(node, "0x" + "22" * 20, chunk_size=1_000, max_workers=4)
+    pairs = [("0x" + "11" * 20, "0x" + f"{i:040x}") for i in range(2_000)]
+
+    assert client.available_balances(pairs) == [i % 1000 for i in range(2_000)]
+    assert client.chunk_size <= 300
+
+    with pytest.raises(requests.Timeout):
+        BalanceClient(TimeoutNode(0), "0x" + "22" * 20).available_balances(pairs[:1])
+
+
+def test_balances_revert_single_pair_refused():
+
+    client = BalanceClient(PairLimitedNode(0), "0x" + "22" * 20)
+
+    with pytest.raises(RPCError):
+        client.available_balances([("0x" + "11" * 20, "0x" + "33" * 20)])
+
+
+def test_balances_match_single_views(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    pairs = [
+        (token.address, accounts[i].address)
+        for token in (usdc_token, dxln_token)
+        for i in range(10)
+    ]
+    client = BalanceClient(web3.provider, dexilon_bridge.address, chunk_size=7)
+
+    assert client.available_balances(pairs) == [
+        dexilon_bridge.getAvailableBalance(token, user) for (token, user) in pairs
+    ]
+    assert client.locked_balances([usdc_token.address, dxln_token.address]) == [
+        dexilon_bridge.getLockedBalance(usdc_token),
+        dexilon_bridge.getLockedBalance(dxln_token),
+    ]
+
+
+def test_balances_revert_incorrect_lists(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    with reverts("Lists length do not match!"):
+        dexilon_bridge.getAvailableBalances(
+            [usdc_token.address], [accounts[0].address, accounts[1].address]
+        )
@@ -9,10 +9,35 @@ import pytest
 import random
 from hexbytes import HexBytes
 
+from dexilon_bridge.signing import sign_batch
+
 
 # START ======================== TESTS BATCH =================================
 
 
+def record_batch(deploy, tokens, batch_users, batch_balances, batchId):
+    """record_batch settles a batch signed by all validators"""
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
+    )
+    return dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+
 def test_batch_sign_a_batch_by_all_validators(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
@@ -23,18 +48,14 @@ def test_batch_sign_a_batch_by_all_validators(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
     )
-
-    signatures = []
-    for pk in private_keys:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
     dexilon_bridge.batchUpdateAvailableBalances(
         usdc_token.address,
         batch_users,
@@ -66,19 +87,15 @@ def test_batch_revert_only_validator(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 33
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
     )
 
-    signatures = []
-    for pk in private_keys:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -377,19 +394,15 @@ def test_batch_revert_not_enough_signatures_5_of_10(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101 + 1
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:5],
     )
 
-    signatures = []
-    for pk in private_keys[:5]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -416,19 +429,15 @@ def test_batch_revert_abusing_one_signature(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 500
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:1],
     )
 
-    signatures = []
-    for pk in private_keys[:1]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -444,7 +453,7 @@ def test_batch_revert_abusing_one_signature(deploy, tokens):
     except Exception as e:
         print(repr(e))
 
-    with reverts("Not enough signatures!"):
+    with reverts("Signers not in ascending order!"):
         dexilon_bridge.batchUpdateAvailableBalances.call(*tx_data)
 
 
@@ -488,19 +497,15 @@ def test_batch_revert_not_enough_signatures_6_of_10(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101 + 1
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:6],
     )
 
-    signatures = []
-    for pk in private_keys[:6]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -527,19 +532,16 @@ def test_batch_revert_same_batchId(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    record_batch(deploy, tokens, batch_users, batch_balances, batchId)
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:7],
     )
 
-    signatures = []
-    for pk in private_keys[:7]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -566,19 +568,15 @@ def test_batch_revert_wrong_signatures(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:7],
     )
 
-    signatures = []
-    for pk in private_keys[:7]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -644,18 +642,15 @@ def test_batch_second_batch_is_added(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
     batch_balances = [1001, 1002, 1003]
     batchId = 101 + 1
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    record_batch(deploy, tokens, batch_users, batch_balances, 101)
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
     )
-
-    signatures = []
-    for pk in private_keys[:8]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
     dexilon_bridge.batchUpdateAvailableBalances(
         usdc_token.address,
         batch_users,
@@ -688,18 +683,23 @@ def test_batch_one_tx_batch(deploy, tokens):
         1001,
     ]
     batchId = 101 + 2
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
-    )
-
-    signatures = []
-    for pk in private_keys[:8]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
+    # two earlier batches of all three users
+    for earlierBatchId in (101, 102):
+        record_batch(
+            deploy,
+            tokens,
+            [accounts[0].address, accounts[1].address, accounts[2].address],
+            [1001, 1002, 1003],
+            earlierBatchId,
         )
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
+    )
     dexilon_bridge.batchUpdateAvailableBalances(
         usdc_token.address,
         batch_users,
@@ -727,18 +727,14 @@ def test_batch_revert_incorrect_signature(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address]
     batch_balances = [1001, 1002]
     batchId = 77100
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:7],
     )
-
-    signatures = []
-    for pk in private_keys[:7]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
     signatures.append("0x1234")
 
     tx_data = [
@@ -767,19 +763,15 @@ def test_batch_revert_not_enough_locked(deploy, tokens):
     batch_users = [accounts[0].address, accounts[1].address]
     batch_balances = [10001 * 10 ** 6, 10002 * 10 ** 6]
     batchId = 88100
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
     )
 
-    signatures = []
-    for pk in private_keys[:8]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
-
     tx_data = [
         usdc_token.address,
         batch_users,
@@ -797,3 +789,70 @@ def test_batch_revert_not_enough_locked(deploy, tokens):
 
     with reverts("Not enough locked token!"):
         dexilon_bridge.batchUpdateAvailableBalances.call(*tx_data)
+
+
+def test_batch_revert_unsorted_signatures(deploy, tokens):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_users = [accounts[0].address, accounts[1].address]
+    batch_balances = [1001, 1002]
+    batchId = 99100
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
+    )
+
+    tx_data = [
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures[::-1],
+        {"from": accounts[0]},
+    ]
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalances(*tx_data)
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Signers not in ascending order!"):
+        dexilon_bridge.batchUpdateAvailableBalances.call(*tx_data)
+
+
+def test_batch_calldata_hash_matches_packed_encoding(deploy, tokens):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    # repeated users and an odd length, hashed on-chain straight from calldata
+    batch_users = [accounts[i % 5].address for i in range(301)]
+    batch_balances = [i + 1 for i in range(301)]
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    old_balance = dexilon_bridge.getAvailableBalance(usdc_token, accounts[1])
+
+    record_batch(deploy, tokens, batch_users, batch_balances, 99101)
+
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + sum(
+        batch_balances
+    )
+    assert dexilon_bridge.getAvailableBalance(
+        usdc_token, accounts[1]
+    ) == old_balance + sum(batch_balances[1::5])
+
+
+def test_batch_empty_batch_is_recorded(deploy, tokens):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+
+    tx = record_batch(deploy, tokens, [], [], 99102)
+
+    assert tx.events["BatchRecorded"]["batchId"] == 99102
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token)
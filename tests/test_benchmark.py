@@ -0,0 +1,40 @@
+import pytest
+
+from dexilon_bridge.benchmark import cell_name, compare, repeated_users
+
+
+# START ======================== TESTS BENCHMARK =================================
+
+
+def test_benchmark_cell_name_keeps_parameter_order():
+
+    assert (
+        cell_name("batchUpdateAvailableBalances", token="USDC", users=10, repeated=0.5)
+        == "batchUpdateAvailableBalances/token=USDC/users=10/repeated=0.5"
+    )
+
+
+def test_benchmark_repeated_users_ratio():
+
+    batch_users = repeated_users(list(range(100)), 10, 0.5)
+
+    assert len(batch_users) == 10
+    assert len(set(batch_users)) == 5
+    assert repeated_users(list(range(100)), 10, 0) == list(range(10))
+
+    with pytest.raises(ValueError):
+        repeated_users(list(range(3)), 10, 0)
+
+
+def test_benchmark_compare_flags_regressions_beyond_threshold():
+
+    baseline = {"deposit": 50_000, "withdraw": 40_000, "batch": 100_000, "old": 1}
+    results = {"deposit": 50_900, "withdraw": 42_000, "batch": 90_000, "new": 1}
+
+    comparison = compare(baseline, results, 0.02)
+
+    assert [change.cell for change in comparison.regressions] == ["withdraw"]
+    assert comparison.regressions[0].ratio == pytest.approx(0.05)
+    assert [change.cell for change in comparison.improvements] == ["batch"]
+    assert comparison.new_cells == ["new"]
+    assert comparison.missing_cells == ["old"]
@@ -0,0 +1,171 @@
+from brownie import accounts, reverts
+
+from eth_utils import keccak
+import pytest
+
+from dexilon_bridge.ecdsa import ECDSAError, from_compact, recover, to_compact
+from dexilon_bridge.signing import (
+    compact_signatures,
+    eth_signed_hash,
+    sign_batch,
+    sign_batch_compact,
+    sign_hash,
+    split_compact_signatures,
+)
+from dexilon_bridge.simulator import BridgeRevert
+
+
+# START ======================== TESTS COMPACT SIGNATURES =================================
+
+
+@pytest.mark.parametrize("message", range(8))
+def test_compact_signature_round_trip(message, sim_keys):
+
+    eth_hash = eth_signed_hash(keccak(message.to_bytes(32, "big")))
+    for pk in sim_keys:
+        signature = sign_hash(pk, eth_hash)
+        compact = to_compact(signature)
+
+        assert len(compact) == 64
+        assert compact[:32] == signature[:32]
+        assert compact[32] >> 7 == signature[64] - 27
+        assert from_compact(compact) == signature
+        assert recover(eth_hash, from_compact(compact)) == recover(eth_hash, signature)
+
+
+def test_compact_signature_rejects_high_s(sim_keys):
+
+    eth_hash = eth_signed_hash(keccak(b"compact"))
+    signature = sign_hash(sim_keys[0], eth_hash)
+
+    with pytest.raises(ECDSAError, match="'s' value"):
+        to_compact(signature[:32] + b"\xff" * 32 + signature[64:])
+    with pytest.raises(ECDSAError, match="invalid signature length"):
+        to_compact(signature[:64])
+
+
+def test_compact_signatures_blob(sim_keys, sim_token, sim_users):
+
+    signatures = sign_batch(bytes(32), sim_token, sim_users[:2], [1, 2], 1, sim_keys)
+    blob = sign_batch_compact(bytes(32), sim_token, sim_users[:2], [1, 2], 1, sim_keys)
+
+    assert blob == compact_signatures(signatures)
+    assert len(blob) == 64 * len(sim_keys)
+    assert split_compact_signatures(blob) == signatures
+
+    with pytest.raises(ValueError, match="Invalid signatures length!"):
+        split_compact_signatures(blob[:-1])
+
+
+def test_simulator_compact_batch(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[1], sim_token, 1000)
+
+    blob = sign_batch_compact(
+        simulator.domain_separator, sim_token, [sim_users[1]], [300], 1, sim_keys[:3]
+    )
+
+    with pytest.raises(BridgeRevert, match="Invalid signatures length!"):
+        simulator.batch_update_available_balances_compact(
+            sim_validators[0], sim_token, [sim_users[1]], [300], 1, blob[:-1]
+        )
+    with pytest.raises(BridgeRevert, match="Not enough signatures!"):
+        simulator.batch_update_available_balances_compact(
+            sim_validators[0], sim_token, [sim_users[1]], [300], 1, blob[:128]
+        )
+
+    simulator.batch_update_available_balances_compact(
+        sim_validators[0], sim_token, [sim_users[1]], [300], 1, blob
+    )
+    assert simulator.get_available_balance(sim_token, sim_users[1]) == 300
+    assert simulator.get_locked_balance(sim_token) == 700
+
+
+def test_compact_signature_recovered_by_ecdsa(other_mocks, deploy):
+
+    (ecdsa, address) = other_mocks
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    eth_hash = eth_signed_hash(keccak(b"OpenZeppelin"))
+    for i in range(4):
+        compact = to_compact(sign_hash(private_keys[i], eth_hash))
+        assert (
+            ecdsa.recover_r_vs(eth_hash, compact[:32], compact[32:])
+            == pk_accounts[i].address
+        )
+
+
+def test_compact_batch_update(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address, accounts[2].address]
+    amounts = [100, 200]
+    blob = sign_batch_compact(
+        domainSeparator, usdc_token.address, users, amounts, 1, private_keys[:8]
+    )
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    old_balance = dexilon_bridge.getAvailableBalance(usdc_token, accounts[2])
+
+    tx = dexilon_bridge.batchUpdateAvailableBalancesCompact(
+        usdc_token, users, amounts, 1, blob, {"from": accounts[0]}
+    )
+
+    assert "BatchRecorded" in tx.events
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 300
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[2]) == (
+        old_balance + 200
+    )
+
+
+def test_compact_batch_revert_invalid_signatures_length(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address]
+    blob = sign_batch_compact(
+        domainSeparator, usdc_token.address, users, [100], 2, private_keys[:8]
+    )
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesCompact(
+            usdc_token, users, [100], 2, blob[:-1], {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Invalid signatures length!"):
+        dexilon_bridge.batchUpdateAvailableBalancesCompact.call(
+            usdc_token, users, [100], 2, blob[:-1], {"from": accounts[0]}
+        )
+
+
+def test_compact_batch_revert_not_enough_signatures(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address]
+    blob = sign_batch_compact(
+        domainSeparator, usdc_token.address, users, [100], 3, private_keys[:8]
+    )
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesCompact(
+            usdc_token, users, [100], 3, blob[: 64 * 6], {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Not enough signatures!"):
+        dexilon_bridge.batchUpdateAvailableBalancesCompact.call(
+            usdc_token, users, [100], 3, blob[: 64 * 6], {"from": accounts[0]}
+        )
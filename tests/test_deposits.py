@@ -1,4 +1,4 @@
-from brownie import VerifySignature, accounts, reverts
+from brownie import accounts, reverts
 from eth_keys import keys
 from eth_account.messages import encode_defunct, _hash_eip191_message
 from brownie.network.state import Chain
@@ -45,6 +45,9 @@ def test_deposits_remove_all_supported_tokens(deploy):
 def test_deposits_restore_supported_token(deploy, tokens):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
 
+    for token in dexilon_bridge.getSupportedTokens():
+        dexilon_bridge.setSupportedToken(token, False, {"from": accounts[0]})
+
     for token in tokens:
         dexilon_bridge.setSupportedToken(token, True, {"from": accounts[0]})
 
@@ -66,6 +69,7 @@ def test_deposits_set_supported_token_false(deploy, tokens):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
 
+    dexilon_bridge.setSupportedToken(accounts[7], True, {"from": accounts[0]})
     prev_number_of_tokens = len(dexilon_bridge.getSupportedTokens())
     dexilon_bridge.setSupportedToken(accounts[7], False, {"from": accounts[0]})
 
@@ -90,6 +94,8 @@ def test_deposits_set_supported_token_true_again(deploy, tokens):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
 
+    dexilon_bridge.setSupportedToken(accounts[7], True, {"from": accounts[0]})
+    dexilon_bridge.setSupportedToken(accounts[7], False, {"from": accounts[0]})
     prev_number_of_tokens = len(dexilon_bridge.getSupportedTokens())
     dexilon_bridge.setSupportedToken(accounts[7], True, {"from": accounts[0]})
 
@@ -100,6 +106,7 @@ def test_deposits_set_supported_token_true_again(deploy, tokens):
 def test_deposits_set_supported_token_that_is_already_set(deploy, tokens):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
 
+    dexilon_bridge.setSupportedToken(accounts[7], True, {"from": accounts[0]})
     prev_number_of_tokens = len(dexilon_bridge.getSupportedTokens())
     dexilon_bridge.setSupportedToken(accounts[7], True, {"from": accounts[0]})
 
@@ -132,6 +139,68 @@ def test_deposits_revert_zero_token(deploy):
         )
 
 
+def test_deposits_set_supported_tokens_batch(deploy, tokens):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    new_tokens = [accounts[i].address for i in range(6, 10)]
+    dexilon_bridge.setSupportedTokens(
+        new_tokens, [True] * len(new_tokens), {"from": accounts[0]}
+    )
+
+    assert dexilon_bridge.getSupportedTokens() == [
+        usdc_token.address,
+        dxln_token.address,
+    ] + new_tokens
+
+    # removal moves the last token into the freed place, as setSupportedToken did
+    dexilon_bridge.setSupportedTokens(
+        [usdc_token, new_tokens[3], new_tokens[0]],
+        [False, False, True],
+        {"from": accounts[0]},
+    )
+
+    assert dexilon_bridge.getSupportedTokens() == [
+        new_tokens[2],
+        dxln_token.address,
+        new_tokens[0],
+        new_tokens[1],
+    ]
+
+    dexilon_bridge.setSupportedToken(usdc_token, True, {"from": accounts[0]})
+    assert dexilon_bridge.getSupportedTokens()[-1] == usdc_token.address
+
+
+def test_deposits_set_supported_tokens_revert_incorrect_lists(deploy):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.setSupportedTokens(
+            [accounts[7], accounts[8]], [True], {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Lists length do not match!"):
+        dexilon_bridge.setSupportedTokens.call(
+            [accounts[7], accounts[8]], [True], {"from": accounts[0]}
+        )
+
+
+def test_deposits_set_supported_tokens_revert_only_owner(deploy):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.setSupportedTokens([accounts[7]], [True], {"from": accounts[3]})
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Ownable: caller is not the owner"):
+        dexilon_bridge.setSupportedTokens.call(
+            [accounts[7]], [True], {"from": accounts[3]}
+        )
+
+
 def test_deposits_dexilon_token(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
@@ -0,0 +1,39 @@
+from web3 import Web3
+import pytest
+
+from dexilon_bridge.eip712 import DOMAIN_TYPE_HASH, domain_separator
+
+
+# START ======================== TESTS EIP712 =================================
+
+
+def test_eip712_domain_separator_matches_abi_encode(deploy):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    local_abiencode = (
+        DOMAIN_TYPE_HASH.hex().replace("0x", "")
+        + Web3.keccak(text="Dexilon").hex().replace("0x", "")
+        + Web3.keccak(text="tests").hex().replace("0x", "")
+        + (1337).to_bytes(32, byteorder="big").hex()
+        + "0" * 24
+        + str(dexilon_bridge.address).lower().replace("0x", "")
+    )
+
+    assert Web3.keccak(hexstr=local_abiencode) == domainSeparator
+
+
+def test_eip712_domain_separator_is_cached_per_domain(deploy):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    domain_separator("Dexilon", "cache", 1337, dexilon_bridge.address)
+    hits = domain_separator.cache_info().hits
+
+    assert domain_separator(
+        "Dexilon", "cache", 1337, str(dexilon_bridge.address).lower()
+    ) == domain_separator("Dexilon", "cache", 1337, dexilon_bridge.address)
+    assert domain_separator.cache_info().hits == hits + 2
+    assert domain_separator(
+        "Dexilon", "cache", 80001, dexilon_bridge.address
+    ) != domain_separator("Dexilon", "cache", 1337, dexilon_bridge.address)
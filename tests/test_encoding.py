@@ -0,0 +1,70 @@
+from eth_utils import to_checksum_address
+from web3 import Web3
+import pytest
+import random
+
+from dexilon_bridge.encoding import (
+    PAYOUT_BATCH_TAG,
+    encode_batch,
+    hash_batch,
+    hash_payout_batch,
+)
+
+
+# START ======================== TESTS ENCODING =================================
+
+SEPARATOR = bytes(range(32))
+
+
+@pytest.mark.parametrize("users", [100, 10_000])
+def test_encoding_hash_matches_solidity_keccak(users, sim_token):
+
+    batch_users = [
+        to_checksum_address(random.getrandbits(160).to_bytes(20, "big"))
+        for i in range(users)
+    ]
+    batch_balances = [random.randint(1, 10 ** 30) for i in range(users)]
+    batchId = random.randint(1, 10 ** 9)
+
+    base_message = Web3.solidityKeccak(
+        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
+        [SEPARATOR, sim_token, batch_users, batch_balances, batchId],
+    )
+
+    assert base_message == hash_batch(
+        SEPARATOR, sim_token, batch_users, batch_balances, batchId
+    )
+
+
+def test_encoding_empty_batch_matches_solidity_keccak(sim_token):
+
+    base_message = Web3.solidityKeccak(
+        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
+        [SEPARATOR, sim_token, [], [], 0],
+    )
+
+    assert base_message == hash_batch(SEPARATOR, sim_token, [], [], 0)
+
+
+def test_encoding_payout_hash_matches_solidity_keccak():
+
+    separator = bytes(range(32))
+    token = "0x" + "11" * 20
+    users = ["0x" + "21" * 20, "0x" + "22" * 20]
+    batch_hash = hash_batch(separator, token, users, [1, 2], 7)
+
+    for payout in (False, True):
+        assert hash_payout_batch(
+            separator, token, users, [1, 2], 7, payout
+        ) == Web3.solidityKeccak(
+            ["bytes32", "bytes32", "bytes32", "bool"],
+            [separator, PAYOUT_BATCH_TAG, batch_hash, payout],
+        )
+    # the flag is signed, a batch never hashes like its payout
+    assert hash_payout_batch(separator, token, users, [1, 2], 7, True) != batch_hash
+
+
+def test_encoding_revert_incorrect_lists(sim_token, sim_users):
+
+    with pytest.raises(ValueError, match="Lists length do not match!"):
+        encode_batch(SEPARATOR, sim_token, sim_users[:1], [1, 2], 1)
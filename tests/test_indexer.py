@@ -0,0 +1,228 @@
+from brownie import accounts, web3
+
+import pytest
+import requests
+
+from dexilon_bridge.indexer import DEPOSIT_TOPIC, BridgeIndexer, EventStore
+from dexilon_bridge.rpc import RPCError
+from dexilon_bridge.signing import sign_batch
+
+
+# START ======================== TESTS INDEXER =================================
+
+
+class RangeLimitedNode:
+    """RangeLimitedNode serves one Deposit log per block and rejects large ranges
+
+    Blocks from `fork` on belong to the fork with id `chain`, their hashes and
+    deposit amounts change with it.
+    """
+
+    def __init__(self, blocks, max_range):
+        self.blocks = blocks
+        self.max_range = max_range
+        self.ranges = []
+        self.fork = 0
+        self.chain = 0
+
+    def _chain(self, block):
+        return self.chain if block >= self.fork else 0
+
+    def refuse(self):
+        return {"error": {"code": -32005, "message": "too many results"}}
+
+    def make_request(self, method, params):
+        if method == "eth_blockNumber":
+            return {"result": hex(self.blocks - 1)}
+        if method == "eth_getBlockByNumber":
+            block = int(params[0], 16)
+            block_hash = "0x" + f"{self._chain(block):032x}{block:032x}"
+            return {"result": {"hash": block_hash}}
+        from_block = int(params[0]["fromBlock"], 16)
+        to_block = int(params[0]["toBlock"], 16)
+        self.ranges.append(to_block - from_block + 1)
+        if to_block - from_block + 1 > self.max_range:
+            return self.refuse()
+        return {
+            "result": [
+                {
+                    "blockNumber": hex(block),
+                    "logIndex": "0x0",
+                    "transactionHash": "0x" + f"{block:064x}",
+                    "topics": [
+                        DEPOSIT_TOPIC,
+                        "0x" + f"{block % 3 + 1:064x}",
+                        "0x" + "00" * 12 + "11" * 20,
+                    ],
+                    "data": "0x"
+                    + f"{block + self._chain(block):064x}"
+                    + f"{1_600_000_000:064x}",
+                }
+                for block in range(from_block, to_block + 1)
+            ]
+        }
+
+
+class GatewayNode(RangeLimitedNode):
+    """GatewayNode refuses large ranges with an HTTP error, as a proxy does"""
+
+    def refuse(self):
+        raise requests.HTTPError("413 Client Error: Payload Too Large")
+
+
+def test_indexer_adapts_range_to_node_limit():
+
+    node = RangeLimitedNode(50_000, 3_000)
+    store = EventStore(":memory:")
+    indexer = BridgeIndexer(
+        node, "0x" + "22" * 20, store, chunk_size=10_000, confirmations=0
+    )
+
+    assert indexer.sync() == 50_000
+    assert store.checkpoint("0x" + "22" * 20) == 49_999
+    # failed ranges are halved, successful ones grow back towards the limit
+    assert len(node.ranges) < 60
+    assert store.net_deposits(
+        "0x" + "22" * 20, "0x" + f"{1:040x}", "0x" + "11" * 20
+    ) == sum(range(0, 50_000, 3))
+
+    # nothing is stored twice
+    assert indexer.sync(to_block=49_999) == 0
+
+
+def test_indexer_revert_single_block_error():
+
+    node = RangeLimitedNode(10, 0)
+    indexer = BridgeIndexer(
+        node, "0x" + "22" * 20, EventStore(":memory:"), confirmations=0
+    )
+
+    with pytest.raises(RPCError):
+        indexer.sync()
+
+
+def test_indexer_halves_range_on_http_error():
+
+    node = GatewayNode(5_000, 1_000)
+    store = EventStore(":memory:")
+    indexer = BridgeIndexer(
+        node, "0x" + "22" * 20, store, chunk_size=4_000, confirmations=0
+    )
+
+    assert indexer.sync() == 5_000
+    assert node.ranges[:3] == [4_000, 2_000, 1_000]
+
+    indexer = BridgeIndexer(
+        GatewayNode(10, 0), "0x" + "22" * 20, EventStore(":memory:"), confirmations=0
+    )
+    with pytest.raises(requests.HTTPError):
+        indexer.sync()
+
+
+def test_indexer_leaves_unconfirmed_blocks():
+
+    node = RangeLimitedNode(1_000, 1_000)
+    store = EventStore(":memory:")
+    indexer = BridgeIndexer(node, "0x" + "22" * 20, store)
+
+    assert indexer.sync() == 1_000 - 12
+    assert store.checkpoint("0x" + "22" * 20) == 999 - 12
+
+
+def test_indexer_reindexes_after_reorg():
+
+    node = RangeLimitedNode(1_000, 1_000)
+    store = EventStore(":memory:")
+    user = "0x" + f"{1:040x}"
+    token = "0x" + "11" * 20
+    indexer = BridgeIndexer(
+        node, "0x" + "22" * 20, store, confirmations=0, reorg_depth=20
+    )
+    indexer.sync()
+
+    # the last 10 blocks are replaced by blocks with other deposits
+    node.fork = 990
+    node.chain = 7
+    node.blocks = 1_005
+    assert indexer.sync() == 20 + 5
+    assert store.checkpoint("0x" + "22" * 20) == 1_004
+    assert store.net_deposits("0x" + "22" * 20, user, token) == sum(
+        block + (7 if block >= 990 else 0) for block in range(0, 1_005, 3)
+    )
+
+    # without a reorg only the new blocks are read
+    node.blocks = 1_010
+    assert indexer.sync() == 5
+
+
+def test_indexer_keeps_contracts_apart():
+
+    node = RangeLimitedNode(1_000, 1_000)
+    store = EventStore(":memory:")
+    user = "0x" + f"{1:040x}"
+    token = "0x" + "11" * 20
+    first = BridgeIndexer(node, "0x" + "22" * 20, store, confirmations=0)
+    second = BridgeIndexer(node, "0x" + "33" * 20, store, confirmations=0)
+
+    # both bridges emit logs at the same block numbers and log indexes
+    assert first.sync() == 1_000
+    assert second.sync() == 1_000
+    assert store.net_deposits("0x" + "22" * 20, user, token) == sum(range(0, 1_000, 3))
+    assert store.net_deposits("0x" + "33" * 20, user, token) == sum(range(0, 1_000, 3))
+
+    # a rewind of one bridge leaves the events of the other
+    assert store.rewind("0x" + "22" * 20, 499) == 500
+    assert store.net_deposits("0x" + "22" * 20, user, token) == sum(range(0, 500, 3))
+    assert store.net_deposits("0x" + "33" * 20, user, token) == sum(range(0, 1_000, 3))
+    assert store.checkpoint("0x" + "33" * 20) == 999
+
+
+def test_indexer_indexes_bridge_events(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_users = [accounts[1].address]
+    batch_balances = [1_000]
+    batchId = 777
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
+    )
+    dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+    dexilon_bridge.withdraw(usdc_token, {"from": accounts[1]})
+
+    store = EventStore(":memory:")
+    indexer = BridgeIndexer(
+        web3.provider, dexilon_bridge.address, store, confirmations=0
+    )
+    indexer.sync()
+
+    deposited = store.connection.execute(
+        "SELECT COUNT(*) FROM deposits WHERE contract = ? AND token = ?",
+        (dexilon_bridge.address.lower(), usdc_token.address.lower()),
+    ).fetchone()[0]
+    (batch_id, received_from) = store.connection.execute(
+        "SELECT batch_id, received_from FROM batches WHERE contract = ?",
+        (dexilon_bridge.address.lower(),),
+    ).fetchone()
+
+    # deploy fixture deposits for 3 users
+    assert deposited == 3
+    assert int(batch_id) == batchId
+    assert received_from == accounts[0].address.lower()
+    assert store.net_deposits(
+        dexilon_bridge.address, accounts[1].address, usdc_token.address
+    ) == (1_000 * 10 ** 6 - 1_000)
+    assert store.checkpoint(dexilon_bridge.address) == web3.eth.block_number
@@ -0,0 +1,184 @@
+from brownie import accounts, reverts
+
+import pytest
+import tracemalloc
+
+from dexilon_bridge.encoding import WORD_SIZE
+from dexilon_bridge.merkle import CHUNK_NODES, MerkleTree, leaf_hash, verify
+from dexilon_bridge.signing import sign_merkle_root
+
+
+# START ======================== TESTS MERKLE =================================
+
+
+def submit_root(dexilon_bridge, private_keys, domainSeparator, tree, batchId):
+    signatures = sign_merkle_root(
+        domainSeparator,
+        tree.token,
+        tree.root,
+        tree.cumulative_total,
+        batchId,
+        private_keys[:8],
+    )
+    return dexilon_bridge.batchUpdateMerkleRoot(
+        "0x" + tree.token.hex(),
+        tree.root,
+        tree.cumulative_total,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+
+def claim_first_root(dexilon_bridge, private_keys, domainSeparator, usdc_token):
+    """claim_first_root records a first usdc root, accounts[2] claims its 300"""
+    pairs = [(accounts[i].address, 100 * (i + 1)) for i in range(5)]
+    with MerkleTree(usdc_token.address, pairs) as tree:
+        submit_root(dexilon_bridge, private_keys, domainSeparator, tree, 1)
+        proof = tree.proof(2)
+    dexilon_bridge.withdrawWithProof(usdc_token, 300, proof, {"from": accounts[2]})
+
+
+@pytest.mark.parametrize("leaves", [1, 2, 3, 7, 8, 9])
+def test_merkle_proofs_verify(leaves):
+
+    token = "0x" + "11" * 20
+    pairs = [("0x" + f"{i + 1:040x}", 1000 + i) for i in range(leaves)]
+
+    with MerkleTree(token, pairs) as tree:
+        assert tree.cumulative_total == sum(amount for (user, amount) in pairs)
+        for index, (user, amount) in enumerate(pairs):
+            proof = tree.proof(index)
+            assert verify(proof, tree.root, leaf_hash(user, token, amount))
+            assert not verify(proof, tree.root, leaf_hash(user, token, amount + 1))
+
+
+def test_merkle_builds_in_bounded_memory():
+
+    token = "0x" + "11" * 20
+
+    tracemalloc.start()
+    try:
+        with MerkleTree(
+            token, ((i.to_bytes(20, "big"), i) for i in range(1, 100_001))
+        ) as tree:
+            root = tree.root
+            proof = tree.proof(54_321)
+        (current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    leaf = leaf_hash((54_322).to_bytes(20, "big"), token, 54_322)
+    assert verify(proof, root, leaf)
+    assert peak < 4 * CHUNK_NODES * WORD_SIZE
+
+
+def test_merkle_claim_with_proof(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    pairs = [(accounts[i].address, 100 * (i + 1)) for i in range(5)]
+
+    with MerkleTree(usdc_token.address, pairs) as tree:
+        tx = submit_root(dexilon_bridge, private_keys, domainSeparator, tree, 1)
+        proof = tree.proof(2)
+        assert dexilon_bridge.getMerkleRoot(usdc_token) == (
+            "0x" + tree.root.hex(),
+            tree.cumulative_total,
+        )
+
+    assert "MerkleRootRecorded" in tx.events
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 1500
+
+    balance_before = usdc_token.balanceOf(accounts[2])
+    dexilon_bridge.withdrawWithProof(usdc_token, 300, proof, {"from": accounts[2]})
+
+    assert usdc_token.balanceOf(accounts[2]) == balance_before + 300
+    assert dexilon_bridge.getClaimedAmount(usdc_token, accounts[2]) == 300
+
+
+def test_merkle_next_root_pays_difference(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+    claim_first_root(dexilon_bridge, private_keys, domainSeparator, usdc_token)
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    pairs = [(accounts[i].address, 100 * (i + 1) + 50) for i in range(5)]
+
+    with MerkleTree(usdc_token.address, pairs) as tree:
+        submit_root(dexilon_bridge, private_keys, domainSeparator, tree, 2)
+        proof = tree.proof(2)
+
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 250
+
+    balance_before = usdc_token.balanceOf(accounts[2])
+    dexilon_bridge.withdrawWithProof(usdc_token, 350, proof, {"from": accounts[2]})
+
+    assert usdc_token.balanceOf(accounts[2]) == balance_before + 50
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.withdrawWithProof(usdc_token, 350, proof, {"from": accounts[2]})
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("No balance!"):
+        dexilon_bridge.withdrawWithProof.call(
+            usdc_token, 350, proof, {"from": accounts[2]}
+        )
+
+
+def test_merkle_revert_invalid_proof(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    pairs = [(accounts[i].address, 100 * (i + 1) + 50) for i in range(5)]
+    with MerkleTree(usdc_token.address, pairs) as tree:
+        proof = tree.proof(3)
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.withdrawWithProof(
+            usdc_token, 10_000, proof, {"from": accounts[3]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Invalid proof!"):
+        dexilon_bridge.withdrawWithProof.call(
+            usdc_token, 10_000, proof, {"from": accounts[3]}
+        )
+
+
+def test_merkle_revert_cumulative_total_decreased(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+    claim_first_root(dexilon_bridge, private_keys, domainSeparator, usdc_token)
+
+    pairs = [(accounts[i].address, 100) for i in range(5)]
+    with MerkleTree(usdc_token.address, pairs) as tree:
+        signatures = sign_merkle_root(
+            domainSeparator, usdc_token.address, tree.root, 500, 3, private_keys[:8]
+        )
+        tx_data = [
+            usdc_token.address,
+            tree.root,
+            500,
+            3,
+            signatures,
+            {"from": accounts[0]},
+        ]
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateMerkleRoot(*tx_data)
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Cumulative total decreased!"):
+        dexilon_bridge.batchUpdateMerkleRoot.call(*tx_data)
@@ -0,0 +1,233 @@
+from brownie import accounts, reverts
+
+from web3 import Web3
+import pytest
+
+from dexilon_bridge.encoding import (
+    MULTI_TOKEN_BATCH_TAG,
+    hash_batch,
+    hash_multi_token_batch,
+    hash_token_updates,
+)
+from dexilon_bridge.signing import sign_multi_token_batch
+from dexilon_bridge.simulator import BridgeRevert
+
+
+# START ======================== TESTS MULTI TOKEN =================================
+
+
+def test_multi_token_hash_matches_solidity_keccak(sim_tokens, sim_users):
+
+    separator = bytes(range(32))
+    users = [sim_users[:2], sim_users[2:3]]
+    balances = [[1, 2], [3]]
+
+    token_hashes = [
+        Web3.solidityKeccak(
+            ["address", "address[]", "uint256[]"], [token, users[i], balances[i]]
+        )
+        for i, token in enumerate(sim_tokens)
+    ]
+    expected = Web3.solidityKeccak(
+        ["bytes32", "bytes32", "bytes32[]", "uint256"],
+        [separator, MULTI_TOKEN_BATCH_TAG, token_hashes, 7],
+    )
+
+    assert [
+        hash_token_updates(token, users[i], balances[i])
+        for i, token in enumerate(sim_tokens)
+    ] == token_hashes
+    assert hash_multi_token_batch(separator, sim_tokens, users, balances, 7) == expected
+    # a single token batch never hashes like the one-token batch
+    assert hash_multi_token_batch(
+        separator, sim_tokens[:1], users[:1], balances[:1], 7
+    ) != hash_batch(separator, sim_tokens[0], users[0], balances[0], 7)
+
+
+def test_multi_token_hash_revert_incorrect_lists(sim_tokens, sim_users):
+
+    with pytest.raises(ValueError, match="Lists length do not match!"):
+        hash_multi_token_batch(bytes(32), sim_tokens, [sim_users[:1]], [[1], [2]], 1)
+    with pytest.raises(ValueError, match="Lists length do not match!"):
+        hash_multi_token_batch(bytes(32), sim_tokens, [sim_users[:1]] * 2, [[1], []], 1)
+
+
+def test_simulator_multi_token_batch(
+    sim_keys, sim_validators, sim_tokens, sim_users, new_simulator
+):
+
+    simulator = new_simulator(sim_tokens)
+    for token in sim_tokens:
+        simulator.deposit(sim_users[1], token, 500)
+
+    users = [[sim_users[1], sim_users[1]], [sim_users[1]]]
+    balances = [[100, 200], [50]]
+    signatures = sign_multi_token_batch(
+        simulator.domain_separator, sim_tokens, users, balances, 1, sim_keys[:3]
+    )
+
+    with pytest.raises(BridgeRevert, match="Not enough signatures!"):
+        simulator.batch_update_available_balances_multi_token(
+            sim_validators[0], sim_tokens, users, balances, 2, signatures
+        )
+
+    simulator.batch_update_available_balances_multi_token(
+        sim_validators[0], sim_tokens, users, balances, 1, signatures
+    )
+    assert simulator.get_available_balance(sim_tokens[0], sim_users[1]) == 300
+    assert simulator.get_available_balance(sim_tokens[1], sim_users[1]) == 50
+    assert simulator.get_locked_balance(sim_tokens[0]) == 200
+    assert simulator.get_locked_balance(sim_tokens[1]) == 450
+
+    with pytest.raises(BridgeRevert, match="Batch already recorded!"):
+        simulator.batch_update_available_balances_multi_token(
+            sim_validators[0], sim_tokens, users, balances, 1, signatures
+        )
+
+
+def test_simulator_multi_token_batch_is_atomic(
+    sim_keys, sim_validators, sim_tokens, sim_users, new_simulator
+):
+
+    simulator = new_simulator(sim_tokens)
+    for token in sim_tokens:
+        simulator.deposit(sim_users[1], token, 500)
+
+    # the second token does not have enough locked, the first is not applied
+    users = [[sim_users[1]], [sim_users[1]]]
+    balances = [[100], [1000]]
+    signatures = sign_multi_token_batch(
+        simulator.domain_separator, sim_tokens, users, balances, 1, sim_keys
+    )
+    with pytest.raises(BridgeRevert, match="Not enough locked token!"):
+        simulator.batch_update_available_balances_multi_token(
+            sim_validators[0], sim_tokens, users, balances, 1, signatures
+        )
+    assert simulator.get_locked_balance(sim_tokens[0]) == 500
+
+    # a token listed twice would be recorded twice under one batch id
+    tokens = [sim_tokens[0], sim_tokens[0]]
+    balances = [[100], [100]]
+    signatures = sign_multi_token_batch(
+        simulator.domain_separator, tokens, users, balances, 1, sim_keys
+    )
+    with pytest.raises(BridgeRevert, match="Batch already recorded!"):
+        simulator.batch_update_available_balances_multi_token(
+            sim_validators[0], tokens, users, balances, 1, signatures
+        )
+    assert simulator.get_locked_balance(sim_tokens[0]) == 500
+
+
+def test_multi_token_batch_update(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_tokens = [usdc_token.address, dxln_token.address]
+    batch_users = [
+        [accounts[1].address, accounts[2].address],
+        [accounts[1].address],
+    ]
+    batch_balances = [[100, 200], [10 ** 18]]
+    batchId = 1
+    old_locked = [dexilon_bridge.getLockedBalance(token) for token in batch_tokens]
+
+    signatures = sign_multi_token_batch(
+        domainSeparator,
+        batch_tokens,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
+    )
+    tx = dexilon_bridge.batchUpdateAvailableBalancesMultiToken(
+        batch_tokens,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+    assert [event["token"] for event in tx.events["BatchRecorded"]] == batch_tokens
+    assert old_locked[0] == dexilon_bridge.getLockedBalance(usdc_token) + 300
+    assert old_locked[1] == dexilon_bridge.getLockedBalance(dxln_token) + 10 ** 18
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[2]) == 200
+    assert dexilon_bridge.getAvailableBalance(dxln_token, accounts[1]) == 10 ** 18
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken(
+            batch_tokens[1:],
+            batch_users[1:],
+            batch_balances[1:],
+            batchId,
+            signatures,
+            {"from": accounts[0]},
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Batch already recorded!"):
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken.call(
+            batch_tokens[1:],
+            batch_users[1:],
+            batch_balances[1:],
+            batchId,
+            signatures,
+            {"from": accounts[0]},
+        )
+
+
+def test_multi_token_batch_revert_not_enough_locked(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_tokens = [usdc_token.address, dxln_token.address]
+    batch_users = [[accounts[1].address], [accounts[1].address]]
+    batch_balances = [[100], [10 ** 30]]
+    signatures = sign_multi_token_batch(
+        domainSeparator, batch_tokens, batch_users, batch_balances, 2, private_keys
+    )
+    tx_data = [
+        batch_tokens,
+        batch_users,
+        batch_balances,
+        2,
+        signatures,
+        {"from": accounts[0]},
+    ]
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken(*tx_data)
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Not enough locked token!"):
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken.call(*tx_data)
+
+
+def test_multi_token_batch_revert_incorrect_lists(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    tx_data = [
+        [usdc_token.address, dxln_token.address],
+        [[accounts[1].address], [accounts[1].address, accounts[2].address]],
+        [[100], [100]],
+        3,
+        [],
+        {"from": accounts[0]},
+    ]
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken(*tx_data)
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Lists length do not match!"):
+        dexilon_bridge.batchUpdateAvailableBalancesMultiToken.call(*tx_data)
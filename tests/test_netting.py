@@ -0,0 +1,121 @@
+from brownie import accounts
+from eth_utils import to_checksum_address
+
+import pytest
+import random
+
+from dexilon_bridge.netting import net_updates
+from dexilon_bridge.planner import GasModel
+from dexilon_bridge.signing import sign_batch
+
+MEASUREMENTS = {1: 120_000, 2: 126_000, 5: 145_000, 10: 175_000, 100: 720_000}
+MODEL = GasModel.fit(MEASUREMENTS, 7, per_repeated_user=3_100)
+
+
+# START ======================== TESTS NETTING =================================
+
+
+def test_netting_sums_repeated_users_in_address_order(sim_token, sim_users):
+
+    updates = [
+        (sim_token, random.choice(sim_users), random.randint(1, 100))
+        for i in range(1000)
+    ]
+
+    netted = net_updates(updates, MODEL)[to_checksum_address(sim_token)]
+
+    assert netted.entries == 1000
+    assert netted.users == sorted(set(netted.users), key=str.lower)
+    for user, amount in zip(netted.users, netted.balance_updates):
+        assert amount == sum(a for (t, u, a) in updates if u == user.lower())
+    # gas of the batch as submitted before netting minus the netted batch
+    distinct = len({u for (t, u, a) in updates})
+    assert netted.gas_saved == MODEL.estimate(
+        distinct, 7, 1000 - distinct
+    ) - MODEL.estimate(len(netted.users), 7)
+
+
+def test_netting_gas_saved_counts_users_netting_to_zero(sim_token, sim_users):
+
+    updates = [(sim_token, user, 10) for user in sim_users] + [
+        (sim_token, sim_users[0], -10),
+        (sim_token, sim_users[1], 5),
+    ]
+
+    netted = net_updates(updates, MODEL)[to_checksum_address(sim_token)]
+
+    assert len(netted.users) == len(sim_users) - 1
+    assert netted.gas_saved == MODEL.estimate(len(sim_users), 7, 2) - (
+        MODEL.estimate(len(sim_users) - 1, 7)
+    )
+
+
+def test_netting_is_independent_of_order_and_case(sim_tokens, sim_users):
+
+    (usdc_token, dxln_token) = [to_checksum_address(t) for t in sim_tokens]
+    users = [to_checksum_address(u) for u in sim_users]
+
+    updates = [(usdc_token, users[i % 4], i) for i in range(1, 100)] + [
+        (dxln_token, users[1], 7)
+    ]
+    shuffled = [
+        (token.lower(), user.lower(), amount)
+        for (token, user, amount) in random.sample(updates, len(updates))
+    ]
+
+    assert net_updates(updates, MODEL) == net_updates(shuffled, MODEL)
+    assert net_updates(updates, MODEL)[dxln_token].users == [users[1]]
+
+
+def test_netting_drops_users_netting_to_zero(sim_token, sim_users):
+
+    netted = net_updates(
+        [
+            (sim_token, sim_users[1], 100),
+            (sim_token, sim_users[2], 100),
+            (sim_token, sim_users[1], -100),
+        ],
+        MODEL,
+    )[to_checksum_address(sim_token)]
+
+    assert netted.users == [to_checksum_address(sim_users[2])]
+    assert netted.balance_updates == [100]
+
+
+def test_netting_revert_negative_net_update(sim_token, sim_users):
+
+    with pytest.raises(ValueError):
+        net_updates([(sim_token, sim_users[1], -1)], MODEL)
+
+
+def test_netting_netted_batch_is_accepted(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    updates = [(usdc_token.address, accounts[i % 3].address, 1000) for i in range(30)]
+    netted = net_updates(updates, MODEL)[usdc_token.address]
+    batchId = 3000
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        netted.users,
+        netted.balance_updates,
+        batchId,
+        private_keys,
+    )
+    before = [dexilon_bridge.getAvailableBalance(usdc_token, u) for u in netted.users]
+
+    dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        netted.users,
+        netted.balance_updates,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+    for user, old_balance in zip(netted.users, before):
+        assert dexilon_bridge.getAvailableBalance(usdc_token, user) == (
+            old_balance + 10_000
+        )
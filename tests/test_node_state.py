@@ -0,0 +1,72 @@
+import os
+
+from dexilon_bridge.node_state import NodeStateCache, state_key
+
+
+# START ======================== TESTS NODE STATE =================================
+
+
+class StateNode:
+    """StateNode keeps its whole state in one dict, like anvil_dumpState"""
+
+    def __init__(self, client_version="anvil/v0.2.0"):
+        self.client_version = client_version
+        self.state = {}
+        self.loads = 0
+
+    def make_request(self, method, params):
+        if method == "web3_clientVersion":
+            return {"result": self.client_version}
+        if method == "anvil_dumpState" and self.client_version.startswith("anvil"):
+            return {"result": "0x" + repr(sorted(self.state.items())).encode().hex()}
+        if method == "anvil_loadState" and self.client_version.startswith("anvil"):
+            self.loads += 1
+            self.state = dict(eval(bytes.fromhex(params[0][2:]).decode()))
+            return {"result": True}
+        return {"error": {"code": -32601, "message": "Method not found"}}
+
+
+def test_node_state_key_depends_on_every_part():
+
+    key = state_key(b"bytecode", "fixture source", "anvil/v0.2.0")
+
+    assert key == state_key(b"bytecode", "fixture source", "anvil/v0.2.0")
+    assert key != state_key(b"bytecode!", "fixture source", "anvil/v0.2.0")
+    assert key != state_key(b"bytecode", "fixture source", "anvil/v0.2.1")
+    # parts are length prefixed, moving bytes between them changes the key
+    assert state_key("ab", "c") != state_key("a", "bc")
+
+
+def test_node_state_boots_into_saved_state(tmp_path):
+
+    key = state_key(b"bytecode")
+    node = StateNode()
+    node.state = {"bridge": "deployed", "deposits": 6}
+
+    cache = NodeStateCache(node, str(tmp_path / "state"), key)
+    assert cache.load() is None
+    assert cache.save({"bridge": "0x" + "ab" * 20})
+    assert os.listdir(tmp_path / "state") == [f"{key}.json"]
+
+    # a later run, or another shard, starts from an empty node
+    fresh = StateNode()
+    data = NodeStateCache(fresh, str(tmp_path / "state"), key).load()
+    assert data == {"bridge": "0x" + "ab" * 20}
+    assert fresh.state == node.state
+
+    # a changed contract or fixture never reads the old state
+    other = StateNode()
+    cache = NodeStateCache(other, str(tmp_path / "state"), state_key(b"v2"))
+    assert cache.load() is None
+    assert other.loads == 0
+
+
+def test_node_state_skipped_without_anvil(tmp_path):
+
+    node = StateNode("Ganache/v7.9.1/EthereumJS TestRPC/v7.9.1/ethereum-js")
+    cache = NodeStateCache(node, str(tmp_path), state_key(b"bytecode"))
+
+    assert not cache.supported
+    assert not cache.save({})
+    assert cache.load() is None
+    assert os.listdir(tmp_path) == []
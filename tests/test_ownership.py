@@ -16,6 +16,7 @@ def test_ownership_transfer_ownership_to_another_account(deploy):
 
 def test_ownership_transfer_ownership_back(deploy):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    dexilon_bridge.transferOwnership(accounts[1], {"from": accounts[0]})
     dexilon_bridge.transferOwnership(accounts[0], {"from": accounts[1]})
     assert dexilon_bridge.owner() == accounts[0]
 
@@ -0,0 +1,165 @@
+from brownie import accounts, reverts
+
+import pytest
+
+from dexilon_bridge.encoding import (
+    MAX_PACKED_AMOUNT,
+    decode_packed_updates,
+    encode_packed_updates,
+    hash_batch,
+    hash_packed_batch,
+)
+from dexilon_bridge.signing import sign_packed_batch
+from dexilon_bridge.simulator import BridgeRevert
+
+
+# START ======================== TESTS PACKED BATCH =================================
+
+
+def test_packed_updates_round_trip(sim_users):
+
+    amounts = [0, 1, 10 ** 18, MAX_PACKED_AMOUNT]
+    packed = encode_packed_updates(sim_users[:4], amounts)
+
+    assert len(packed) == 32 * 4
+    assert packed[:20] == bytes.fromhex(sim_users[0][2:])
+    assert packed[20:32] == bytes(12)
+    assert packed[-12:] == b"\xff" * 12
+
+    (users, balance_updates) = decode_packed_updates(packed)
+    assert ["0x" + user.hex() for user in users] == sim_users[:4]
+    assert balance_updates == amounts
+
+
+def test_packed_updates_reject_invalid_input(sim_users):
+
+    with pytest.raises(ValueError):
+        encode_packed_updates(sim_users[:2], [1])
+    with pytest.raises(ValueError):
+        encode_packed_updates(sim_users[:1], [MAX_PACKED_AMOUNT + 1])
+    with pytest.raises(ValueError):
+        decode_packed_updates(bytes(33))
+
+
+def test_packed_hash_differs_from_batch_hash(sim_token, sim_users):
+
+    separator = bytes(32)
+    packed = encode_packed_updates(sim_users[:2], [1, 2])
+
+    # the same updates signed for one entry point are never valid for the other
+    assert hash_packed_batch(separator, sim_token, packed, 1) != hash_batch(
+        separator, sim_token, sim_users[:2], [1, 2], 1
+    )
+    assert hash_packed_batch(separator, sim_token, packed, 1) != hash_packed_batch(
+        separator, sim_token, packed, 2
+    )
+    assert hash_packed_batch(separator, sim_token, packed, 1) != hash_packed_batch(
+        separator, sim_token, encode_packed_updates(sim_users[:2], [2, 1]), 1
+    )
+
+
+def test_simulator_packed_batch(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[1], sim_token, 500)
+    simulator.deposit(sim_users[2], sim_token, 500)
+
+    packed = encode_packed_updates(
+        [sim_users[1], sim_users[2], sim_users[1]], [100, 200, 300]
+    )
+    signatures = sign_packed_batch(
+        simulator.domain_separator, sim_token, packed, 1, sim_keys[:3]
+    )
+
+    with pytest.raises(BridgeRevert, match="Invalid packed updates!"):
+        simulator.batch_update_available_balances_packed(
+            sim_validators[0], sim_token, packed[:-1], 1, signatures
+        )
+    with pytest.raises(BridgeRevert, match="Not enough signatures!"):
+        simulator.batch_update_available_balances_packed(
+            sim_validators[0], sim_token, packed, 2, signatures
+        )
+
+    simulator.batch_update_available_balances_packed(
+        sim_validators[0], sim_token, packed, 1, signatures
+    )
+    assert simulator.get_available_balance(sim_token, sim_users[1]) == 400
+    assert simulator.get_available_balance(sim_token, sim_users[2]) == 200
+    assert simulator.get_available_balance(sim_token, sim_users[3]) == 0
+    assert simulator.get_locked_balance(sim_token) == 400
+
+
+def test_packed_batch_update(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address, accounts[2].address, accounts[1].address]
+    amounts = [100, 200, 300]
+    packed = encode_packed_updates(users, amounts)
+    signatures = sign_packed_batch(
+        domainSeparator, usdc_token.address, packed, 1, private_keys[:8]
+    )
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    old_balance = dexilon_bridge.getAvailableBalance(usdc_token, accounts[1])
+
+    tx = dexilon_bridge.batchUpdateAvailableBalancesPacked(
+        usdc_token, packed, 1, signatures, {"from": accounts[0]}
+    )
+
+    assert "BatchRecorded" in tx.events
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 600
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[1]) == (
+        old_balance + 400
+    )
+
+
+def test_packed_batch_revert_invalid_length(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    packed = encode_packed_updates([accounts[3].address], [100])[:-1]
+    signatures = sign_packed_batch(
+        domainSeparator, usdc_token.address, packed + b"\x00", 2, private_keys[:8]
+    )
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesPacked(
+            usdc_token, packed, 2, signatures, {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Invalid packed updates!"):
+        dexilon_bridge.batchUpdateAvailableBalancesPacked.call(
+            usdc_token, packed, 2, signatures, {"from": accounts[0]}
+        )
+
+
+def test_packed_batch_revert_not_enough_signatures(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    packed = encode_packed_updates([accounts[3].address], [100])
+    signatures = sign_packed_batch(
+        domainSeparator, usdc_token.address, packed, 3, private_keys[:8]
+    )
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalancesPacked(
+            usdc_token, packed, 4, signatures, {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Not enough signatures!"):
+        dexilon_bridge.batchUpdateAvailableBalancesPacked.call(
+            usdc_token, packed, 4, signatures, {"from": accounts[0]}
+        )
@@ -1,4 +1,4 @@
-from brownie import VerifySignature, accounts, reverts
+from brownie import accounts, reverts
 from eth_keys import keys
 from eth_account.messages import encode_defunct, _hash_eip191_message
 from brownie.network.state import Chain
@@ -70,6 +70,7 @@ def test_pause_revert_on_deposit_when_paused(deploy, tokens):
     (usdc_token, dxln_token) = tokens
 
     amount = 100 * 10 ** 18
+    dexilon_bridge.pause({"from": accounts[0]})
 
     # maintain Anvil and coverage compatibility
     try:
@@ -85,6 +86,7 @@ def test_pause_revert_on_withdraw_when_paused(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
+    dexilon_bridge.pause({"from": accounts[0]})
 
     # maintain Anvil and coverage compatibility
     try:
@@ -99,6 +101,7 @@ def test_pause_revert_on_withdraw_when_paused(deploy, tokens):
 def test_pause_change_state_to_unpaused(deploy):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
 
+    dexilon_bridge.pause({"from": accounts[0]})
     dexilon_bridge.unpause({"from": accounts[0]})
 
     assert dexilon_bridge.paused() == False
@@ -0,0 +1,270 @@
+from brownie import accounts, chain, reverts
+
+from eth_keys import keys
+from web3.auto import w3
+
+from dexilon_bridge.ecdsa import recover
+from dexilon_bridge.eip712 import domain_separator
+from dexilon_bridge.permit import permit_hash, sign_permit, sign_permit_deposit
+
+
+# START ======================== TESTS PERMIT =================================
+
+OWNER_KEY = "c87509a1c067bbde78beb793e6fa76530b6382a4c0241e5e4a9ec0a0f44dc0d3"
+OWNER = w3.eth.account.from_key(OWNER_KEY).address
+
+
+def token_separator(token):
+    return domain_separator("Permit Coin", "1", 1337, token.address)
+
+
+def support_permit_token(deploy, permit_token, users, amount):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    dexilon_bridge.setSupportedToken(permit_token, True, {"from": accounts[0]})
+    for user in users:
+        permit_token.transfer(user, amount, {"from": accounts[0]})
+
+
+def test_permit_signature_recovers_owner(sim_bridge, sim_token):
+
+    separator = domain_separator("Permit Coin", "1", 1337, sim_token)
+    (v, r, s) = sign_permit(separator, sim_bridge, OWNER_KEY, 100, 0, 2 ** 32)
+    digest = permit_hash(separator, OWNER, sim_bridge, 100, 0, 2 ** 32)
+
+    assert v in (27, 28)
+    assert recover(digest, r + s + bytes([v])) == bytes.fromhex(OWNER[2:])
+    # the permit is bound to the nonce
+    assert recover(
+        permit_hash(separator, OWNER, sim_bridge, 100, 1, 2 ** 32), r + s + bytes([v])
+    ) != bytes.fromhex(OWNER[2:])
+
+    deposit = sign_permit_deposit(
+        separator, sim_bridge, OWNER_KEY, sim_token, 100, 0, 9
+    )
+    assert deposit.depositor == OWNER
+    assert (deposit.amount, deposit.deadline) == (100, 9)
+
+
+def test_permit_token_domain_separator(permit_token):
+
+    assert permit_token.DOMAIN_SEPARATOR() == token_separator(permit_token)
+
+
+def test_deposit_with_permit(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    user = pk_accounts[0]
+    amount = 500
+    support_permit_token(deploy, permit_token, [user], amount)
+    accounts[0].transfer(user, "1 ether")
+
+    deadline = chain.time() + 3600
+    (v, r, s) = sign_permit(
+        token_separator(permit_token),
+        dexilon_bridge.address,
+        private_keys[0],
+        amount,
+        permit_token.nonces(user),
+        deadline,
+    )
+    tx = dexilon_bridge.depositWithPermit(
+        permit_token, amount, deadline, v, r, s, {"from": user}
+    )
+
+    assert tx.events["Deposit"]["depositor"] == user
+    assert tx.events["Deposit"]["amount"] == amount
+    assert dexilon_bridge.getLockedBalance(permit_token) == amount
+    assert dexilon_bridge.getAvailableBalance(permit_token, user) == 1
+    assert permit_token.balanceOf(user) == 0
+
+
+def test_deposit_with_permits_relayer_batch(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    users = pk_accounts[:4]
+    support_permit_token(deploy, permit_token, users, 1_000)
+
+    deadline = chain.time() + 3600
+    deposits = [
+        sign_permit_deposit(
+            token_separator(permit_token),
+            dexilon_bridge.address,
+            private_keys[i],
+            permit_token.address,
+            100 * (i + 1),
+            permit_token.nonces(user),
+            deadline,
+        )
+        for (i, user) in enumerate(users)
+    ]
+    tx = dexilon_bridge.depositWithPermits(deposits, {"from": accounts[5]})
+
+    assert [event["depositor"] for event in tx.events["Deposit"]] == users
+    assert [event["amount"] for event in tx.events["Deposit"]] == [100, 200, 300, 400]
+    assert dexilon_bridge.getLockedBalance(permit_token) == 1_000
+    for (i, user) in enumerate(users):
+        assert permit_token.balanceOf(user) == 1_000 - 100 * (i + 1)
+
+
+def test_deposit_with_permit_front_run_permit(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    user = pk_accounts[1]
+    support_permit_token(deploy, permit_token, [user], 300)
+    accounts[0].transfer(user, "1 ether")
+
+    deposit = sign_permit_deposit(
+        token_separator(permit_token),
+        dexilon_bridge.address,
+        private_keys[1],
+        permit_token.address,
+        300,
+        permit_token.nonces(user),
+        chain.time() + 3600,
+    )
+    # someone submits the permit first, its nonce is used
+    permit_token.permit(
+        user,
+        dexilon_bridge,
+        deposit.amount,
+        deposit.deadline,
+        deposit.v,
+        deposit.r,
+        deposit.s,
+        {"from": accounts[3]},
+    )
+
+    # a relayer cannot fall back to the allowance
+    tx = dexilon_bridge.depositWithPermits([deposit], {"from": accounts[0]})
+    assert "Deposit" not in tx.events
+    assert tx.events["PermitDepositSkipped"]["depositor"] == user
+    assert dexilon_bridge.getLockedBalance(permit_token) == 0
+
+    # the depositor can
+    tx = dexilon_bridge.depositWithPermit(
+        permit_token,
+        deposit.amount,
+        deposit.deadline,
+        deposit.v,
+        deposit.r,
+        deposit.s,
+        {"from": user},
+    )
+
+    assert tx.events["Deposit"]["depositor"] == user
+    assert dexilon_bridge.getLockedBalance(permit_token) == 300
+
+
+def test_deposit_with_permits_skips_front_run_permit_in_batch(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    users = pk_accounts[:4]
+    support_permit_token(deploy, permit_token, users, 1_000)
+
+    deadline = chain.time() + 3600
+    deposits = [
+        sign_permit_deposit(
+            token_separator(permit_token),
+            dexilon_bridge.address,
+            private_keys[i],
+            permit_token.address,
+            100 * (i + 1),
+            permit_token.nonces(user),
+            deadline,
+        )
+        for (i, user) in enumerate(users)
+    ]
+    # the permit of the second deposit is submitted from the mempool first
+    front_run = deposits[1]
+    permit_token.permit(
+        front_run.depositor,
+        dexilon_bridge,
+        front_run.amount,
+        front_run.deadline,
+        front_run.v,
+        front_run.r,
+        front_run.s,
+        {"from": accounts[3]},
+    )
+
+    tx = dexilon_bridge.depositWithPermits(deposits, {"from": accounts[5]})
+
+    assert [event["depositor"] for event in tx.events["Deposit"]] == [
+        users[0],
+        users[2],
+        users[3],
+    ]
+    assert tx.events["PermitDepositSkipped"]["depositor"] == users[1]
+    assert tx.events["PermitDepositSkipped"]["amount"] == 200
+    assert dexilon_bridge.getLockedBalance(permit_token) == 100 + 300 + 400
+    assert permit_token.balanceOf(users[1]) == 1_000
+    # the allowance left by the front-run permit is not spent
+    assert permit_token.allowance(users[1], dexilon_bridge) == 200
+
+
+def test_deposit_with_permits_skips_standing_allowance(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    user = pk_accounts[3]
+    support_permit_token(deploy, permit_token, [user], 300)
+    accounts[0].transfer(user, "1 ether")
+    permit_token.approve(dexilon_bridge, 300, {"from": user})
+
+    # a third party replays a garbage permit against the approved account
+    deposit = sign_permit_deposit(
+        token_separator(permit_token),
+        dexilon_bridge.address,
+        private_keys[3],
+        permit_token.address,
+        300,
+        permit_token.nonces(user),
+        chain.time() + 3600,
+    )._replace(r=bytes(32), s=bytes(32))
+
+    tx = dexilon_bridge.depositWithPermits([deposit], {"from": accounts[4]})
+
+    assert tx.events["PermitDepositSkipped"]["depositor"] == user
+    assert permit_token.balanceOf(user) == 300
+    assert dexilon_bridge.getLockedBalance(permit_token) == 0
+
+
+def test_deposit_with_permit_revert_permit_failed(deploy, permit_token):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    user = pk_accounts[2]
+    support_permit_token(deploy, permit_token, [user], 300)
+    accounts[0].transfer(user, "1 ether")
+
+    # signed by another key than the depositor's
+    deposit = sign_permit_deposit(
+        token_separator(permit_token),
+        dexilon_bridge.address,
+        private_keys[3],
+        permit_token.address,
+        300,
+        permit_token.nonces(user),
+        chain.time() + 3600,
+    )._replace(depositor=user.address)
+
+    # a relayer batch skips the deposit
+    tx = dexilon_bridge.depositWithPermits([deposit], {"from": accounts[0]})
+    assert tx.events["PermitDepositSkipped"]["depositor"] == user
+    assert dexilon_bridge.getLockedBalance(permit_token) == 0
+
+    # maintain Anvil and coverage compatibility
+    args = (permit_token, 300, deposit.deadline, deposit.v, deposit.r, deposit.s)
+    try:
+        dexilon_bridge.depositWithPermit(*args, {"from": user})
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("Permit failed!"):
+        dexilon_bridge.depositWithPermit.call(*args, {"from": user})
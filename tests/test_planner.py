@@ -0,0 +1,115 @@
+from brownie import accounts
+
+import pytest
+
+from dexilon_bridge.planner import GasModel, plan_batches
+from dexilon_bridge.signing import sign_batch
+
+
+# START ======================== TESTS PLANNER =================================
+
+MEASUREMENTS = {1: 120_000, 2: 126_000, 5: 145_000, 10: 175_000, 100: 720_000}
+MODEL = GasModel.fit(MEASUREMENTS, 7)
+
+
+def test_planner_splits_100k_updates_under_gas_limit():
+
+    updates = [("0x" + f"{i:040x}", i + 1) for i in range(100_000)]
+
+    batches = plan_batches(updates, 1000, 12_000_000, 11, MODEL)
+
+    assert [batch.batch_id for batch in batches] == list(
+        range(1000, 1000 + len(batches))
+    )
+    for batch in batches:
+        assert MODEL.estimate(len(batch.users), 11) <= 12_000_000
+    assert [
+        pair
+        for batch in batches
+        for pair in zip(batch.users, batch.balance_updates)
+    ] == updates
+
+
+def test_planner_revert_gas_limit_too_low():
+
+    with pytest.raises(ValueError):
+        plan_batches([("0x" + "11" * 20, 1)], 1, 100_000, 11, MODEL)
+
+
+def test_planner_prices_repeated_users():
+
+    model = GasModel(base=0, per_user=100, per_signature=0, per_repeated_user=10)
+    user = "0x" + "ab" * 20
+    updates = [(user, 1), (user.upper().replace("0X", "0x"), 2)] + [
+        ("0x" + f"{i:040x}", i) for i in range(1, 6)
+    ]
+
+    batches = plan_batches(updates, 1, 320, 0, model)
+
+    # the repeated user costs 10, so the first batch fits three users and the repeat
+    assert [len(batch.users) for batch in batches] == [4, 3]
+    assert [update for batch in batches for update in batch.balance_updates] == [
+        amount for (user, amount) in updates
+    ]
+
+
+def test_planner_fit_is_upper_bound_of_measurements():
+
+    for users, gas in MEASUREMENTS.items():
+        assert MODEL.estimate(users, 7) >= gas
+
+
+def test_planner_batches_fit_gas_limit_on_chain(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    def batch_gas(users, batch_id):
+        balance_updates = [1] * len(users)
+        signatures = sign_batch(
+            domainSeparator,
+            usdc_token.address,
+            users,
+            balance_updates,
+            batch_id,
+            private_keys,
+        )
+        return dexilon_bridge.batchUpdateAvailableBalances(
+            usdc_token.address,
+            users,
+            balance_updates,
+            batch_id,
+            signatures,
+            {"from": accounts[0]},
+        ).gas_used
+
+    # fit the model to the deployed contract with batches of distinct users
+    measurements = {
+        users: batch_gas([accounts[i].address for i in range(users)], 1990 + users)
+        for users in (1, 5, 9)
+    }
+    model = GasModel.fit(measurements, len(private_keys))
+
+    gas_limit = 500_000
+    updates = [(accounts[i % 3].address, 1000 + i) for i in range(40)]
+    batches = plan_batches(updates, 2000, gas_limit, len(private_keys), model)
+
+    assert len(batches) > 1
+    for batch in batches:
+        signatures = sign_batch(
+            domainSeparator,
+            usdc_token.address,
+            batch.users,
+            batch.balance_updates,
+            batch.batch_id,
+            private_keys,
+        )
+        tx = dexilon_bridge.batchUpdateAvailableBalances(
+            usdc_token.address,
+            batch.users,
+            batch.balance_updates,
+            batch.batch_id,
+            signatures,
+            {"from": accounts[0]},
+        )
+        assert tx.gas_used <= gas_limit
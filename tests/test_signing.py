@@ -0,0 +1,97 @@
+from brownie import accounts
+from eth_account.messages import encode_defunct
+
+from web3 import Web3
+from web3.auto import w3
+import pytest
+
+from dexilon_bridge.signing import BatchSigner, sign_batch
+
+
+# START ======================== TESTS SIGNING =================================
+
+
+def test_signing_matches_eth_account_signatures(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
+    batch_balances = [1001, 1002, 1003]
+    batchId = 1
+    base_message = Web3.solidityKeccak(
+        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
+        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    )
+
+    signatures = []
+    for pk in private_keys:
+        signatures.append(
+            w3.eth.account.sign_message(
+                encode_defunct(base_message), private_key=pk
+            ).signature
+        )
+
+    signatures = sorted(
+        signatures,
+        key=lambda signature: w3.eth.account.recover_message(
+            encode_defunct(base_message), signature=signature
+        ).lower(),
+    )
+
+    assert signatures == sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
+    )
+
+
+def test_signing_batch_signer_matches_sign_batch(quorum_keys, sim_token, sim_users):
+
+    signer = BatchSigner(quorum_keys)
+
+    for batchId in range(1, 4):
+        assert signer.sign_batch(
+            bytes(range(32)), sim_token, sim_users, [1, 2, 3, 4, 5, 6, 7, 8], batchId
+        ) == sign_batch(
+            bytes(range(32)),
+            sim_token,
+            sim_users,
+            [1, 2, 3, 4, 5, 6, 7, 8],
+            batchId,
+            quorum_keys,
+        )
+
+
+def test_signing_batch_signer_signatures_are_accepted(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+
+    batch_users = [accounts[0].address, accounts[1].address, accounts[2].address]
+    batch_balances = [1001, 1002, 1003]
+    batchId = 2
+
+    signatures = BatchSigner(private_keys).sign_batch(
+        domainSeparator, usdc_token.address, batch_users, batch_balances, batchId
+    )
+
+    dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+    for user, balance in zip(batch_users, batch_balances):
+        assert balance == dexilon_bridge.getAvailableBalance(usdc_token.address, user)
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + sum(
+        batch_balances
+    )
@@ -0,0 +1,280 @@
+from brownie import accounts
+from hypothesis import given, settings, strategies as st
+
+import pytest
+
+from dexilon_bridge.encoding import hash_payout_batch
+from dexilon_bridge.signing import (
+    eth_signed_hash,
+    sign_batch,
+    sign_payout_batch,
+    sort_signatures,
+)
+from dexilon_bridge.simulator import BridgeRevert, BridgeSimulator
+
+
+# START ======================== TESTS SIMULATOR =================================
+
+
+@settings(max_examples=25, deadline=None)
+@given(
+    updates=st.lists(
+        st.tuples(st.integers(0, 7), st.integers(0, 10 ** 20)), max_size=30
+    ),
+    locked=st.integers(0, 10 ** 21),
+)
+def test_simulator_batch_is_applied_atomically(
+    updates, locked, sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    updates = [(sim_users[i], amount) for (i, amount) in updates]
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, locked)
+    batch_users = [user for (user, amount) in updates]
+    batch_balances = [amount for (user, amount) in updates]
+    signatures = sign_batch(
+        simulator.domain_separator,
+        sim_token,
+        batch_users,
+        batch_balances,
+        1,
+        sim_keys[:3],
+    )
+    before = {
+        user: simulator.get_available_balance(sim_token, user) for user in sim_users
+    }
+
+    try:
+        simulator.batch_update_available_balances(
+            sim_validators[0], sim_token, batch_users, batch_balances, 1, signatures
+        )
+    except BridgeRevert as e:
+        assert e.reason == "Not enough locked token!"
+        assert sum(batch_balances) > locked
+        assert simulator.get_locked_balance(sim_token) == locked
+        assert before == {
+            user: simulator.get_available_balance(sim_token, user) for user in sim_users
+        }
+        return
+
+    assert simulator.get_locked_balance(sim_token) == locked - sum(batch_balances)
+    for user in sim_users:
+        added = sum(amount for (u, amount) in updates if u == user)
+        # users without a deposit have no sentinel and lose one unit
+        if user != sim_users[0] and added:
+            added -= 1
+        assert simulator.get_available_balance(sim_token, user) == before[user] + added
+
+
+def test_simulator_revert_repeated_signature(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, 10 ** 6)
+    signatures = sign_batch(
+        simulator.domain_separator, sim_token, [sim_users[0]], [1001], 1, sim_keys[:1]
+    )
+
+    with pytest.raises(BridgeRevert, match="Signers not in ascending order!"):
+        simulator.batch_update_available_balances(
+            sim_validators[0], sim_token, [sim_users[0]], [1001], 1, signatures * 10
+        )
+
+
+def test_simulator_revert_same_batchId(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, 10 ** 6)
+    signatures = sign_batch(
+        simulator.domain_separator, sim_token, [sim_users[0]], [1001], 1, sim_keys
+    )
+    simulator.batch_update_available_balances(
+        sim_validators[0], sim_token, [sim_users[0]], [1001], 1, signatures
+    )
+
+    with pytest.raises(BridgeRevert, match="Batch already recorded!"):
+        simulator.batch_update_available_balances(
+            sim_validators[0], sim_token, [sim_users[0]], [1001], 1, signatures
+        )
+
+
+def test_simulator_revert_invalid_signature_length(
+    sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, 10 ** 6)
+
+    with pytest.raises(BridgeRevert, match="ECDSA: invalid signature length"):
+        simulator.batch_update_available_balances(
+            sim_validators[0], sim_token, [sim_users[0]], [1001], 1, [b"\x01\x23"]
+        )
+
+
+def test_simulator_matches_contract(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    simulator = BridgeSimulator("Dexilon", "tests", 1337, dexilon_bridge.address)
+    simulator.add_validators(dexilon_bridge.getActiveValidators())
+    simulator.set_supported_token(usdc_token.address, True)
+    token = bytes.fromhex(usdc_token.address[2:])
+    simulator.locked_balances[token] = dexilon_bridge.getLockedBalance(usdc_token)
+    # accounts 0 and 1 have deposited, their balances carry the +1 sentinel
+    simulator.users_available_balances[token] = {
+        bytes.fromhex(accounts[i].address[2:]): (
+            dexilon_bridge.getAvailableBalance(usdc_token, accounts[i]) + 1
+        )
+        for i in range(2)
+    }
+
+    batch_users = [accounts[0].address, accounts[1].address, accounts[0].address]
+    batch_balances = [1001, 1002, 1003]
+    batchId = 4242
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
+    )
+    simulator.batch_update_available_balances(
+        accounts[0].address,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+    )
+    dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+    assert simulator.get_locked_balance(usdc_token.address) == (
+        dexilon_bridge.getLockedBalance(usdc_token)
+    )
+    for user in batch_users:
+        assert dexilon_bridge.getAvailableBalance(usdc_token, user) == (
+            simulator.get_available_balance(usdc_token.address, user)
+        )
+
+
+def test_simulator_withdraw_many(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, 1_000)
+    simulator.deposit(sim_users[1], sim_token, 0)
+    other_token = "0x" + "12" * 20
+    signatures = sign_batch(
+        simulator.domain_separator, sim_token, [sim_users[1]], [400], 1, sim_keys
+    )
+    simulator.batch_update_available_balances(
+        sim_validators[0], sim_token, [sim_users[1]], [400], 1, signatures
+    )
+
+    assert simulator.withdraw_many(sim_users[1], [other_token, sim_token]) == {
+        bytes.fromhex(sim_token[2:]): 400
+    }
+    with pytest.raises(BridgeRevert, match="No balance!"):
+        simulator.withdraw_many(sim_users[1], [other_token, sim_token])
+
+
+def test_simulator_batch_with_payout(
+    sim_keys, sim_validators, sim_token, sim_users, new_simulator
+):
+
+    simulator = new_simulator()
+    simulator.deposit(sim_users[0], sim_token, 1_000)
+    simulator.deposit(sim_users[1], sim_token, 0)
+    simulator.deposit(sim_users[2], sim_token, 0)
+    batch_users = [sim_users[1], sim_users[2], sim_users[1]]
+    batch_balances = [100, 200, 300]
+    signatures = sign_payout_batch(
+        simulator.domain_separator,
+        sim_token,
+        batch_users,
+        batch_balances,
+        1,
+        True,
+        sim_keys,
+    )
+
+    # the submitter cannot flip the signed payout flag, no validator signed it
+    flipped_hash = eth_signed_hash(
+        hash_payout_batch(
+            simulator.domain_separator, sim_token, batch_users, batch_balances, 1, False
+        )
+    )
+    with pytest.raises(BridgeRevert, match="Not enough signatures!"):
+        simulator.batch_update_available_balances_with_payout(
+            sim_validators[0],
+            sim_token,
+            batch_users,
+            batch_balances,
+            1,
+            sort_signatures(flipped_hash, signatures),
+            False,
+        )
+
+    paid = simulator.batch_update_available_balances_with_payout(
+        sim_validators[0],
+        sim_token,
+        batch_users,
+        batch_balances,
+        1,
+        signatures,
+        True,
+        rejected_users=[sim_users[2]],
+    )
+
+    # every user is paid once, the rejected transfer stays available
+    assert paid == {bytes.fromhex(sim_users[1][2:]): 400}
+    assert simulator.get_available_balance(sim_token, sim_users[1]) == 0
+    assert simulator.get_available_balance(sim_token, sim_users[2]) == 200
+    assert simulator.get_locked_balance(sim_token) == 400
+
+
+@settings(max_examples=25, deadline=None)
+@given(
+    changes=st.lists(
+        st.tuples(st.integers(0, 7), st.booleans()), min_size=1, max_size=30
+    )
+)
+def test_simulator_supported_token_registry(
+    changes, sim_token, sim_users, new_simulator
+):
+
+    # users double as token addresses
+    changes = [(sim_users[i], supported) for (i, supported) in changes]
+    simulator = new_simulator()
+    # the list the contract kept before the index mapping
+    expected = [bytes.fromhex(sim_token[2:])]
+    for (token, supported) in changes:
+        token = bytes.fromhex(token[2:])
+        if supported and token not in expected:
+            expected.append(token)
+        if not supported and token in expected:
+            expected[expected.index(token)] = expected[-1]
+            expected.pop()
+
+    simulator.set_supported_tokens(
+        [token for (token, supported) in changes],
+        [supported for (token, supported) in changes],
+    )
+
+    assert simulator.supported_tokens == expected
+    assert simulator.supported_token_slots == {
+        token: index + 1 for (index, token) in enumerate(expected)
+    }
@@ -0,0 +1,76 @@
+from brownie import accounts, web3
+
+from web3 import Web3
+
+from dexilon_bridge.storage import (
+    VALIDATORS_BITMAP_SLOT,
+    VALIDATORS_COUNTER_SLOT,
+    StorageReader,
+    available_balance_slot,
+)
+from dexilon_bridge.signing import sign_batch
+
+
+# START ======================== TESTS STORAGE =================================
+
+
+def test_storage_available_balance_slot_matches_solidity_keccak():
+
+    token = "0x" + "11" * 20
+    user = "0x" + "22" * 20
+    token_slot = Web3.solidityKeccak(["uint256", "uint256"], [int(token, 16), 4])
+    user_slot = Web3.solidityKeccak(
+        ["uint256", "bytes32"], [int(user, 16), token_slot]
+    )
+
+    assert available_balance_slot(token, user) == int.from_bytes(user_slot, "big")
+
+
+def test_storage_reader_matches_views(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_users = [accounts[1].address, accounts[5].address]
+    batch_balances = [1_001, 1_002]
+    batchId = 31337
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys,
+    )
+    dexilon_bridge.batchUpdateAvailableBalances(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+    reader = StorageReader(web3.provider.endpoint_uri, dexilon_bridge.address)
+    block = web3.eth.block_number
+    pairs = [
+        (token.address, accounts[i].address)
+        for token in (usdc_token, dxln_token)
+        for i in range(8)
+    ]
+
+    assert reader.available_balances(pairs, block) == [
+        dexilon_bridge.getAvailableBalance(token, user) for (token, user) in pairs
+    ]
+    assert reader.locked_balances([usdc_token.address, dxln_token.address]) == [
+        dexilon_bridge.getLockedBalance(usdc_token),
+        dexilon_bridge.getLockedBalance(dxln_token),
+    ]
+    assert reader.read_slots([VALIDATORS_COUNTER_SLOT, VALIDATORS_BITMAP_SLOT]) == [
+        len(dexilon_bridge.getActiveValidators()),
+        dexilon_bridge.getValidatorsBitmap(),
+    ]
+    assert reader.owner_and_paused() == (
+        dexilon_bridge.owner().lower(),
+        dexilon_bridge.paused(),
+    )
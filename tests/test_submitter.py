@@ -0,0 +1,285 @@
+from brownie import accounts, web3
+
+from eth_utils import keccak
+from web3.auto import w3
+import pytest
+import rlp
+
+from dexilon_bridge.indexer import BATCH_RECORDED_TOPIC
+from dexilon_bridge.rpc import RPCError
+from dexilon_bridge.signing import sign_batch
+from dexilon_bridge.submitter import (
+    BATCH_UPDATE_SELECTOR,
+    BatchSubmitter,
+    encode_batch_update,
+)
+
+
+# START ======================== TESTS SUBMITTER =================================
+
+SUBMITTER_KEY = keccak(b"submitter")
+
+
+class MempoolNode:
+    """MempoolNode is a node with automine off: transactions wait for mine()
+
+    Only transactions with maxFeePerGas of at least the base fee are mined,
+    replacements need 10% higher fees and every batch id is recorded once.
+    """
+
+    def __init__(self, base_fee=10):
+        self.base_fee = base_fee
+        self.block = 1
+        self.mined_nonce = 0
+        self.pending = {}
+        self.receipts = {}
+        self.logs = []
+        self.recorded = set()
+
+    def record_elsewhere(self, batch_id, token):
+        """a batch recorded by the transaction of another validator"""
+        self.recorded.add((batch_id, token))
+        self.logs.append(self._log(batch_id, token, "0x" + "ee" * 32))
+
+    def _log(self, batch_id, token, tx_hash):
+        return {
+            "blockNumber": hex(self.block),
+            "transactionHash": tx_hash,
+            "topics": [
+                BATCH_RECORDED_TOPIC,
+                "0x" + f"{batch_id:064x}",
+                "0x" + "00" * 12 + token.hex(),
+            ],
+        }
+
+    def mine(self):
+        self.block += 1
+        while self.mined_nonce in self.pending:
+            tx_hash, fields = self.pending[self.mined_nonce]
+            if int.from_bytes(fields[3], "big") < self.base_fee:
+                break
+            del self.pending[self.mined_nonce]
+            self.mined_nonce += 1
+            (to, data) = (fields[5], fields[7])
+            status = 1
+            if data[:4] == BATCH_UPDATE_SELECTOR:
+                token = data[16:36]
+                batch_id = int.from_bytes(data[100:132], "big")
+                if (batch_id, token) in self.recorded:
+                    status = 0
+                else:
+                    self.recorded.add((batch_id, token))
+                    self.logs.append(self._log(batch_id, token, tx_hash))
+            self.receipts[tx_hash] = {
+                "transactionHash": tx_hash,
+                "blockNumber": hex(self.block),
+                "to": "0x" + to.hex(),
+                "status": hex(status),
+            }
+
+    def send(self, raw):
+        assert raw[0] == 2
+        fields = rlp.decode(raw[1:])
+        nonce = int.from_bytes(fields[1], "big")
+        tx_hash = "0x" + keccak(raw).hex()
+        if nonce < self.mined_nonce:
+            return {"error": {"code": -32000, "message": "nonce too low"}}
+        if nonce in self.pending:
+            (old_hash, old) = self.pending[nonce]
+            if old_hash == tx_hash:
+                return {"error": {"code": -32000, "message": "already known"}}
+            for index in (2, 3):
+                if int.from_bytes(fields[index], "big") * 10 < int.from_bytes(
+                    old[index], "big"
+                ) * 11:
+                    return {
+                        "error": {
+                            "code": -32000,
+                            "message": "replacement transaction underpriced",
+                        }
+                    }
+        self.pending[nonce] = (tx_hash, fields)
+        return {"result": tx_hash}
+
+    def make_request(self, method, params):
+        if method == "eth_sendRawTransaction":
+            return self.send(bytes.fromhex(params[0][2:]))
+        if method == "eth_getTransactionCount":
+            count = self.mined_nonce
+            if params[1] == "pending":
+                while count in self.pending:
+                    count += 1
+            return {"result": hex(count)}
+        if method == "eth_getTransactionReceipt":
+            return {"result": self.receipts.get(params[0])}
+        if method == "eth_getLogs":
+            from_block = int(params[0]["fromBlock"], 16)
+            return {
+                "result": [
+                    log
+                    for log in self.logs
+                    if int(log["blockNumber"], 16) >= from_block
+                ]
+            }
+        results = {
+            "eth_chainId": hex(1337),
+            "eth_blockNumber": hex(self.block),
+            "eth_getBlockByNumber": {"baseFeePerGas": hex(self.base_fee)},
+            "eth_maxPriorityFeePerGas": hex(1),
+            "eth_estimateGas": hex(100_000),
+        }
+        return {"result": results[method]}
+
+
+@pytest.fixture
+def submit(sim_token, sim_users):
+    def submit(submitter, batch_id, token=sim_token):
+        return submitter.submit(token, sim_users[:2], [1, 2], batch_id, [bytes(65)] * 8)
+
+    return submit
+
+
+def test_submitter_keeps_batches_in_flight(sim_bridge, submit):
+
+    node = MempoolNode()
+    submitter = BatchSubmitter(node, sim_bridge, SUBMITTER_KEY, max_in_flight=4)
+
+    pending = [submit(submitter, batch_id) for batch_id in range(1, 5)]
+    assert [tx.nonce for tx in pending] == [0, 1, 2, 3]
+    assert not submitter.has_capacity
+    with pytest.raises(ValueError):
+        submit(submitter, 5)
+
+    # all four batches are mined in one block
+    node.mine()
+    finished = submitter.poll()
+    assert finished == pending
+    assert all(tx.succeeded for tx in finished)
+    assert submitter.has_capacity
+    assert submit(submitter, 5).nonce == 4
+
+
+def test_submitter_bumps_stuck_transactions(sim_bridge, submit):
+
+    node = MempoolNode()
+    submitter = BatchSubmitter(node, sim_bridge, SUBMITTER_KEY, stuck_blocks=2)
+    tx = submit(submitter, 1)
+    fee = tx.transaction["maxFeePerGas"]
+
+    # the base fee jumps above the fee cap, the transaction is stuck
+    node.base_fee = 4 * fee
+    node.mine()
+    assert submitter.poll() == []
+    assert len(tx.hashes) == 1
+
+    node.mine()
+    assert submitter.poll() == []
+    assert len(tx.hashes) == 2
+    assert tx.transaction["maxFeePerGas"] >= node.base_fee
+    assert tx.transaction["nonce"] == 0
+
+    node.mine()
+    assert submitter.poll() == [tx]
+    assert tx.succeeded
+    assert tx.receipt["transactionHash"] == tx.hashes[-1]
+
+
+def test_submitter_replacement_fee_is_accepted_by_node(sim_bridge, submit):
+
+    node = MempoolNode()
+    submitter = BatchSubmitter(node, sim_bridge, SUBMITTER_KEY, fee_bump=0.05)
+    tx = submit(submitter, 1)
+
+    with pytest.raises(RPCError, match="underpriced"):
+        submitter.replace(tx)
+
+    submitter.fee_bump = 0.125
+    submitter.replace(tx)
+    node.mine()
+    assert submitter.poll() == [tx]
+
+
+def test_submitter_reconciles_batches_recorded_elsewhere(sim_bridge, sim_token, submit):
+
+    node = MempoolNode()
+    submitter = BatchSubmitter(node, sim_bridge, SUBMITTER_KEY)
+    first = submit(submitter, 1)
+    second = submit(submitter, 2)
+
+    node.record_elsewhere(2, bytes.fromhex(sim_token[2:]))
+    assert submitter.reconcile(0) == {(2, bytes.fromhex(sim_token[2:]))}
+    assert second.cancelled
+
+    node.mine()
+    assert submitter.poll() == [first, second]
+    assert first.succeeded
+    assert second.cancelled and not second.succeeded
+    assert second.receipt["to"] == submitter.account.address.lower()
+
+    # own recorded batches are left alone
+    third = submit(submitter, 3)
+    node.mine()
+    submitter.reconcile(0)
+    assert not third.cancelled
+
+
+def test_submitter_resyncs_nonce_after_rejection(sim_bridge, submit):
+
+    node = MempoolNode()
+    submitter = BatchSubmitter(node, sim_bridge, SUBMITTER_KEY)
+    submit(submitter, 1)
+
+    # the nonce was used by a transaction sent outside the submitter
+    node.pending.clear()
+    node.mined_nonce = 3
+    with pytest.raises(RPCError, match="nonce too low"):
+        submit(submitter, 2)
+    assert submit(submitter, 2).nonce == 3
+
+
+def test_submitter_pipelines_on_chain(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[i].address for i in range(1, 4)]
+    balances = [5, 2 ** 256 - 1, 0]
+    signatures = sign_batch(
+        domainSeparator, usdc_token.address, users, balances, 7, private_keys
+    ) + [b"", bytes(64)]
+    assert encode_batch_update(
+        usdc_token.address, users, balances, 7, signatures
+    ) == bytes.fromhex(
+        dexilon_bridge.batchUpdateAvailableBalances.encode_input(
+            usdc_token, users, balances, 7, signatures
+        )[2:]
+    )
+
+    users = [accounts[1].address]
+
+    accounts[0].transfer(pk_accounts[0], "1 ether")
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+    submitter = BatchSubmitter(
+        web3.provider,
+        dexilon_bridge.address,
+        private_keys[0],
+        gas_limit=1_000_000,
+    )
+
+    try:
+        web3.provider.make_request("evm_setAutomine", [False])
+        for batchId in range(1, 5):
+            signatures = sign_batch(
+                domainSeparator, usdc_token.address, users, [5], batchId, private_keys
+            )
+            submitter.submit(usdc_token.address, users, [5], batchId, signatures)
+        assert len(submitter.in_flight) == 4
+        web3.provider.make_request("evm_mine", [])
+    finally:
+        web3.provider.make_request("evm_setAutomine", [True])
+
+    finished = submitter.poll()
+    assert len(finished) == 4
+    assert len({tx.receipt["blockNumber"] for tx in finished}) == 1
+    assert all(tx.succeeded for tx in finished)
+    assert old_locked == dexilon_bridge.getLockedBalance(usdc_token) + 20
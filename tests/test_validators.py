@@ -9,6 +9,8 @@ import pytest
 import random
 from hexbytes import HexBytes
 
+from dexilon_bridge.validators import MAX_VALIDATORS, ValidatorBitmap
+
 
 # START ======================== TESTS VALIDATORS =================================
 
@@ -77,6 +79,7 @@ def test_validators_remove_validators(deploy):
 def test_validators_revert_not_enough_validators(deploy, tokens):
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
+    dexilon_bridge.removeValidators(pk_accounts[:-1], {"from": accounts[0]})
 
     tx_data = [
         usdc_token.address,
@@ -104,6 +107,7 @@ def test_validators_revert_not_enough_validators(deploy, tokens):
 def test_validators_add_again_validators(deploy):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    dexilon_bridge.removeValidators(pk_accounts[:-1], {"from": accounts[0]})
     dexilon_bridge.addValidators(pk_accounts[:-1], {"from": accounts[0]})
 
     assert sorted(dexilon_bridge.getActiveValidators()) == sorted(
@@ -185,3 +189,45 @@ def test_validators_remove_unexisting_validator(deploy):
     assert sorted(dexilon_bridge.getActiveValidators()) == sorted(
         [acc.address for acc in pk_accounts]
     )
+
+
+def test_validators_bitmap_reuses_free_slots(deploy):
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    registry = ValidatorBitmap()
+    registry.add(dexilon_bridge.getActiveValidators())
+
+    dexilon_bridge.removeValidators(pk_accounts[1:3], {"from": accounts[0]})
+    freed_slot = min(registry.slot(validator) for validator in pk_accounts[1:3])
+    registry.remove(pk_accounts[1:3])
+    dexilon_bridge.addValidators([accounts[7]], {"from": accounts[0]})
+    registry.add([accounts[7].address])
+
+    bitmap = dexilon_bridge.getValidatorsBitmap()
+    active_validators = dexilon_bridge.getActiveValidators()
+
+    assert bitmap == registry.bitmap
+    assert registry.slot(accounts[7].address) == freed_slot
+    assert [
+        "0x" + validator.hex() for validator in registry.validators
+    ] == [validator.lower() for validator in active_validators]
+
+    loaded = ValidatorBitmap.from_state(bitmap, active_validators)
+    for validator in active_validators:
+        assert loaded.slot(validator) == registry.slot(validator)
+    assert loaded.has_quorum(active_validators[: (len(active_validators) * 2 + 2) // 3])
+    assert not loaded.has_quorum(active_validators[: len(active_validators) // 2])
+
+
+def test_validators_bitmap_revert_too_many_validators():
+
+    registry = ValidatorBitmap()
+    registry.add(["0x" + f"{i + 1:040x}" for i in range(MAX_VALIDATORS)])
+
+    with pytest.raises(ValueError, match="Too many validators!"):
+        registry.add(["0x" + f"{MAX_VALIDATORS + 1:040x}"])
+
+    registry.remove(["0x" + f"{10:040x}"])
+    registry.add(["0x" + f"{MAX_VALIDATORS + 1:040x}"])
+    assert registry.slot("0x" + f"{MAX_VALIDATORS + 1:040x}") == 9
+    assert registry.bitmap == 2 ** MAX_VALIDATORS - 1
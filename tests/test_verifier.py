@@ -0,0 +1,192 @@
+from brownie import accounts, reverts
+
+from eth_utils import keccak
+import pytest
+
+from dexilon_bridge import ecdsa
+from dexilon_bridge.signing import (
+    compact_signatures,
+    eth_signed_hash,
+    sign_batch,
+    sign_hash,
+)
+from dexilon_bridge.verifier import (
+    PARALLEL_MIN_SIGNATURES,
+    SignatureVerifier,
+    required_signatures,
+)
+
+
+# START ======================== TESTS VERIFIER =================================
+
+SEPARATOR = bytes(32)
+
+
+@pytest.fixture
+def sign(sim_token, sim_users):
+    def sign(keys, batchId=1):
+        return sign_batch(SEPARATOR, sim_token, sim_users[:2], [1, 2], batchId, keys)
+
+    return sign
+
+
+@pytest.mark.parametrize("validators", range(3, 20))
+def test_verifier_required_signatures_matches_contract_quorum(validators):
+
+    required = required_signatures(validators)
+
+    assert (required * 3) // validators >= 2
+    assert ((required - 1) * 3) // validators < 2
+
+
+def test_verifier_quorum(quorum_keys, quorum_validators, sim_token, sim_users, sign):
+
+    with SignatureVerifier(quorum_validators) as verifier:
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, sign(quorum_keys[:8])
+        )
+        assert verdict.has_quorum
+        assert (verdict.verified, verdict.required) == (8, 8)
+
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, sign(quorum_keys[:7])
+        )
+        assert verdict.reason == "Not enough signatures!"
+        assert verdict.verified == 7
+
+        # a signature of an other batch recovers to an unknown signer
+        verdict = verifier.verify_batch(
+            SEPARATOR,
+            sim_token,
+            sim_users[:2],
+            [1, 2],
+            1,
+            sign(quorum_keys[:1], batchId=2),
+        )
+        assert verdict.reason == "Not enough signatures!"
+        assert verdict.verified == 0
+        assert len(verdict.signers) == 1
+
+
+def test_verifier_reverts_like_contract(
+    quorum_keys, quorum_validators, sim_token, sim_users, sign
+):
+
+    signatures = sign(quorum_keys[:8])
+
+    with SignatureVerifier(quorum_validators) as verifier:
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures[::-1]
+        )
+        assert verdict.reason == "Signers not in ascending order!"
+
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures[:1] * 2
+        )
+        assert verdict.reason == "Signers not in ascending order!"
+
+        broken = signatures[3][:64] + b"\x1d"
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures[:3] + [broken]
+        )
+        assert verdict.reason == "ECDSA: invalid signature"
+        assert len(verdict.signers) == 3
+
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, [signatures[0][:64]]
+        )
+        assert verdict.reason == "ECDSA: invalid signature length"
+
+    with SignatureVerifier(quorum_validators[:2]) as verifier:
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures
+        )
+        assert verdict.reason == "Not enough validators!"
+
+
+def test_verifier_compact_signatures(
+    quorum_keys, quorum_validators, sim_token, sim_users, sign
+):
+
+    blob = compact_signatures(sign(quorum_keys[:8]))
+
+    with SignatureVerifier(quorum_validators) as verifier:
+        assert verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, blob
+        ).has_quorum
+        verdict = verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, blob[:-1]
+        )
+        assert verdict.reason == "Invalid signatures length!"
+
+
+def test_verifier_caches_recovered_signers(
+    quorum_keys, quorum_validators, sim_token, sim_users, sign
+):
+
+    signatures = sign(quorum_keys)
+
+    with SignatureVerifier(quorum_validators) as verifier:
+        verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures[:5]
+        )
+        verifier.verify_batch(
+            SEPARATOR, sim_token, sim_users[:2], [1, 2], 1, signatures
+        )
+
+        info = verifier.cache_info()
+        assert (info.hits, info.misses) == (5, 11)
+
+
+def test_verifier_parallel_recovery_matches_serial(quorum_validators):
+
+    eth_hash = eth_signed_hash(keccak(b"parallel"))
+    keys = [keccak(i.to_bytes(32, "big")) for i in range(PARALLEL_MIN_SIGNATURES * 2)]
+    signatures = [sign_hash(pk, eth_hash) for pk in keys]
+
+    with SignatureVerifier(quorum_validators, max_workers=3) as verifier:
+        recovered = verifier.recover_signers(eth_hash, signatures)
+
+    assert recovered == [(ecdsa.recover(eth_hash, s), None) for s in signatures]
+
+
+def test_verifier_backends_agree(monkeypatch, quorum_keys, quorum_validators):
+
+    eth_hash = eth_signed_hash(keccak(b"backends"))
+    signatures = [sign_hash(pk, eth_hash) for pk in quorum_keys]
+    native = [ecdsa.recover(eth_hash, s) for s in signatures]
+
+    monkeypatch.setattr(ecdsa, "PublicKey", None)
+
+    assert [ecdsa.recover(eth_hash, s) for s in signatures] == native
+    assert native == [bytes.fromhex(v[2:]) for v in quorum_validators]
+
+
+def test_verifier_matches_contract(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    users = [accounts[1].address]
+    signatures = sign_batch(
+        domainSeparator, usdc_token.address, users, [100], 1, private_keys[:7]
+    )
+
+    with SignatureVerifier(dexilon_bridge.getActiveValidators()) as verifier:
+        verdict = verifier.verify_batch(
+            domainSeparator, usdc_token.address, users, [100], 1, signatures
+        )
+    assert verdict.reason == "Not enough signatures!"
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.batchUpdateAvailableBalances(
+            usdc_token, users, [100], 1, signatures, {"from": accounts[0]}
+        )
+    except Exception as e:
+        print(repr(e))
+
+    with reverts(verdict.reason):
+        dexilon_bridge.batchUpdateAvailableBalances.call(
+            usdc_token, users, [100], 1, signatures, {"from": accounts[0]}
+        )
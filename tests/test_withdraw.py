@@ -1,4 +1,4 @@
-from brownie import VerifySignature, accounts, reverts
+from brownie import accounts, reverts
 from eth_keys import keys
 from eth_account.messages import encode_defunct, _hash_eip191_message
 from brownie.network.state import Chain
@@ -8,10 +8,42 @@ from web3.auto import w3
 import pytest
 import random
 
+from dexilon_bridge.encoding import hash_payout_batch
+from dexilon_bridge.signing import (
+    eth_signed_hash,
+    sign_batch,
+    sign_payout_batch,
+    sort_signatures,
+)
+
 
 # START ======================== TESTS WITHDRAW =================================
 
 
+def add_available(deploy, token, amount, batchId):
+    """add_available records a batch moving amount of token to accounts 1 and 2"""
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+
+    batch_users = [accounts[1].address, accounts[2].address]
+    batch_balances = [amount, amount]
+    signatures = sign_batch(
+        domainSeparator,
+        token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
+    )
+    dexilon_bridge.batchUpdateAvailableBalances(
+        token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        {"from": accounts[0]},
+    )
+
+
 def test_withdraw_deposit_usdc_token(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
@@ -63,18 +95,14 @@ def test_withdraw_batch_add_available_usdc(deploy, tokens):
         amount,
     ]
     batchId = 100_123
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, usdc_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
     )
-
-    signatures = []
-    for pk in private_keys[:8]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
     dexilon_bridge.batchUpdateAvailableBalances(
         usdc_token.address,
         batch_users,
@@ -110,18 +138,14 @@ def test_withdraw_batch_add_available_dxln(deploy, tokens):
         amount,
     ]
     batchId = 100_123
-    base_message = Web3.solidityKeccak(
-        ["bytes32", "address", "address[]", "uint256[]", "uint256"],
-        [domainSeparator, dxln_token.address, batch_users, batch_balances, batchId],
+    signatures = sign_batch(
+        domainSeparator,
+        dxln_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        private_keys[:8],
     )
-
-    signatures = []
-    for pk in private_keys[:8]:
-        signatures.append(
-            w3.eth.account.sign_message(
-                encode_defunct(base_message), private_key=pk
-            ).signature
-        )
     dexilon_bridge.batchUpdateAvailableBalances(
         dxln_token.address,
         batch_users,
@@ -175,6 +199,7 @@ def test_withdraw_initiate_withdraw_usdc(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
+    add_available(deploy, usdc_token, 500 * 10 ** 6, 100_123)
 
     balance1_before = usdc_token.balanceOf(accounts[1])
     balance2_before = usdc_token.balanceOf(accounts[2])
@@ -195,6 +220,7 @@ def test_withdraw_initiate_withdraw_dxln(deploy, tokens):
 
     (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
     (usdc_token, dxln_token) = tokens
+    add_available(deploy, dxln_token, 500 * 10 ** 18, 100_123)
 
     balance1_before = dxln_token.balanceOf(accounts[1])
     balance2_before = dxln_token.balanceOf(accounts[2])
@@ -209,3 +235,140 @@ def test_withdraw_initiate_withdraw_dxln(deploy, tokens):
     assert balance2_after > 0
     assert dexilon_bridge.getAvailableBalance(dxln_token, accounts[1]) == 0
     assert dexilon_bridge.getAvailableBalance(dxln_token, accounts[2]) == 0
+
+
+def test_withdraw_many_tokens(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+    add_available(deploy, usdc_token, 500 * 10 ** 6, 100_124)
+    add_available(deploy, dxln_token, 500 * 10 ** 18, 100_124)
+
+    usdc_before = usdc_token.balanceOf(accounts[1])
+    dxln_before = dxln_token.balanceOf(accounts[1])
+
+    # a token without available balance is skipped
+    tx = dexilon_bridge.withdrawMany(
+        [usdc_token, accounts[5].address, dxln_token], {"from": accounts[1]}
+    )
+
+    assert [event["token"] for event in tx.events["Withdraw"]] == [
+        usdc_token.address,
+        dxln_token.address,
+    ]
+    assert usdc_token.balanceOf(accounts[1]) == usdc_before + 500 * 10 ** 6
+    assert dxln_token.balanceOf(accounts[1]) == dxln_before + 500 * 10 ** 18
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[1]) == 0
+    assert dexilon_bridge.getAvailableBalance(dxln_token, accounts[1]) == 0
+
+
+def test_withdraw_many_revert_no_balance(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    # maintain Anvil and coverage compatibility
+    try:
+        dexilon_bridge.withdrawMany([usdc_token, dxln_token], {"from": accounts[3]})
+    except Exception as e:
+        print(repr(e))
+
+    with reverts("No balance!"):
+        dexilon_bridge.withdrawMany.call(
+            [usdc_token, dxln_token], {"from": accounts[3]}
+        )
+
+
+def test_withdraw_batch_with_payout(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    # the token rejects transfers to the zero address, its amount stays available
+    zero_address = "0x" + "00" * 20
+    batch_users = [accounts[1].address, zero_address, accounts[2].address]
+    batch_balances = [100, 200, 300]
+    batchId = 100_125
+    balances_before = [usdc_token.balanceOf(accounts[i]) for i in (1, 2)]
+    old_locked = dexilon_bridge.getLockedBalance(usdc_token)
+
+    signatures = sign_payout_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        True,
+        private_keys[:8],
+    )
+    tx = dexilon_bridge.batchUpdateAvailableBalancesWithPayout(
+        usdc_token.address,
+        batch_users,
+        batch_balances,
+        batchId,
+        signatures,
+        True,
+        {"from": accounts[0]},
+    )
+
+    assert [event["depositor"] for event in tx.events["Withdraw"]] == [
+        accounts[1],
+        accounts[2],
+    ]
+    assert usdc_token.balanceOf(accounts[1]) == balances_before[0] + 100
+    assert usdc_token.balanceOf(accounts[2]) == balances_before[1] + 300
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[1]) == 0
+    # never deposited, so its balance has no +1 sentinel
+    assert dexilon_bridge.getAvailableBalance(usdc_token, zero_address) == 199
+    assert dexilon_bridge.getLockedBalance(usdc_token) == old_locked - 600
+
+
+def test_withdraw_batch_without_payout(deploy, tokens):
+
+    (dexilon_bridge, pk_accounts, private_keys, domainSeparator) = deploy
+    (usdc_token, dxln_token) = tokens
+
+    batch_users = [accounts[1].address]
+    batchId = 100_126
+    balance_before = usdc_token.balanceOf(accounts[1])
+
+    signatures = sign_payout_batch(
+        domainSeparator,
+        usdc_token.address,
+        batch_users,
+        [100],
+        batchId,
+        False,
+        private_keys,
+    )
+
+    # the payout flag is signed, the submitting validator cannot turn it on
+    flipped_hash = eth_signed_hash(
+        hash_payout_batch(
+            domainSeparator, usdc_token.address, batch_users, [100], batchId, True
+        )
+    )
+    with reverts("Not enough signatures!"):
+        dexilon_bridge.batchUpdateAvailableBalancesWithPayout.call(
+            usdc_token.address,
+            batch_users,
+            [100],
+            batchId,
+            sort_signatures(flipped_hash, signatures),
+            True,
+            {"from": accounts[0]},
+        )
+
+    tx = dexilon_bridge.batchUpdateAvailableBalancesWithPayout(
+        usdc_token.address,
+        batch_users,
+        [100],
+        batchId,
+        signatures,
+        False,
+        {"from": accounts[0]},
+    )
+
+    assert "Withdraw" not in tx.events
+    assert usdc_token.balanceOf(accounts[1]) == balance_before
+    assert dexilon_bridge.getAvailableBalance(usdc_token, accounts[1]) == 100